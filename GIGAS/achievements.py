@@ -0,0 +1,115 @@
+import bisect
+import logging
+
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Язык подписей по умолчанию
+DEFAULT_LOCALE = 'ru'
+
+# Таблица достижений: порог серии, ключ в БД и подписи на каждом языке.
+# title - строка в списке достижений, congrats - поздравление при получении.
+# Чтобы добавить достижение, достаточно новой строки: бэкфилл выдаст его всем, кто уже заслужил
+ACHIEVEMENTS = [
+    {
+        "threshold": 3,
+        "key": "3_days",
+        "title": {"ru": "🥉 3 дня без срывов", "en": "🥉 3 days without relapse"},
+        "congrats": {"ru": "🥉 3 дня без срывов!", "en": "🥉 3 days without relapse!"}
+    },
+    {
+        "threshold": 7,
+        "key": "7_days",
+        "title": {"ru": "🥈 7 дней без срывов", "en": "🥈 7 days without relapse"},
+        "congrats": {"ru": "🥈 7 дней без срывов!", "en": "🥈 7 days without relapse!"}
+    },
+    {
+        "threshold": 14,
+        "key": "14_days",
+        "title": {"ru": "🥇 14 дней без срывов", "en": "🥇 14 days without relapse"},
+        "congrats": {"ru": "🥇 14 дней без срывов!", "en": "🥇 14 days without relapse!"}
+    },
+    {
+        "threshold": 28,
+        "key": "28_days",
+        "title": {"ru": "🏆 28 дней без срывов", "en": "🏆 28 days without relapse"},
+        "congrats": {"ru": "🏆 28 дней без срывов! Ты победитель!", "en": "🏆 28 days without relapse! You're a winner!"}
+    }
+]
+
+# Таблица, отсортированная по порогу, и индексы по ней строятся один раз при импорте
+_table = sorted(ACHIEVEMENTS, key=lambda a: a["threshold"])
+_thresholds = [a["threshold"] for a in _table]
+_by_key = {a["key"]: a for a in _table}
+
+
+# Достижения, порог которых не больше серии (поиск делением пополам по отсортированным порогам)
+def reached(streak):
+    return _table[:bisect.bisect_right(_thresholds, streak)]
+
+
+# Подпись достижения для списка. Для неизвестного ключа возвращается сам ключ
+def title(key, locale=DEFAULT_LOCALE):
+    achievement = _by_key.get(key)
+    if achievement is None:
+        return key
+    return achievement["title"].get(locale, achievement["title"][DEFAULT_LOCALE])
+
+
+# Поздравление при получении достижения
+def congrats(key, locale=DEFAULT_LOCALE):
+    achievement = _by_key[key]
+    return achievement["congrats"].get(locale, achievement["congrats"][DEFAULT_LOCALE])
+
+
+# Ключи всех достижений в порядке возрастания порога
+def keys():
+    return [a["key"] for a in _table]
+
+
+# Выдача новых достижений за серию (выполняется внутри открытой транзакции).
+# Возвращает ключи впервые полученных достижений
+def award(cursor, user_id, streak, today):
+    candidates = reached(streak)
+
+    if not candidates:
+        return []
+
+    cursor.execute(
+        "SELECT achievement FROM achievements WHERE user_id = ?",
+        (user_id,)
+    )
+    earned = {row[0] for row in cursor.fetchall()}
+
+    # Все новые достижения записываются одной пакетной вставкой
+    new = [a["key"] for a in candidates if a["key"] not in earned]
+    cursor.executemany(
+        "INSERT INTO achievements (user_id, achievement, achieved_date) VALUES (?, ?, ?)",
+        [(user_id, key, today) for key in new]
+    )
+
+    return new
+
+
+# Выдача достижений всем пользователям, чья рекордная серия уже достигла порога.
+# Один INSERT ... SELECT по всей таблице пользователей вместо проверки каждого по отдельности
+def backfill(today):
+    values = ", ".join("(?, ?)" for _ in _table)
+    params = [p for a in _table for p in (a["key"], a["threshold"])]
+
+    with storage.transaction() as cursor:
+        cursor.execute(
+            f'''
+            INSERT OR IGNORE INTO achievements (user_id, achievement, achieved_date)
+            SELECT users.user_id, defs.column1, ?
+            FROM users JOIN (VALUES {values}) AS defs ON users.longest_streak >= defs.column2
+            ''',
+            [today] + params
+        )
+        awarded = cursor.rowcount
+
+    if awarded > 0:
+        logger.info(f"Выдано достижений задним числом: {awarded}")
+
+    return awarded
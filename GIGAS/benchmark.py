@@ -0,0 +1,368 @@
+# benchmark.py - микробенчмарки обработчиков бота без сети и без Telegram.
+#
+# Обработчики вызываются напрямую с синтетическими Update (собранными из JSON, как от Telegram),
+# контекстом-заглушкой и ботом-заглушкой, который отвечает мгновенно. База заполняется заранее
+# на 1 тыс., 100 тыс. и 1 млн пользователей; готовые базы кэшируются в --db-dir.
+# Каждый размер базы измеряется в отдельном процессе, чтобы кэши и индексы в памяти не пересекались.
+#
+#     python benchmark.py [--sizes 1000,100000,1000000] [--iterations 2000]
+#                         [--output benchmark_results.json] [--baseline benchmark_baseline.json]
+#                         [--save-baseline] [--threshold 0.25]
+#
+# Результаты пишутся в JSON. Если есть базовый файл, p50 каждого обработчика сравнивается с ним,
+# и при замедлении больше порога скрипт завершается с кодом 1.
+#
+# Базовый файл в репозиторий не входит: время зависит от машины. Первый прогон на своей машине
+# (и после смены железа) запускается с --save-baseline; без базового файла сравнение не выполняется
+# и в колонке "база" стоит "-"
+import os
+import sys
+import json
+import time
+import math
+import random
+import shutil
+import sqlite3
+import asyncio
+import argparse
+import datetime
+import platform
+import subprocess
+from types import SimpleNamespace
+
+# Первый user_id синтетических пользователей
+USER_ID_BASE = 10 ** 9
+
+# Сколько пользователей состоит в чате (рассылка идёт каждому)
+CHAT_MEMBERS = 1000
+
+# Число повторов для рассылок: одна рассылка - это сотни сообщений
+BULK_ITERATIONS = 20
+
+# Разница p50 меньше этой не считается замедлением: для операций в десятки микросекунд она в пределах шума
+MIN_DELTA_MS = 0.05
+
+# Обработчики, которые вызывает button_handler в бенчмарке (без отметки, она меняет данные)
+MENU_BUTTONS = ["stats", "task", "motivation", "emergency", "achievements", "back_to_menu"]
+
+
+# Бот-заглушка: принимает все вызовы API и сразу отвечает
+class StubBot:
+    def __init__(self):
+        self.calls = 0
+
+    async def send_message(self, *args, **kwargs):
+        self.calls += 1
+        return True
+
+    async def edit_message_text(self, *args, **kwargs):
+        self.calls += 1
+        return True
+
+    async def answer_callback_query(self, *args, **kwargs):
+        self.calls += 1
+        return True
+
+
+# Перцентиль по отсортированному списку (ближайший ранг)
+def percentile(values, p):
+    index = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': 'Bench', 'username': f"bench{user_id}"}
+
+
+# Синтетическое обновление с командой
+def command_update(user_id, text, stub):
+    from telegram import Update
+
+    return Update.de_json({
+        'update_id': 1,
+        'message': {
+            'message_id': 1,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': _user(user_id),
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        }
+    }, stub)
+
+
+# Синтетическое нажатие кнопки
+def callback_update(user_id, data, stub):
+    from telegram import Update
+
+    return Update.de_json({
+        'update_id': 1,
+        'callback_query': {
+            'id': '1',
+            'from': _user(user_id),
+            'chat_instance': '1',
+            'data': data,
+            'message': {
+                'message_id': 1,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'text': 'menu'
+            }
+        }
+    }, stub)
+
+
+# Заполнение базы синтетическими пользователями (отдельный процесс)
+def build(path, users):
+    import storage
+    import bot
+    import reminders
+    import achievements
+
+    storage.DB_PATH = path
+    bot.init_db()
+
+    today = datetime.date.today()
+    yesterday = (today - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+    start = (today - datetime.timedelta(days=60)).strftime("%Y-%m-%d")
+
+    # Все отметились вчера: отметка в бенчмарке идёт по полному пути с транзакцией
+    rows = (
+        (USER_ID_BASE + i, f"bench{i}", start, yesterday, i % 40, i % 40 + i % 7, 1,
+         reminders.format_minute(i % 1440), 'ru')
+        for i in range(users)
+    )
+
+    with storage.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO users (user_id, username, start_date, last_check_in, streak, longest_streak, "
+            "reminder_enabled, reminder_time, locale) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        cursor.executemany(
+            "INSERT INTO chat_members (user_id, joined_at, locale) VALUES (?, ?, 'ru')",
+            ((USER_ID_BASE + i, start) for i in range(min(users, CHAT_MEMBERS)))
+        )
+
+        # Очередь напоминаний заполняется так же, как при переходе существующей базы
+        reminders.arm_unscheduled(cursor)
+
+    achievements.backfill(today.strftime("%Y-%m-%d"))
+    storage.close_all()
+
+
+# Замер одного обработчика: calls - список готовых вызовов без аргументов
+async def measure(calls):
+    timings = []
+
+    for call in calls:
+        started = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    mean = sum(timings) / len(timings)
+
+    return {
+        'iterations': len(timings),
+        'mean_ms': mean * 1000,
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'ops_per_sec': 1 / mean if mean else 0.0
+    }
+
+
+# Прогон всех бенчмарков на готовой базе (отдельный процесс)
+async def run_benchmarks(users, iterations):
+    import bot
+    import chat
+    import leader
+    import storage
+    import delivery
+    import outbox
+
+    # Лимиты Telegram снимаются: измеряется стоимость рассылки, а не ожидание токенов
+    delivery.GLOBAL_RATE = delivery.GLOBAL_BURST = 10 ** 9
+    delivery.PER_CHAT_RATE = delivery.PER_CHAT_BURST = 10 ** 9
+
+    # База из кэша могла быть заполнена до изменения схемы
+    bot.init_db()
+    chat.load()
+
+    # Напоминания отправляет только держатель аренды
+    leader.acquire(bot.reminder_lease())
+
+    stub = StubBot()
+    bot.BOTS['ru'] = stub
+    outbox.start({'ru': stub})
+    context = SimpleNamespace(bot=stub, bot_data={'locale': 'ru'}, user_data={}, args=[])
+
+    rng = random.Random(42)
+    count = min(iterations, users)
+
+    def user_ids():
+        return [USER_ID_BASE + i for i in rng.sample(range(users), count)]
+
+    def handler_calls(handler, make_update):
+        return [
+            (lambda update=make_update(user_id): handler(update, context))
+            for user_id in user_ids()
+        ]
+
+    results = {}
+
+    results['checkin'] = await measure(handler_calls(bot.checkin, lambda uid: command_update(uid, '/checkin', stub)))
+    results['show_stats'] = await measure(handler_calls(bot.show_stats, lambda uid: command_update(uid, '/stats', stub)))
+    results['show_achievements'] = await measure(
+        handler_calls(bot.show_achievements, lambda uid: command_update(uid, '/achievements', stub))
+    )
+    results['button_handler'] = await measure(
+        handler_calls(bot.button_handler, lambda uid: callback_update(uid, rng.choice(MENU_BUTTONS), stub))
+    )
+
+    # Напоминания на текущую минуту: время замеряется до доставки последнего сообщения заглушке.
+    # Каждый проход переносит напоминания на завтра, поэтому перед проходом пользователи этой минуты
+    # снова ставятся в очередь (время напоминания пользователя i - минута i % 1440)
+    now = datetime.datetime.now()
+    due_users = [USER_ID_BASE + i for i in range(now.hour * 60 + now.minute, users, 1440)]
+
+    def requeue():
+        with storage.transaction() as cursor:
+            cursor.executemany(
+                "UPDATE users SET next_fire_at = ?, reminded_on = NULL WHERE user_id = ?",
+                ((int(time.time()), user_id) for user_id in due_users)
+            )
+
+    async def reminders_tick():
+        requeue()
+        await bot.send_reminders(context)
+        await outbox.wait_idle()
+
+    results['send_reminders'] = await measure([reminders_tick] * BULK_ITERATIONS)
+
+    async def broadcast():
+        await bot.broadcast_message(context, "benchmark")
+        await outbox.wait_idle()
+
+    results['broadcast_message'] = await measure([broadcast] * BULK_ITERATIONS)
+    results['broadcast_message']['recipients'] = len(chat.members('ru'))
+
+    await outbox.shutdown()
+    await delivery.shutdown()
+    return results
+
+
+# Прогон одного размера базы в дочернем процессе; база копируется из кэша, чтобы каждый прогон начинался одинаково
+def run_size(users, iterations, db_dir):
+    script = os.path.abspath(__file__)
+    template = os.path.join(db_dir, f"bench_{users}.db")
+
+    if not os.path.exists(template):
+        print(f"Заполнение базы на {users} пользователей...", file=sys.stderr)
+        subprocess.run([sys.executable, script, '--build', template, '--users', str(users)], check=True)
+
+    work = os.path.join(db_dir, f"bench_{users}.work.db")
+    shutil.copyfile(template, work)
+
+    try:
+        output = subprocess.run(
+            [sys.executable, script, '--worker', work, '--users', str(users), '--iterations', str(iterations)],
+            check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(work + suffix):
+                os.remove(work + suffix)
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# Сравнение с базовыми результатами. Возвращает список замедлений
+def compare(results, baseline, threshold):
+    regressions = []
+
+    print(f"\n{'пользователей':>13}  {'обработчик':<20}{'p50, мс':>10}{'база, мс':>10}{'изменение':>11}")
+    for size, handlers in results['results'].items():
+        for name, current in handlers.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if base is None or not base['p50_ms']:
+                print(f"{size:>13}  {name:<20}{current['p50_ms']:>10.3f}{'-':>10}{'-':>11}")
+                continue
+
+            change = current['p50_ms'] / base['p50_ms'] - 1
+            slower = change > threshold and current['p50_ms'] - base['p50_ms'] > MIN_DELTA_MS
+            mark = "  ЗАМЕДЛЕНИЕ" if slower else ""
+            print(f"{size:>13}  {name:<20}{current['p50_ms']:>10.3f}{base['p50_ms']:>10.3f}{change:>+10.0%}{mark}")
+
+            if slower:
+                regressions.append((size, name, change))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки обработчиков бота")
+    parser.add_argument('--sizes', default='1000,100000,1000000', help="размеры базы (пользователей) через запятую")
+    parser.add_argument('--iterations', type=int, default=2000, help="вызовов каждого обработчика")
+    parser.add_argument('--db-dir', default='benchmark_db', help="папка для заполненных баз")
+    parser.add_argument('--output', default='benchmark_results.json', help="файл результатов")
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help="файл базовых результатов")
+    parser.add_argument('--save-baseline', action='store_true', help="сохранить результаты как базовые")
+    parser.add_argument('--threshold', type=float, default=0.25, help="допустимое замедление p50 (0.25 = 25%%)")
+    parser.add_argument('--users', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--build', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build:
+        build(args.build, args.users)
+        return
+
+    if args.worker:
+        import storage
+        storage.DB_PATH = args.worker
+        results = asyncio.run(run_benchmarks(args.users, args.iterations))
+        storage.close_all()
+        print(json.dumps(results))
+        return
+
+    os.makedirs(args.db_dir, exist_ok=True)
+
+    results = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'iterations': args.iterations,
+        'results': {}
+    }
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        print(f"Бенчмарк на {size} пользователей...", file=sys.stderr)
+        results['results'][str(size)] = run_size(size, args.iterations, args.db_dir)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Результаты записаны в {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Базовые результаты сохранены в {args.baseline}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    else:
+        print(f"Базовый файл {args.baseline} не найден, сравнение не выполняется: сохраните его с --save-baseline")
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if regressions:
+        print(f"\nЗамедлений больше {args.threshold:.0%}: {len(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,41 @@
-import os
+import re
 import time
+import asyncio
 import logging
-import sqlite3
 import random
 import datetime
 from threading import Thread
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ParseMode
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.helpers import escape_markdown
+from telegram.request import HTTPXRequest
 from telegram.ext import (
-    Updater, CommandHandler, CallbackContext, CallbackQueryHandler,
-    MessageHandler, Filters, ConversationHandler
+    Application, CommandHandler, ContextTypes, CallbackQueryHandler,
+    MessageHandler, filters, ConversationHandler, TypeHandler
 )
 
+import config
+import storage
+import reminders
+import delivery
+import chat
+import chat_log
+import chat_archive
+import history
+import search
+import achievements
+import profiles
+import timezones
+import i18n
+import metrics
+import profiler
+import persistence
+import outbox
+import leader
+import ordering
+import shards
+import runner
+
 # Настройка логирования
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -18,395 +43,392 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Получение токена бота из переменной окружения
-TOKEN = os.environ['TELEGRAM_TOKEN']
-
 # Константы для ConversationHandler
 MAIN_MENU, HELP_MENU, EMERGENCY_HELP = range(3)
 
-# Мотивационные цитаты
-QUOTES = [
-    "Самоконтроль сегодня - это сила завтра.",
-    "Каждый день без зависимости - это победа над собой.",
-    "Сложно сегодня - легче завтра.",
-    "Твоя сила не в том, чтобы не упасть, а в том, чтобы подняться.",
-    "Преодолей себя сегодня и стань сильнее завтра.",
-    "Настоящая сила - уметь сказать 'нет' своим слабостям.",
-    "Ты сильнее, чем думаешь.",
-    "Каждый новый день - это новая возможность стать лучше.",
-    "Твоя жизнь меняется, когда меняешься ты сам.",
-    "Дисциплина - это мост между целями и достижениями."
-]
-
-# Задания для пользователей
-TASKS = [
-    "Сделай 20 отжиманий, когда почувствуешь искушение.",
-    "Выпей стакан воды и сделай 10 глубоких вдохов.",
-    "Выйди на 10-минутную прогулку на свежем воздухе.",
-    "Примите холодный душ.",
-    "Почитай книгу в течение 30 минут.",
-    "Позвони другу или члену семьи.",
-    "Медитируй в течение 10 минут.",
-    "Запиши свои мысли и чувства в дневник.",
-    "Сделай растяжку или йогу в течение 15 минут.",
-    "Нарисуй или напиши о своих целях на будущее."
-]
+# Сколько обновлений обрабатывается одновременно
+CONCURRENT_UPDATES = 256
 
-# Экстренная помощь
-EMERGENCY_TIPS = [
-    "Сделай 20 отжиманий прямо сейчас!",
-    "Немедленно выйди из комнаты и пройдись.",
-    "Включи холодный душ и постой под ним 30 секунд.",
-    "Позвони другу прямо сейчас.",
-    "Сделай 50 прыжков на месте.",
-    "Сконцентрируйся на дыхании: вдох на 4 счета, задержка на 4, выдох на 4.",
-    "Выпей стакан холодной воды.",
-    "Сделай планку на 1 минуту.",
-    "Закрой глаза и сосчитай до 100.",
-    "Включи любимую энергичную музыку и подвигайся под неё."
-]
+# Размер общего пула HTTP-соединений всех ботов процесса
+CONNECTION_POOL_SIZE = 256
 
-# Инициализация базы данных
-def init_db():
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
-
-    # Создание таблицы пользователей
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        user_id INTEGER PRIMARY KEY,
-        username TEXT,
-        start_date TEXT,
-        last_check_in TEXT,
-        streak INTEGER DEFAULT 0,
-        longest_streak INTEGER DEFAULT 0,
-        reminder_enabled INTEGER DEFAULT 1,
-        reminder_time TEXT DEFAULT "20:00"
-    )
-    ''')
-
-    # Создание таблицы достижений
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS achievements (
-        user_id INTEGER,
-        achievement TEXT,
-        achieved_date TEXT,
-        PRIMARY KEY (user_id, achievement)
-    )
-    ''')
-
-    # Создание таблицы для чата
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS chat_messages (
-        message_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        username TEXT,
-        message TEXT,
-        timestamp TEXT
-    )
-    ''')
+# Боты процесса по языкам (заполняется в main)
+BOTS = {}
 
-    conn.commit()
-    conn.close()
+# Приложения процесса по языкам (заполняется в main)
+APPLICATIONS = {}
 
-# Функция для регистрации пользователя
-def register_user(user_id, username):
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
+# Сколько разных значений метки handler допускается в метриках. Данные кнопок присылает клиент,
+# поэтому всё, что не поместилось, считается одним значением "other"
+MAX_HANDLER_LABELS = 200
 
-    # Проверка, зарегистрирован ли пользователь
-    cursor.execute("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
+# На сколько обновлений включается профилирование командой /profile без аргументов
+PROFILE_DEFAULT_UPDATES = 200
 
-    if result is None:
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        cursor.execute(
-            "INSERT INTO users (user_id, username, start_date, last_check_in, streak) VALUES (?, ?, ?, ?, ?)",
-            (user_id, username, today, today, 0)
-        )
-        conn.commit()
-        conn.close()
-        return True
+# Аренда обслуживания базы (достижения и поиск задним числом, архивация чата): из всех экземпляров бота
+# его выполняет один процесс
+MAINTENANCE_LEASE = 'maintenance'
 
-    conn.close()
-    return False
+# Номер страницы или сообщения в конце данных кнопки (history_123, search_2) в метки не попадает
+_CALLBACK_ID = re.compile(r"_\d+$")
 
-# Функция для проверки достижений
-def check_achievements(user_id, streak):
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
+# Команды, на которые есть обработчики (заполняется в build_application), и уже встреченные метки
+_commands = set()
+_handler_labels = set()
 
-    achievements = []
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
+# Начало обработки обновлений, которые сейчас в работе
+_update_started = {}
 
-    if streak >= 3:
-        cursor.execute(
-            "INSERT OR IGNORE INTO achievements (user_id, achievement, achieved_date) VALUES (?, ?, ?)",
-            (user_id, "3_days", today)
+UPDATE_DURATION = metrics.Histogram(
+    'bot_update_duration_seconds', "Время обработки обновления", ('bot', 'handler')
+)
+UPDATE_ERRORS = metrics.Counter('bot_update_errors_total', "Ошибки в обработчиках", ('bot', 'handler'))
+REMINDER_TICK = metrics.Histogram('bot_reminder_tick_duration_seconds', "Время одного прохода напоминаний")
+REMINDERS_DUE = metrics.Counter('bot_reminders_due_total', "Напоминаний поставлено в рассылку", ('bot',))
+metrics.Gauge(
+    'bot_update_queue_depth', "Обновлений в очереди приложения", ('bot',),
+    func=lambda: {(locale,): app.update_queue.qsize() for locale, app in APPLICATIONS.items()}
+)
+metrics.Gauge('bot_updates_in_progress', "Обновлений в обработке", func=lambda: len(_update_started))
+
+# Инициализация базы данных
+def init_db():
+    # Место, освобождённое архивацией чата, возвращается файлу частями
+    storage.enable_incremental_vacuum()
+
+    with storage.transaction() as cursor:
+        # Создание таблицы пользователей
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            start_date TEXT,
+            last_check_in TEXT,
+            streak INTEGER DEFAULT 0,
+            longest_streak INTEGER DEFAULT 0,
+            reminder_enabled INTEGER DEFAULT 1,
+            reminder_time TEXT DEFAULT "20:00"
         )
-        if cursor.rowcount > 0:
-            achievements.append("🥉 3 дня без срывов!")
+        ''')
 
-    if streak >= 7:
-        cursor.execute(
-            "INSERT OR IGNORE INTO achievements (user_id, achievement, achieved_date) VALUES (?, ?, ?)",
-            (user_id, "7_days", today)
+        # Язык бота, через которого пользователь общается
+        storage.add_column(cursor, "users", "locale", "TEXT DEFAULT 'ru'")
+
+        # Часовой пояс пользователя; NULL - пояс по умолчанию (config.DEFAULT_TIMEZONE)
+        storage.add_column(cursor, "users", "timezone", "TEXT")
+
+        # Создание таблицы достижений
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS achievements (
+            user_id INTEGER,
+            achievement TEXT,
+            achieved_date TEXT,
+            PRIMARY KEY (user_id, achievement)
+        )
+        ''')
+
+        # Создание таблицы для чата
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            username TEXT,
+            message TEXT,
+            timestamp TEXT
         )
-        if cursor.rowcount > 0:
-            achievements.append("🥈 7 дней без срывов!")
+        ''')
+        storage.add_column(cursor, "chat_messages", "locale", "TEXT DEFAULT 'ru'")
 
-    if streak >= 14:
-        cursor.execute(
-            "INSERT OR IGNORE INTO achievements (user_id, achievement, achieved_date) VALUES (?, ?, ?)",
-            (user_id, "14_days", today)
+        # Индексы для архивации по времени и выборки сообщений пользователя
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_timestamp ON chat_messages (timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_user ON chat_messages (user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_locale ON chat_messages (locale, message_id)")
+
+        # Создание таблицы участников чата
+        chat.create_table(cursor)
+
+        # Полнотекстовый индекс по сообщениям чата
+        search.create_table(cursor)
+
+        # user_data и состояния диалогов
+        persistence.create_tables(cursor)
+
+        # Аренды ведущего для заданий, которые должен выполнять один экземпляр
+        leader.create_table(cursor)
+
+        # Исходящие сообщения рассылок
+        outbox.create_tables(cursor)
+
+        # Очередь напоминаний: момент следующего напоминания каждого пользователя
+        reminders.create_columns(cursor)
+
+# Каталог сообщений для бота, через которого пришло обновление
+def get_catalog(context):
+    return i18n.get(context.bot_data.get('locale', i18n.DEFAULT_LOCALE))
+
+# Функция для регистрации пользователя
+def register_user(user_id, username, locale):
+    today = timezones.today(None)
+
+    # Новые пользователи получают напоминания по умолчанию
+    next_fire_at = reminders.next_fire_at(
+        "20:00", None, datetime.datetime.now(datetime.timezone.utc), shift=reminders.jitter(user_id)
+    )
+
+    # Вставка срабатывает только для нового пользователя, поэтому проверка и регистрация - один запрос
+    inserted = storage.execute(
+        "INSERT OR IGNORE INTO users (user_id, username, start_date, last_check_in, streak, locale, next_fire_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (user_id, username, today, today, 0, locale, next_fire_at)
+    )
+
+    if inserted > 0:
+        profiles.put(user_id, {
+            "start_date": today,
+            "last_check_in": today,
+            "streak": 0,
+            "longest_streak": 0,
+            "reminder_enabled": 1,
+            "reminder_time": "20:00",
+            "locale": locale,
+            "timezone": None
+        })
+        return True
+
+    # Пользователь перешёл к боту на другом языке - напоминания теперь идут через него
+    profile = profiles.get(user_id)
+    if profile is not None and profile["locale"] != locale:
+        storage.execute(
+            "UPDATE users SET locale = ? WHERE user_id = ?",
+            (locale, user_id)
         )
-        if cursor.rowcount > 0:
-            achievements.append("🥇 14 дней без срывов!")
+        profiles.update(user_id, locale=locale)
+
+    return False
 
-    if streak >= 28:
+# Отметка за день одной транзакцией: чтение серии, обновление пользователя и запись достижений.
+# BEGIN IMMEDIATE сериализует параллельные нажатия, поэтому двойное нажатие не увеличит серию дважды
+def record_checkin(user_id, today):
+    with storage.transaction() as cursor:
         cursor.execute(
-            "INSERT OR IGNORE INTO achievements (user_id, achievement, achieved_date) VALUES (?, ?, ?)",
-            (user_id, "28_days", today)
+            "SELECT last_check_in, streak, longest_streak FROM users WHERE user_id = ?",
+            (user_id,)
         )
-        if cursor.rowcount > 0:
-            achievements.append("🏆 28 дней без срывов! Ты победитель!")
+        result = cursor.fetchone()
 
-    conn.commit()
-    conn.close()
+        if result is None:
+            return None
 
-    return achievements
+        last_check_in, streak, longest_streak = result
 
-# Функция для отправки напоминаний
-def send_reminders(context: CallbackContext):
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
+        # Уже отмечался сегодня. Дата может быть и позже сегодняшней, если пользователь сменил пояс на западный:
+        # такой день тоже уже отмечен, иначе завтрашняя отметка засчиталась бы ещё раз
+        if last_check_in >= today:
+            return 0, streak, []
+
+        # Вычисление разницы дней
+        last_date = datetime.datetime.strptime(last_check_in, "%Y-%m-%d")
+        current_date = datetime.datetime.strptime(today, "%Y-%m-%d")
+        days_diff = (current_date - last_date).days
+
+        if days_diff == 1:
+            # Последовательные дни, увеличиваем streak
+            new_streak = streak + 1
+        else:
+            # Пропущены дни, сбрасываем streak
+            new_streak = 1
+
+        cursor.execute(
+            "UPDATE users SET last_check_in = ?, streak = ?, longest_streak = MAX(longest_streak, ?) WHERE user_id = ?",
+            (today, new_streak, new_streak, user_id)
+        )
 
-    current_time = datetime.datetime.now().strftime("%H:%M")
+        new_achievements = achievements.award(cursor, user_id, new_streak, today)
 
-    # Получение пользователей, у которых включены напоминания и текущее время совпадает с временем напоминания
-    cursor.execute(
-        "SELECT user_id FROM users WHERE reminder_enabled = 1 AND reminder_time = ?",
-        (current_time,)
+    profiles.update(
+        user_id,
+        last_check_in=today,
+        streak=new_streak,
+        longest_streak=max(longest_streak, new_streak)
     )
 
-    users = cursor.fetchall()
-    conn.close()
+    return days_diff, new_streak, new_achievements
 
-    for user in users:
-        try:
-            quote = random.choice(QUOTES)
-            message = f"📝 *Ежедневное напоминание*\n\n_{quote}_\n\nНе забудьте отметиться сегодня! /checkin"
+# Функция для отправки напоминаний
+async def send_reminders(context: ContextTypes.DEFAULT_TYPE):
+    # Напоминания отправляет только ведущий экземпляр
+    lease = reminder_lease()
+    token = leader.token(lease)
+    if token is None:
+        return
+
+    started = time.perf_counter()
+    now = int(time.time())
+
+    # Наступившие напоминания, включая опоздавшие в пределах reminders.GRACE_SECONDS, выбираются пачками,
+    # но не больше, чем лимит отправки пропустит до следующего тика
+    budget = reminders.tick_budget(delivery.GLOBAL_RATE)
+    while budget > 0:
+        limit = min(budget, reminders.BATCH_SIZE)
+        claimed, users = await storage.run(reminders.claim, now, lease, token, limit, enqueue_reminders)
+        if users is None:
+            logger.warning("Аренда напоминаний потеряна, отправка остановлена")
+            break
+
+        outbox.notify()
+        budget -= len(users)
+
+        # Очередь до момента now разобрана
+        if claimed < limit:
+            break
+
+    REMINDER_TICK.observe(time.perf_counter() - started)
+
+# Постановка пачки напоминаний в исходящие (выполняется в потоке БД в транзакции выборки): пары (user_id, язык)
+def enqueue_reminders(cursor, users):
+    # Каждому пользователю напоминание уходит через бот его языка
+    by_locale = {}
+    for user_id, locale in users:
+        by_locale.setdefault(locale, []).append(user_id)
+
+    for locale, user_ids in by_locale.items():
+        if locale not in BOTS:
+            logger.error(f"Нет бота для языка {locale}, напоминаний пропущено: {len(user_ids)}")
+            continue
+
+        catalog = i18n.get(locale)
+        messages = (
+            (user_id, catalog.text("daily_reminder", quote=random.choice(catalog.quotes)))
+            for user_id in user_ids
+        )
 
-            context.bot.send_message(
-                chat_id=user[0],
-                text=message,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        except Exception as e:
-            logger.error(f"Ошибка при отправке напоминания: {e}")
+        # Отправка идёт из исходящих, задание не ждёт её окончания. Напоминание разовое: не повторяется
+        # и не уходит позже, чем reminders.claim досылает опоздавшие
+        expires_at = time.time() + reminders.GRACE_SECONDS
+        outbox.add(cursor, locale, messages, f"напоминания ({locale})", ParseMode.MARKDOWN, expires_at)
+        REMINDERS_DUE.inc(locale, amount=len(user_ids))
 
 # Команда /start
-def start(update: Update, context: CallbackContext) -> int:
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
+    catalog = get_catalog(context)
 
     # Регистрация пользователя
-    is_new = register_user(user.id, user.username or user.first_name)
+    is_new = await storage.run(register_user, user.id, user.username or user.first_name, catalog.locale)
 
     if is_new:
-        message = (
-            f"👋 Привет, {user.first_name}! Я бот, который поможет тебе преодолеть зависимость и "
-            f"стать лучшей версией себя.\n\n"
-            f"🔰 *Что я умею:*\n"
-            f"✅ Ежедневные отметки для отслеживания прогресса\n"
-            f"📝 Ежедневные задания для личностного роста\n"
-            f"🖼 Мотивационные цитаты и изображения\n"
-            f"🆘 Экстренная помощь в моменты слабости\n"
-            f"🏆 Система достижений\n\n"
-            f"Используй /help для получения списка команд."
-        )
+        message = catalog.text("welcome_new", first_name=user.first_name)
     else:
-        message = (
-            f"С возвращением, {user.first_name}! Рад видеть тебя снова.\n\n"
-            f"Используй /help для получения списка команд или воспользуйся меню ниже."
-        )
+        message = catalog.text("welcome_back", first_name=user.first_name)
 
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ Отметиться", callback_data="checkin"),
-            InlineKeyboardButton("📊 Статистика", callback_data="stats")
-        ],
-        [
-            InlineKeyboardButton("📝 Задание дня", callback_data="task"),
-            InlineKeyboardButton("🖼 Мотивация", callback_data="motivation")
-        ],
-        [
-            InlineKeyboardButton("🆘 Экстренная помощь", callback_data="emergency"),
-            InlineKeyboardButton("🏆 Достижения", callback_data="achievements")
-        ]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    update.message.reply_text(
+    await update.message.reply_text(
         message,
-        reply_markup=reply_markup,
+        reply_markup=catalog.main_menu_keyboard,
         parse_mode=ParseMode.MARKDOWN
     )
 
     return MAIN_MENU
 
 # Команда /help
-def help_command(update: Update, context: CallbackContext) -> int:
-    help_text = (
-        "*Список команд:*\n\n"
-        "/start - Начать работу с ботом\n"
-        "/checkin - Отметиться на сегодня\n"
-        "/stats - Показать вашу статистику\n"
-        "/task - Получить задание дня\n"
-        "/motivation - Получить мотивационную цитату\n"
-        "/emergency - Экстренная помощь при искушении\n"
-        "/achievements - Посмотреть свои достижения\n"
-        "/reminder - Настроить ежедневные напоминания\n"
-        "/chat - Присоединиться к чату сообщества\n"
-        "/help - Показать эту справку"
-    )
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    catalog = get_catalog(context)
 
-    keyboard = [
-        [InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    update.message.reply_text(
-        help_text,
-        reply_markup=reply_markup,
+    await update.message.reply_text(
+        catalog.text("help"),
+        reply_markup=catalog.back_to_menu_keyboard,
         parse_mode=ParseMode.MARKDOWN
     )
 
     return HELP_MENU
 
 # Обработка кнопок
-def button_handler(update: Update, context: CallbackContext) -> int:
+async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
-    query.answer()
+    await query.answer()
 
     if query.data == "back_to_menu":
-        return show_main_menu(update, context)
+        return await show_main_menu(update, context)
     elif query.data == "checkin":
-        return checkin(update, context)
+        return await checkin(update, context)
     elif query.data == "stats":
-        return show_stats(update, context)
+        return await show_stats(update, context)
     elif query.data == "task":
-        return daily_task(update, context)
+        return await daily_task(update, context)
     elif query.data == "motivation":
-        return motivation(update, context)
+        return await motivation(update, context)
     elif query.data == "emergency":
-        return emergency(update, context)
+        return await emergency(update, context)
     elif query.data == "achievements":
-        return show_achievements(update, context)
+        return await show_achievements(update, context)
     elif query.data.startswith("emergency_tip_"):
-        return send_emergency_tip(update, context)
+        return await send_emergency_tip(update, context)
     elif query.data == "back_to_emergency":
-        return emergency(update, context)
+        return await emergency(update, context)
 
     return MAIN_MENU
 
 # Показать главное меню
-def show_main_menu(update: Update, context: CallbackContext) -> int:
+async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
+    catalog = get_catalog(context)
 
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ Отметиться", callback_data="checkin"),
-            InlineKeyboardButton("📊 Статистика", callback_data="stats")
-        ],
-        [
-            InlineKeyboardButton("📝 Задание дня", callback_data="task"),
-            InlineKeyboardButton("🖼 Мотивация", callback_data="motivation")
-        ],
-        [
-            InlineKeyboardButton("🆘 Экстренная помощь", callback_data="emergency"),
-            InlineKeyboardButton("🏆 Достижения", callback_data="achievements")
-        ]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    query.edit_message_text(
-        text="Главное меню. Выберите действие:",
-        reply_markup=reply_markup
+    await query.edit_message_text(
+        text=catalog.text("main_menu"),
+        reply_markup=catalog.main_menu_keyboard
     )
 
     return MAIN_MENU
 
 # Отметка о прохождении дня
-def checkin(update: Update, context: CallbackContext) -> int:
+async def checkin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = update.effective_user.id
+    catalog = get_catalog(context)
 
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
+    # Повторная отметка за сегодня определяется по кэшу профиля без транзакции в БД
+    profile = await profiles.aget(user_id)
 
-    # Получение текущей даты
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    if profile is None:
+        result = None
+    else:
+        # Текущая дата в часовом поясе пользователя: граница дня у каждого своя
+        today = timezones.today(profile["timezone"])
 
-    # Проверка, отмечался ли пользователь сегодня
-    cursor.execute(
-        "SELECT last_check_in, streak FROM users WHERE user_id = ?",
-        (user_id,)
-    )
-    result = cursor.fetchone()
+        if profile["last_check_in"] >= today:
+            result = (0, profile["streak"], [])
+        else:
+            # Отметка и проверка достижений
+            result = await storage.run(record_checkin, user_id, today)
 
     if result:
-        last_check_in, streak = result
+        days_diff, new_streak, new_achievements = result
 
         # Проверка, не отмечался ли уже сегодня
-        if last_check_in == today:
+        if days_diff == 0:
             if isinstance(update.callback_query, type(None)):
-                update.message.reply_text("Вы уже отметились сегодня! Приходите завтра.")
+                await update.message.reply_text(catalog.text("already_checked_in"))
             else:
-                update.callback_query.edit_message_text("Вы уже отметились сегодня! Приходите завтра.")
+                await update.callback_query.edit_message_text(catalog.text("already_checked_in"))
         else:
-            # Вычисление разницы дней
-            last_date = datetime.datetime.strptime(last_check_in, "%Y-%m-%d")
-            current_date = datetime.datetime.strptime(today, "%Y-%m-%d")
-            days_diff = (current_date - last_date).days
-
             if days_diff == 1:
-                # Последовательные дни, увеличиваем streak
-                new_streak = streak + 1
-                message = f"✅ Отлично! Ваша серия без срывов: {new_streak} дней подряд!"
+                message = catalog.text("checkin_streak", streak=new_streak)
             elif days_diff > 1:
-                # Пропущены дни, сбрасываем streak
-                new_streak = 1
-                message = "✅ Отметка принята. К сожалению, ваша серия была сброшена из-за пропущенных дней. Новая серия: 1 день."
+                message = catalog.text("checkin_reset")
             else:
-                # Что-то не так с датами
-                new_streak = streak
-                message = "✅ Отметка принята."
-
-            # Обновление данных пользователя
-            cursor.execute(
-                "UPDATE users SET last_check_in = ?, streak = ?, longest_streak = MAX(longest_streak, ?) WHERE user_id = ?",
-                (today, new_streak, new_streak, user_id)
-            )
-            conn.commit()
+                message = catalog.text("checkin_accepted")
 
-            # Проверка достижений
-            achievements = check_achievements(user_id, new_streak)
-
-            if achievements:
-                message += "\n\n🏆 *Новые достижения:*\n" + "\n".join(achievements)
+            if new_achievements:
+                message += catalog.text("new_achievements") + "\n".join(
+                    achievements.congrats(key, catalog.locale) for key in new_achievements
+                )
 
                 # Проверка на 28 дней
                 if new_streak >= 28:
-                    message += "\n\n🎁 *Поздравляем с достижением 28 дней!*\nВаш подарок: [Перейти на сайт](https://вашссылка.ru)"
+                    message += catalog.text("gift_28_days")
 
             if isinstance(update.callback_query, type(None)):
-                update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+                await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
             else:
-                update.callback_query.edit_message_text(text=message, parse_mode=ParseMode.MARKDOWN)
-
-    conn.close()
+                await update.callback_query.edit_message_text(text=message, parse_mode=ParseMode.MARKDOWN)
 
     # Если это была команда, а не callback, возвращаем ConversationHandler.END
     if isinstance(update.callback_query, type(None)):
@@ -415,46 +437,34 @@ def checkin(update: Update, context: CallbackContext) -> int:
     return MAIN_MENU
 
 # Показать статистику
-def show_stats(update: Update, context: CallbackContext) -> int:
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = update.effective_user.id
+    catalog = get_catalog(context)
 
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT start_date, streak, longest_streak FROM users WHERE user_id = ?",
-        (user_id,)
-    )
-    result = cursor.fetchone()
+    profile = await profiles.aget(user_id)
 
-    if result:
-        start_date, streak, longest_streak = result
+    if profile:
+        start_date = profile["start_date"]
 
         # Вычисление общего количества дней с начала
         start = datetime.datetime.strptime(start_date, "%Y-%m-%d")
-        today = datetime.datetime.now()
+        today = datetime.datetime.strptime(timezones.today(profile["timezone"]), "%Y-%m-%d")
         total_days = (today - start).days + 1
 
-        stats_text = (
-            f"📊 *Ваша статистика:*\n\n"
-            f"📅 Дата начала: {start_date}\n"
-            f"📈 Текущая серия: {streak} дней\n"
-            f"🏆 Рекордная серия: {longest_streak} дней\n"
-            f"⏱ Всего дней с начала пути: {total_days}"
+        stats_text = catalog.text(
+            "stats",
+            start_date=start_date,
+            streak=profile["streak"],
+            longest_streak=profile["longest_streak"],
+            total_days=total_days
         )
 
-        keyboard = [
-            [InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]
-        ]
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = catalog.back_to_menu_keyboard
 
         if isinstance(update.callback_query, type(None)):
-            update.message.reply_text(stats_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+            await update.message.reply_text(stats_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
         else:
-            update.callback_query.edit_message_text(text=stats_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
-
-    conn.close()
+            await update.callback_query.edit_message_text(text=stats_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
 
     # Если это была команда, а не callback, возвращаем ConversationHandler.END
     if isinstance(update.callback_query, type(None)):
@@ -463,21 +473,16 @@ def show_stats(update: Update, context: CallbackContext) -> int:
     return MAIN_MENU
 
 # Ежедневное задание
-def daily_task(update: Update, context: CallbackContext) -> int:
-    task = random.choice(TASKS)
+async def daily_task(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    catalog = get_catalog(context)
 
-    task_text = f"📝 *Задание дня:*\n\n{task}\n\nВыполните это задание и станьте на шаг ближе к вашей цели!"
-
-    keyboard = [
-        [InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    task_text = catalog.text("task", task=random.choice(catalog.tasks))
+    reply_markup = catalog.back_to_menu_keyboard
 
     if isinstance(update.callback_query, type(None)):
-        update.message.reply_text(task_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(task_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
     else:
-        update.callback_query.edit_message_text(text=task_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.callback_query.edit_message_text(text=task_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
 
     # Если это была команда, а не callback, возвращаем ConversationHandler.END
     if isinstance(update.callback_query, type(None)):
@@ -486,21 +491,16 @@ def daily_task(update: Update, context: CallbackContext) -> int:
     return MAIN_MENU
 
 # Мотивационная цитата
-def motivation(update: Update, context: CallbackContext) -> int:
-    quote = random.choice(QUOTES)
-
-    motivation_text = f"🖼 *Мотивация дня:*\n\n_{quote}_"
+async def motivation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    catalog = get_catalog(context)
 
-    keyboard = [
-        [InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    motivation_text = catalog.text("motivation", quote=random.choice(catalog.quotes))
+    reply_markup = catalog.back_to_menu_keyboard
 
     if isinstance(update.callback_query, type(None)):
-        update.message.reply_text(motivation_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(motivation_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
     else:
-        update.callback_query.edit_message_text(text=motivation_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.callback_query.edit_message_text(text=motivation_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
 
     # Если это была команда, а не callback, возвращаем ConversationHandler.END
     if isinstance(update.callback_query, type(None)):
@@ -509,141 +509,71 @@ def motivation(update: Update, context: CallbackContext) -> int:
     return MAIN_MENU
 
 # Экстренная помощь
-def emergency(update: Update, context: CallbackContext) -> int:
-    emergency_text = (
-        "🆘 *Экстренная помощь*\n\n"
-        "Чувствуете искушение? Мы здесь, чтобы помочь вам!\n"
-        "Выберите тип помощи ниже:"
-    )
+async def emergency(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    catalog = get_catalog(context)
 
-    keyboard = [
-        [InlineKeyboardButton("💪 Физическое упражнение", callback_data="emergency_tip_physical")],
-        [InlineKeyboardButton("🧠 Ментальная техника", callback_data="emergency_tip_mental")],
-        [InlineKeyboardButton("🚿 Холодный душ", callback_data="emergency_tip_shower")],
-        [InlineKeyboardButton("🔄 Отвлечение", callback_data="emergency_tip_distraction")],
-        [InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    emergency_text = catalog.text("emergency")
+    reply_markup = catalog.emergency_keyboard
 
     if isinstance(update.callback_query, type(None)):
-        update.message.reply_text(emergency_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(emergency_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
     else:
-        update.callback_query.edit_message_text(text=emergency_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
-
-    # Если это была команда, а не callback, возвращаем EMERGENCY_HELP
-    if isinstance(update.callback_query, type(None)):
-        return EMERGENCY_HELP
+        await update.callback_query.edit_message_text(text=emergency_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
 
     return EMERGENCY_HELP
 
 # Отправка конкретного совета для экстренной помощи
-def send_emergency_tip(update: Update, context: CallbackContext) -> int:
+async def send_emergency_tip(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
+    catalog = get_catalog(context)
     tip_type = query.data.replace("emergency_tip_", "")
 
-    tips = {
-        "physical": [
-            "Сделайте 20 отжиманий прямо сейчас!",
-            "Выполните 30 приседаний.",
-            "Сделайте планку на 1 минуту."
-        ],
-        "mental": [
-            "Сконцентрируйтесь на дыхании: вдох на 4 счета, задержка на 4, выдох на 4.",
-            "Закройте глаза и сосчитайте до 100.",
-            "Медитируйте в течение 5 минут, фокусируясь на дыхании."
-        ],
-        "shower": [
-            "Примите холодный душ на 30-60 секунд.",
-            "Умойтесь холодной водой несколько раз.",
-            "Подержите руки под холодной водой в течение минуты."
-        ],
-        "distraction": [
-            "Позвоните другу или члену семьи.",
-            "Выйдите на короткую прогулку.",
-            "Включите любимую энергичную музыку и подвигайтесь под неё."
-        ]
-    }
-
-    if tip_type in tips:
-        tip = random.choice(tips[tip_type])
-        emergency_text = f"🆘 *Экстренная помощь:*\n\n{tip}\n\nВы справитесь! Оставайтесь сильными!"
-    else:
-        tip = random.choice(EMERGENCY_TIPS)
-        emergency_text = f"🆘 *Экстренная помощь:*\n\n{tip}\n\nВы справитесь! Оставайтесь сильными!"
-
-    keyboard = [
-        [InlineKeyboardButton("🔄 Другой совет", callback_data="back_to_emergency")],
-        [InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    tips = catalog.emergency_tips_by_type.get(tip_type, catalog.emergency_tips)
+    emergency_text = catalog.text("emergency_tip", tip=random.choice(tips))
 
-    query.edit_message_text(
+    await query.edit_message_text(
         text=emergency_text,
-        reply_markup=reply_markup,
+        reply_markup=catalog.emergency_tip_keyboard,
         parse_mode=ParseMode.MARKDOWN
     )
 
     return EMERGENCY_HELP
 
 # Показать достижения
-def show_achievements(update: Update, context: CallbackContext) -> int:
+async def show_achievements(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = update.effective_user.id
+    catalog = get_catalog(context)
+    locale = catalog.locale
 
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
-
-    cursor.execute(
+    earned_rows = await storage.afetchall(
         "SELECT achievement, achieved_date FROM achievements WHERE user_id = ? ORDER BY achieved_date",
         (user_id,)
     )
-    achievements = cursor.fetchall()
-
-    achievement_descriptions = {
-        "3_days": "🥉 3 дня без срывов",
-        "7_days": "🥈 7 дней без срывов",
-        "14_days": "🥇 14 дней без срывов",
-        "28_days": "🏆 28 дней без срывов"
-    }
 
-    if achievements:
-        text = "🏆 *Ваши достижения:*\n\n"
+    if earned_rows:
+        text = catalog.text("achievements_earned")
 
-        for achievement, date in achievements:
-            desc = achievement_descriptions.get(achievement, achievement)
-            text += f"{desc} - получено {date}\n"
+        for achievement, date in earned_rows:
+            text += catalog.text("achievement_line", title=achievements.title(achievement, locale), date=date)
 
         # Показать неполученные достижения
-        text += "\n*Предстоящие достижения:*\n"
-        earned = [a[0] for a in achievements]
+        text += catalog.text("achievements_upcoming")
+        earned = {row[0] for row in earned_rows}
 
-        for ach, desc in achievement_descriptions.items():
-            if ach not in earned:
-                text += f"☐ {desc}\n"
+        for key in achievements.keys():
+            if key not in earned:
+                text += f"☐ {achievements.title(key, locale)}\n"
     else:
-        text = (
-            "🏆 *Достижения:*\n\n"
-            "У вас пока нет достижений. Продолжайте стараться!\n\n"
-            "*Доступные достижения:*\n"
-            "☐ 🥉 3 дня без срывов\n"
-            "☐ 🥈 7 дней без срывов\n"
-            "☐ 🥇 14 дней без срывов\n"
-            "☐ 🏆 28 дней без срывов"
+        text = catalog.text("achievements_none") + "\n".join(
+            f"☐ {achievements.title(key, locale)}" for key in achievements.keys()
         )
 
-    conn.close()
-
-    keyboard = [
-        [InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = catalog.back_to_menu_keyboard
 
     if isinstance(update.callback_query, type(None)):
-        update.message.reply_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
     else:
-        update.callback_query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.callback_query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
 
     # Если это была команда, а не callback, возвращаем ConversationHandler.END
     if isinstance(update.callback_query, type(None)):
@@ -652,92 +582,66 @@ def show_achievements(update: Update, context: CallbackContext) -> int:
     return MAIN_MENU
 
 # Настройка напоминаний
-def reminder_settings(update: Update, context: CallbackContext):
+async def reminder_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
+    catalog = get_catalog(context)
 
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT reminder_enabled, reminder_time FROM users WHERE user_id = ?",
-        (user_id,)
-    )
-    result = cursor.fetchone()
+    profile = await profiles.aget(user_id)
 
-    if result:
-        enabled, time = result
-
-        text = (
-            f"⏰ *Настройки напоминаний*\n\n"
-            f"Статус: {'Включены' if enabled else 'Выключены'}\n"
-            f"Время: {time}\n\n"
-            f"Чтобы изменить настройки, используйте следующие команды:\n"
-            f"/reminder_on - Включить напоминания\n"
-            f"/reminder_off - Выключить напоминания\n"
-            f"/set_time ЧЧ:ММ - Установить время напоминания (например, /set_time 20:00)"
+    if profile:
+        status = catalog.text("reminder_status_on" if profile["reminder_enabled"] else "reminder_status_off")
+        text = catalog.text(
+            "reminder_settings",
+            status=status,
+            time=profile["reminder_time"],
+            timezone=escape_markdown(timezones.describe(profile["timezone"]))
         )
 
-        update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
 
-    conn.close()
     return ConversationHandler.END
 
 # Включение напоминаний
-def reminder_on(update: Update, context: CallbackContext):
+async def reminder_on(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
+    catalog = get_catalog(context)
 
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "UPDATE users SET reminder_enabled = 1 WHERE user_id = ?",
-        (user_id,)
-    )
-    conn.commit()
-
-    cursor.execute(
-        "SELECT reminder_time FROM users WHERE user_id = ?",
-        (user_id,)
-    )
-    time = cursor.fetchone()[0]
+    await storage.run(reminders.update, user_id, reminder_enabled=1)
+    profiles.update(user_id, reminder_enabled=1)
 
-    conn.close()
+    profile = await profiles.aget(user_id)
+    time = profile["reminder_time"]
 
-    update.message.reply_text(
-        f"✅ Напоминания включены. Вы будете получать уведомления каждый день в {time}.",
+    await update.message.reply_text(
+        catalog.text("reminder_on", time=time),
         parse_mode=ParseMode.MARKDOWN
     )
 
     return ConversationHandler.END
 
 # Выключение напоминаний
-def reminder_off(update: Update, context: CallbackContext):
+async def reminder_off(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
+    catalog = get_catalog(context)
 
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "UPDATE users SET reminder_enabled = 0 WHERE user_id = ?",
-        (user_id,)
-    )
-    conn.commit()
-    conn.close()
+    await storage.run(reminders.update, user_id, reminder_enabled=0)
+    profiles.update(user_id, reminder_enabled=0)
 
-    update.message.reply_text(
-        "❌ Напоминания выключены.",
+    await update.message.reply_text(
+        catalog.text("reminder_off"),
         parse_mode=ParseMode.MARKDOWN
     )
 
     return ConversationHandler.END
 
 # Установка времени напоминаний
-def set_reminder_time(update: Update, context: CallbackContext):
+async def set_reminder_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
+    catalog = get_catalog(context)
 
     if not context.args or len(context.args) != 1:
-        update.message.reply_text(
-            "⚠️ Пожалуйста, укажите время в формате ЧЧ:ММ, например: /set_time 20:00",
+        await update.message.reply_text(
+            catalog.text("set_time_usage"),
             parse_mode=ParseMode.MARKDOWN
         )
         return ConversationHandler.END
@@ -750,8 +654,8 @@ def set_reminder_time(update: Update, context: CallbackContext):
         if not (0 <= hours < 24 and 0 <= minutes < 60):
             raise ValueError
     except ValueError:
-        update.message.reply_text(
-            "⚠️ Неверный формат времени. Пожалуйста, используйте формат ЧЧ:ММ, например: 20:00",
+        await update.message.reply_text(
+            catalog.text("set_time_invalid"),
             parse_mode=ParseMode.MARKDOWN
         )
         return ConversationHandler.END
@@ -759,138 +663,347 @@ def set_reminder_time(update: Update, context: CallbackContext):
     # Форматирование времени для сохранения
     formatted_time = f"{hours:02d}:{minutes:02d}"
 
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
+    await storage.run(reminders.update, user_id, reminder_time=formatted_time)
+    profiles.update(user_id, reminder_time=formatted_time)
 
-    cursor.execute(
-        "UPDATE users SET reminder_time = ? WHERE user_id = ?",
-        (formatted_time, user_id)
+    await update.message.reply_text(
+        catalog.text("set_time_done", time=formatted_time),
+        parse_mode=ParseMode.MARKDOWN
     )
-    conn.commit()
-    conn.close()
 
-    update.message.reply_text(
-        f"⏰ Время напоминаний установлено на {formatted_time}.",
-        parse_mode=ParseMode.MARKDOWN
+    return ConversationHandler.END
+
+# Установка часового пояса: /timezone Europe/Moscow или /timezone +3. Без аргументов - текущий пояс
+async def set_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    catalog = get_catalog(context)
+
+    profile = await profiles.aget(user_id)
+    if profile is None:
+        return ConversationHandler.END
+
+    if not context.args:
+        zone = profile["timezone"]
+        await update.message.reply_text(catalog.text(
+            "timezone_current", timezone=timezones.describe(zone), time=timezones.now(zone).strftime("%H:%M")
+        ))
+        return ConversationHandler.END
+
+    zone = timezones.parse(" ".join(context.args))
+    if zone is None:
+        await update.message.reply_text(catalog.text("timezone_invalid"))
+        return ConversationHandler.END
+
+    await storage.run(reminders.update, user_id, timezone=zone)
+    profiles.update(user_id, timezone=zone)
+
+    await update.message.reply_text(
+        catalog.text("timezone_done", timezone=zone, time=timezones.now(zone).strftime("%H:%M"))
     )
 
     return ConversationHandler.END
 
 # Функция для запуска чата
-def start_chat(update: Update, context: CallbackContext):
+async def start_chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username or update.effective_user.first_name
+    catalog = get_catalog(context)
 
-    text = (
-        "💬 *Чат сообщества*\n\n"
-        "Здесь вы можете общаться с другими пользователями, делиться опытом и поддерживать друг друга.\n\n"
-        "Просто отправьте сообщение, и оно будет видно всем участникам чата.\n"
-        "Для выхода из чата используйте команду /exit_chat"
+    # Добавляем пользователя в участники чата его языка
+    joined = await storage.run(
+        chat.join, user_id, catalog.locale, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     )
 
-    # Добавляем пользователя в словарь активных чатов
-    context.user_data['in_chat'] = True
-
-    update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+    await update.message.reply_text(catalog.text("chat_welcome"), parse_mode=ParseMode.MARKDOWN)
 
     # Отправляем уведомление всем в чате о новом пользователе
-    broadcast_message(context, f"👋 Пользователь {username} присоединился к чату!", user_id)
+    if joined:
+        await broadcast_message(context, catalog.text("chat_joined", username=username), user_id)
 
     return ConversationHandler.END
 
 # Функция для выхода из чата
-def exit_chat(update: Update, context: CallbackContext):
+async def exit_chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username or update.effective_user.first_name
+    catalog = get_catalog(context)
 
-    # Удаляем пользователя из словаря активных чатов
-    if 'in_chat' in context.user_data:
-        del context.user_data['in_chat']
+    # Удаляем пользователя из участников чата
+    left = await storage.run(chat.leave, user_id)
 
-    update.message.reply_text(
-        "Вы вышли из чата сообщества. Используйте /chat, чтобы вернуться в чат.",
+    await update.message.reply_text(
+        catalog.text("chat_exit"),
         parse_mode=ParseMode.MARKDOWN
     )
 
     # Отправляем уведомление всем в чате о выходе пользователя
-    broadcast_message(context, f"👋 Пользователь {username} покинул чат.", user_id)
+    if left:
+        await broadcast_message(context, catalog.text("chat_left", username=username), user_id)
 
     return ConversationHandler.END
 
 # Обработка сообщений в чате
-def handle_chat_message(update: Update, context: CallbackContext):
+async def handle_chat_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username or update.effective_user.first_name
     message_text = update.message.text
+    catalog = get_catalog(context)
 
     # Проверяем, находится ли пользователь в чате
-    if not context.user_data.get('in_chat', False):
+    if not chat.is_member(user_id, catalog.locale):
         return
 
-    # Сохраняем сообщение в БД
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
-
+    # Сохраняем сообщение в БД: запись идёт пачками в фоне
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    cursor.execute(
-        "INSERT INTO chat_messages (user_id, username, message, timestamp) VALUES (?, ?, ?, ?)",
-        (user_id, username, message_text, timestamp)
-    )
-    conn.commit()
-    conn.close()
+    await chat_log.append(user_id, username, message_text, timestamp, catalog.locale)
 
     # Отправляем сообщение всем пользователям в чате
-    formatted_message = f"💬 {username}: {message_text}"
-    broadcast_message(context, formatted_message, user_id)
+    formatted_message = catalog.text("chat_message", username=username, text=message_text)
+    await broadcast_message(context, formatted_message, user_id)
 
     return ConversationHandler.END
 
+# История чата: последние сообщения комнаты
+async def show_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    catalog = get_catalog(context)
+
+    text, reply_markup = await storage.run(history.page, catalog.locale)
+
+    await update.message.reply_text(text, reply_markup=reply_markup)
+
+    return ConversationHandler.END
+
+# Переход по страницам истории чата
+async def history_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    locale = get_catalog(context).locale
+
+    if query.data.startswith("history_newer_"):
+        before = await storage.run(history.newer, locale, int(query.data.replace("history_newer_", "")))
+    else:
+        before = int(query.data.replace("history_", ""))
+
+    text, reply_markup = await storage.run(history.page, locale, before)
+
+    await query.edit_message_text(text=text, reply_markup=reply_markup)
+
+# Поиск по сообщениям чата
+async def search_chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    catalog = get_catalog(context)
+    query = " ".join(context.args or [])
+
+    # Запрос запоминается, чтобы кнопки страниц несли только номер страницы
+    context.user_data['search_query'] = query
+
+    text, reply_markup = await storage.run(search.page, catalog.locale, query)
+
+    await update.message.reply_text(text, reply_markup=reply_markup)
+
+    return ConversationHandler.END
+
+# Переход по страницам результатов поиска
+async def search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    locale = get_catalog(context).locale
+
+    search_query = context.user_data.get('search_query', '')
+    page = int(query.data.replace("search_", ""))
+
+    text, reply_markup = await storage.run(search.page, locale, search_query, page)
+
+    await query.edit_message_text(text=text, reply_markup=reply_markup)
+
+# Профилирование по команде администратора: /profile [N | Ns | stop] - следующие N обновлений,
+# N секунд или остановка. Отчёты пишутся в config.PROFILE_DIR, пути к ним приходят сообщением
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    catalog = get_catalog(context)
+    arg = context.args[0].lower() if context.args else str(PROFILE_DEFAULT_UPDATES)
+
+    if arg == "stop":
+        if profiler.stop() is None:
+            await update.message.reply_text(catalog.text("profile_not_running"))
+        return
+
+    updates = seconds = None
+    if arg.isdigit():
+        updates = int(arg)
+    elif arg.endswith("s") and arg[:-1].isdigit():
+        seconds = int(arg[:-1])
+
+    if not updates and not seconds:
+        await update.message.reply_text(catalog.text("profile_usage"))
+        return
+
+    bot = context.bot
+    chat_id = update.effective_chat.id
+
+    async def send_report(paths):
+        await bot.send_message(chat_id=chat_id, text=catalog.text("profile_done", files="\n".join(paths)))
+
+    if not profiler.start(updates, seconds, send_report):
+        await update.message.reply_text(catalog.text("profile_running"))
+        return
+
+    limit = catalog.text("profile_updates", count=updates) if updates else catalog.text("profile_seconds", count=seconds)
+    await update.message.reply_text(catalog.text("profile_started", limit=limit))
+
 # Функция для рассылки сообщений всем пользователям в чате
-def broadcast_message(context, message, sender_id=None):
-    conn = sqlite3.connect('nofap_bot.db')
-    cursor = conn.cursor()
-
-    # Получаем всех пользователей
-    cursor.execute("SELECT user_id FROM users")
-    users = cursor.fetchall()
-
-    conn.close()
-
-    # Отправляем сообщение всем, кроме отправителя
-    for user in users:
-        user_id = user[0]
-        if user_id != sender_id:
-            try:
-                context.bot.send_message(
-                    chat_id=user_id,
-                    text=message,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            except Exception as e:
-                logger.error(f"Ошибка при отправке сообщения пользователю {user_id}: {e}")
+async def broadcast_message(context, message, sender_id=None):
+    locale = context.bot_data.get('locale', i18n.DEFAULT_LOCALE)
+
+    # Отправляем сообщение всем участникам чата этого языка, кроме отправителя
+    recipients = await storage.run(chat.members, locale)
+    messages = [(user_id, message) for user_id in recipients if user_id != sender_id]
+
+    # Рассылка сначала записывается в исходящие: при падении бота неотправленное уйдёт после перезапуска
+    count = await storage.run(outbox.enqueue, locale, messages, f"чат ({locale})", ParseMode.MARKDOWN)
+    outbox.notify()
+    return count
 
 # Функция для проверки напоминаний
-def check_reminders(context: CallbackContext):
+async def check_reminders(context: ContextTypes.DEFAULT_TYPE):
     try:
-        send_reminders(context)
+        await send_reminders(context)
     except Exception as e:
         logger.error(f"Ошибка при проверке напоминаний: {e}")
 
+# Аренда напоминаний: у каждого номера обработчика своя, её держит один экземпляр бота
+def reminder_lease():
+    return f"reminders:{shards.INDEX}"
+
+# Процесс - действующий ведущий по аренде: срок не истёк, и жетон в базе совпадает с полученным.
+# Ведущий, который завис дольше срока аренды, после пробуждения это не пройдёт
+async def is_leader(name):
+    return await storage.run(leader.fence, name, leader.token(name))
+
+# Продление аренд. Аренда, полученная от другого экземпляра, начинает выполнение его заданий
+async def renew_leases(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        await storage.run(leader.acquire, reminder_lease())
+
+        if shards.INDEX == 0:
+            _, gained = await storage.run(leader.acquire, MAINTENANCE_LEASE)
+            if gained:
+                schedule_backfills(context.job_queue)
+    except Exception as e:
+        logger.error(f"Ошибка при продлении аренды: {e}")
+
+# Задания задним числом запускаются, когда процесс получает аренду обслуживания
+def schedule_backfills(job_queue):
+    # Выдача достижений, добавленных в таблицу после того, как пользователи их заслужили
+    job_queue.run_once(backfill_achievements, when=0)
+
+    # Индексация сообщений, записанных до появления поискового индекса
+    job_queue.run_once(backfill_search, when=0)
+
+# Функция для выдачи достижений задним числом
+async def backfill_achievements(context: ContextTypes.DEFAULT_TYPE):
+    if not await is_leader(MAINTENANCE_LEASE):
+        return
+
+    try:
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        await storage.run(achievements.backfill, today)
+    except Exception as e:
+        logger.error(f"Ошибка при выдаче достижений: {e}")
+
+# Заполнение поискового индекса старыми сообщениями
+async def backfill_search(context: ContextTypes.DEFAULT_TYPE):
+    if not await is_leader(MAINTENANCE_LEASE):
+        return
+
+    try:
+        await storage.run(search.backfill)
+    except Exception as e:
+        logger.error(f"Ошибка при заполнении поискового индекса: {e}")
+
+# Перенос старых сообщений чата в архив
+async def compact_chat(context: ContextTypes.DEFAULT_TYPE):
+    if not await is_leader(MAINTENANCE_LEASE):
+        return
+
+    try:
+        await storage.run(chat_archive.compact)
+    except Exception as e:
+        logger.error(f"Ошибка при архивации чата: {e}")
+
+# Удаление старых недоставленных сообщений
+async def prune_outbox(context: ContextTypes.DEFAULT_TYPE):
+    if not await is_leader(MAINTENANCE_LEASE):
+        return
+
+    try:
+        await storage.run(outbox.prune_dead)
+    except Exception as e:
+        logger.error(f"Ошибка при очистке недоставленных сообщений: {e}")
+
+# Метка обновления для метрик: команда, данные кнопки без номера или "text"
+def update_label(update):
+    if update.callback_query is not None:
+        label = "callback:" + _CALLBACK_ID.sub("", update.callback_query.data or "")
+    elif update.message is not None and update.message.text:
+        text = update.message.text
+        if text.startswith('/'):
+            command = text.split()[0][1:].split('@')[0].lower()
+            label = "/" + command if command in _commands else "/other"
+        else:
+            label = "text"
+    else:
+        label = "other"
+
+    if label not in _handler_labels:
+        if len(_handler_labels) >= MAX_HANDLER_LABELS:
+            return "other"
+        _handler_labels.add(label)
+
+    return label
+
+# Начало обработки обновления (группа -1, до всех обработчиков)
+async def track_update_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    _update_started[id(update)] = time.perf_counter()
+
+# Конец обработки обновления (последняя группа; выполняется и после ошибки в обработчике)
+async def track_update_end(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    started = _update_started.pop(id(update), None)
+    if started is not None:
+        UPDATE_DURATION.observe(time.perf_counter() - started, context.bot_data['locale'], update_label(update))
+        profiler.update_done(started)
+
+# Обработчик ошибок: учёт в метриках и запись в лог с трассировкой
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
+    if isinstance(update, Update):
+        UPDATE_ERRORS.inc(context.bot_data['locale'], update_label(update))
+    logger.error(f"Ошибка при обработке обновления: {context.error}", exc_info=context.error)
+
 # Функция для поддержания работы Replit
 def keep_alive():
     while True:
         time.sleep(60)
 
-def main():
-    # Инициализация базы данных
-    init_db()
+# Создание приложения бота для одного языка
+def build_application(locale, token, request, primary):
+    builder = (
+        Application.builder()
+        .token(token)
+        .request(request)
+        .concurrent_updates(ordering.UserOrderedProcessor(CONCURRENT_UPDATES))
+    )
 
-    # Создание Updater
-    updater = Updater(TOKEN)
+    if config.BOT_API_URL:
+        builder = builder.base_url(f"{config.BOT_API_URL}/bot").base_file_url(f"{config.BOT_API_URL}/file/bot")
 
-    # Получение диспетчера для регистрации обработчиков
-    dispatcher = updater.dispatcher
+    # Планировщик общий: задания запускаются только в основном приложении
+    if not primary:
+        builder = builder.job_queue(None)
+
+    # user_data и состояния диалогов переживают перезапуск
+    builder = builder.persistence(persistence.SqlitePersistence(locale))
+
+    application = builder.build()
+    application.bot_data['locale'] = locale
 
     # Создание ConversationHandler
     conv_handler = ConversationHandler(
@@ -921,24 +1034,95 @@ def main():
                 CallbackQueryHandler(button_handler)
             ]
         },
-        fallbacks=[CommandHandler('start', start)]
+        fallbacks=[CommandHandler('start', start)],
+        name='main',
+        persistent=True,
+        # Состояние диалога переживает перезапуск, поэтому команды меню должны работать и внутри него
+        allow_reentry=True
     )
 
-    dispatcher.add_handler(conv_handler)
+    # История, поиск и часовой пояс работают и внутри, и вне диалога, поэтому их обработчики стоят
+    # перед ConversationHandler
+    application.add_handler(CommandHandler('timezone', set_timezone))
+    application.add_handler(CommandHandler('history', show_history))
+    application.add_handler(CallbackQueryHandler(history_page, pattern=r"^history_"))
+    application.add_handler(CommandHandler('search', search_chat))
+    application.add_handler(CallbackQueryHandler(search_page, pattern=r"^search_"))
+    application.add_handler(CommandHandler('profile', profile_command, filters=filters.User(user_id=config.ADMIN_IDS)))
+
+    application.add_handler(conv_handler)
 
     # Обработчик текстовых сообщений для чата
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_chat_message))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_chat_message))
+
+    # Замер времени обработки: отметки до и после всех обработчиков
+    application.add_handler(TypeHandler(Update, track_update_start), group=-1)
+    application.add_handler(TypeHandler(Update, track_update_end), group=1)
+    application.add_error_handler(error_handler)
+
+    for handler in application.handlers[0]:
+        handlers = handler.entry_points + handler.fallbacks if isinstance(handler, ConversationHandler) else [handler]
+        _commands.update(*(h.commands for h in handlers if isinstance(h, CommandHandler)))
+
+    return application
+
+def main():
+    # Инициализация базы данных
+    init_db()
+
+    # Несколько процессов-обработчиков: этот процесс только получает обновления и раздаёт их
+    if config.BOT_WORKERS > 1:
+        shards.run(config.BOT_WORKERS, serve)
+    else:
+        serve()
+
+# Работа ботов в этом процессе. worker_queue - очередь обновлений от входного процесса,
+# если процесс - один из обработчиков
+def serve(worker_queue=None):
+    # Аренды ведущего: если бот запущен в нескольких экземплярах, задания выполняет один
+    leader.acquire(reminder_lease())
+    maintenance, _ = leader.acquire(MAINTENANCE_LEASE) if shards.INDEX == 0 else (None, False)
+
+    # Загрузка участников чата в память
+    chat.load()
 
-    # Запускаем Job для проверки напоминаний каждую минуту
-    job_queue = updater.job_queue
-    job_queue.run_repeating(check_reminders, interval=60, first=0)
+    # Одно приложение на каждый токен; пул HTTP-соединений для запросов к Bot API у всех ботов общий
+    request = HTTPXRequest(connection_pool_size=CONNECTION_POOL_SIZE)
+    applications = {}
+
+    for locale, token in config.BOT_TOKENS.items():
+        applications[locale] = build_application(locale, token, request, primary=not applications)
+        BOTS[locale] = applications[locale].bot
+        APPLICATIONS[locale] = applications[locale]
+
+    # Запускаем Job для проверки напоминаний каждые reminders.TICK_INTERVAL секунд;
+    # каждый обработчик напоминает своим пользователям
+    job_queue = next(iter(applications.values())).job_queue
+    job_queue.run_repeating(check_reminders, interval=reminders.TICK_INTERVAL, first=0)
+    job_queue.run_repeating(renew_leases, interval=leader.RENEW_INTERVAL, first=leader.RENEW_INTERVAL)
+
+    # Задания над всей базой выполняет только первый обработчик ведущего экземпляра
+    if shards.INDEX == 0:
+        if maintenance is not None:
+            schedule_backfills(job_queue)
+
+        # Архивация старых сообщений чата раз в сутки
+        job_queue.run_repeating(compact_chat, interval=chat_archive.COMPACTION_INTERVAL, first=60)
+
+        # Очистка недоставленных сообщений раз в сутки
+        job_queue.run_repeating(prune_outbox, interval=86400, first=120)
 
     # Запуск бота в отдельном потоке для keep_alive
-    Thread(target=keep_alive).start()
+    Thread(target=keep_alive, daemon=True).start()
+
+    # Запуск всех ботов в одном цикле событий: через вебхук, если он выбран в настройках, иначе опросом
+    asyncio.run(runner.run(applications, worker_queue))
+
+    # Другой экземпляр забирает задания сразу, не дожидаясь истечения аренды
+    leader.release_all()
 
-    # Запуск бота
-    updater.start_polling()
-    updater.idle()
+    # Закрываем соединения с БД после остановки
+    storage.close_all()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,95 @@
+import time
+import threading
+
+import storage
+
+# Участники чатов сообщества, у каждого языка своя комната. Таблица chat_members - источник истины,
+# множества в памяти (язык -> user_id) - её зеркало, чтобы рассылка не ходила в БД
+_members = {}
+_lock = threading.Lock()
+
+# Несколько процессов-обработчиков: в комнаты входят и пользователи других процессов,
+# поэтому зеркало для рассылки перечитывается из БД не реже раза в MEMBERS_REFRESH секунд
+SHARED = False
+MEMBERS_REFRESH = 1
+_loaded_at = 0
+
+
+# Создание таблицы участников чата
+def create_table(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS chat_members (
+        user_id INTEGER PRIMARY KEY,
+        joined_at TEXT
+    )
+    ''')
+    storage.add_column(cursor, "chat_members", "locale", "TEXT DEFAULT 'ru'")
+
+
+# Загрузка участников из БД при запуске бота
+def load():
+    global _loaded_at
+
+    rows = storage.fetchall("SELECT user_id, locale FROM chat_members")
+
+    with _lock:
+        _loaded_at = time.monotonic()
+        _members.clear()
+        for user_id, locale in rows:
+            _members.setdefault(locale, set()).add(user_id)
+
+
+# Вход в чат. Возвращает False, если пользователь уже был участником этой комнаты
+def join(user_id, locale, joined_at):
+    with storage.transaction() as cursor:
+        cursor.execute(
+            "SELECT locale FROM chat_members WHERE user_id = ?",
+            (user_id,)
+        )
+        row = cursor.fetchone()
+
+        if row is not None and row[0] == locale:
+            return False
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO chat_members (user_id, joined_at, locale) VALUES (?, ?, ?)",
+            (user_id, joined_at, locale)
+        )
+
+    # Пользователь может состоять только в одной комнате
+    with _lock:
+        for members in _members.values():
+            members.discard(user_id)
+        _members.setdefault(locale, set()).add(user_id)
+
+    return True
+
+
+# Выход из чата. Возвращает False, если пользователь не был участником
+def leave(user_id):
+    deleted = storage.execute(
+        "DELETE FROM chat_members WHERE user_id = ?",
+        (user_id,)
+    )
+
+    with _lock:
+        for members in _members.values():
+            members.discard(user_id)
+
+    return deleted > 0
+
+
+# Проверка, находится ли пользователь в комнате указанного языка
+def is_member(user_id, locale):
+    with _lock:
+        return user_id in _members.get(locale, ())
+
+
+# Снимок текущих участников комнаты для рассылки. В многопроцессном режиме может перечитать таблицу,
+# поэтому из обработчиков вызывается через storage.run
+def members(locale):
+    if SHARED and time.monotonic() - _loaded_at > MEMBERS_REFRESH:
+        load()
+
+    with _lock:
+        return list(_members.get(locale, ()))
@@ -0,0 +1,135 @@
+import re
+import logging
+import datetime
+
+import config
+import storage
+import history
+
+logger = logging.getLogger(__name__)
+
+# Файл архива сообщений чата. Каждый месяц хранится в своей таблице chat_messages_ГГГГ_ММ,
+# поэтому истёкший месяц удаляется целиком через DROP TABLE, без построчного DELETE
+ARCHIVE_PATH = 'nofap_bot_archive.db'
+
+# Сколько строк переносится одной транзакцией, чтобы не держать блокировку записи долго
+BATCH_ROWS = 5000
+
+# Сколько свободных страниц возвращать файлу за один проход (0 - все)
+VACUUM_PAGES = 0
+
+# Как часто запускать уплотнение
+COMPACTION_INTERVAL = 24 * 60 * 60
+
+_MONTH = re.compile(r"\d{4}-\d{2}")
+
+
+# Имя месячной таблицы архива по строке "ГГГГ-ММ"
+def _table(month):
+    if not _MONTH.fullmatch(month):
+        return "chat_messages_unknown"
+    return "chat_messages_" + month.replace('-', '_')
+
+
+# Перенос одной пачки старых сообщений в архив. В режиме WAL транзакция над присоединённой базой
+# не атомарна между файлами, поэтому перенос идёт в две транзакции: сначала вставка в архив, затем
+# удаление из основной базы только тех сообщений, которые уже есть в архиве. Вставка идемпотентна
+# (по message_id), поэтому прерванный перенос безопасно повторяется при следующем запуске
+def _move_batch(cutoff):
+    with storage.transaction() as cursor:
+        cursor.execute(
+            "SELECT message_id, user_id, username, message, timestamp, locale FROM main.chat_messages "
+            "WHERE timestamp < ? ORDER BY timestamp LIMIT ?",
+            (cutoff, BATCH_ROWS)
+        )
+        rows = cursor.fetchall()
+
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(_table((row[4] or '')[:7]), []).append(row)
+
+        for table, month_rows in by_month.items():
+            cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS archive.{table} (
+                message_id INTEGER PRIMARY KEY,
+                user_id INTEGER,
+                username TEXT,
+                message TEXT,
+                timestamp TEXT,
+                locale TEXT
+            )
+            ''')
+            cursor.executemany(
+                f"INSERT OR IGNORE INTO archive.{table} VALUES (?, ?, ?, ?, ?, ?)",
+                month_rows
+            )
+
+    # Архив уже записан на диск: из основной базы удаляются только подтверждённые в нём сообщения
+    with storage.transaction() as cursor:
+        for table, month_rows in by_month.items():
+            cursor.executemany(
+                f"DELETE FROM main.chat_messages WHERE message_id = ? "
+                f"AND EXISTS (SELECT 1 FROM archive.{table} WHERE message_id = ?)",
+                [(row[0], row[0]) for row in month_rows]
+            )
+
+    return len(rows)
+
+
+# Удаление месячных таблиц архива старше срока хранения
+def _drop_expired(now):
+    if config.CHAT_ARCHIVE_MONTHS <= 0:
+        return []
+
+    total = now.year * 12 + now.month - 1 - config.CHAT_ARCHIVE_MONTHS
+    oldest_kept = _table(f"{total // 12:04d}-{total % 12 + 1:02d}")
+
+    rows = storage.fetchall(
+        "SELECT name FROM archive.sqlite_master WHERE type = 'table' AND name LIKE 'chat_messages_%'"
+    )
+    expired = sorted(name for (name,) in rows if name < oldest_kept)
+
+    if expired:
+        with storage.transaction() as cursor:
+            for name in expired:
+                cursor.execute(f"DROP TABLE archive.{name}")
+
+    return expired
+
+
+# Уплотнение чата: перенос сообщений старше CHAT_RETENTION_DAYS в архив, удаление истёкших месяцев
+# архива и возврат освободившегося места (выполняется в потоке БД)
+def compact(now=None):
+    now = now or datetime.datetime.now()
+    cutoff = (now - datetime.timedelta(days=config.CHAT_RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+
+    conn = storage.get_connection()
+    conn.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_PATH,))
+
+    try:
+        storage.enable_incremental_vacuum('archive')
+
+        moved = 0
+        while True:
+            count = _move_batch(cutoff)
+            moved += count
+            if count < BATCH_ROWS:
+                break
+
+        expired = _drop_expired(now)
+
+        # Кэшированные страницы могли ссылаться на перенесённые сообщения
+        if moved:
+            history.clear()
+
+        freed = storage.incremental_vacuum('main', VACUUM_PAGES)
+        freed += storage.incremental_vacuum('archive', VACUUM_PAGES)
+    finally:
+        conn.execute("DETACH DATABASE archive")
+
+    logger.info(
+        f"Уплотнение чата: в архив перенесено {moved}, удалено месяцев архива {len(expired)}, "
+        f"освобождено страниц {freed}"
+    )
+
+    return moved, expired
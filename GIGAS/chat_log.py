@@ -0,0 +1,134 @@
+import asyncio
+import logging
+
+import storage
+import history
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Сообщения чата пишутся в БД пачками: раз в FLUSH_INTERVAL секунд или как только набралось BATCH_ROWS строк
+FLUSH_INTERVAL = 0.2
+BATCH_ROWS = 500
+
+# Сколько сообщений может ждать записи. Когда очередь полна, обработчики ждут свободного места
+MAX_PENDING = 10000
+
+# Сколько раз пытаться записать пачку, прежде чем её отбросить, и пауза перед первым повтором
+# (дальше удваивается). База бывает временно занята архивацией чата или VACUUM
+WRITE_ATTEMPTS = 5
+RETRY_DELAY = 0.5
+
+# Сколько ждать записи оставшихся сообщений при остановке бота
+SHUTDOWN_TIMEOUT = 30
+
+_queue = None
+_flusher = None
+_batch_ready = None
+
+_written = 0
+_batches = 0
+_dropped = 0
+
+metrics.Gauge('bot_chat_log_pending', "Сообщений чата в очереди на запись", func=lambda: stats()['pending'])
+metrics.Counter('bot_chat_log_written_total', "Записано сообщений чата", func=lambda: _written)
+metrics.Counter('bot_chat_log_batches_total', "Транзакций записи сообщений чата", func=lambda: _batches)
+metrics.Counter('bot_chat_log_dropped_total', "Сообщений чата, не записанных после всех повторов", func=lambda: _dropped)
+
+
+# Запись пачки сообщений одной транзакцией (выполняется в потоке БД)
+def _write(rows):
+    with storage.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO chat_messages (user_id, username, message, timestamp, locale) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+
+
+# Задача записи: ждёт первое сообщение, даёт пачке набраться и пишет её
+async def _flush_loop():
+    global _written, _batches, _dropped
+
+    while True:
+        rows = [await _queue.get()]
+
+        if _queue.qsize() + 1 < BATCH_ROWS:
+            try:
+                await asyncio.wait_for(_batch_ready.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        _batch_ready.clear()
+
+        while len(rows) < BATCH_ROWS and not _queue.empty():
+            rows.append(_queue.get_nowait())
+
+        try:
+            # Пачка повторяется с паузой, пока новые сообщения ждут в очереди за ней, поэтому порядок сохраняется
+            for attempt in range(WRITE_ATTEMPTS):
+                try:
+                    await storage.run(_write, rows)
+                except Exception as e:
+                    if attempt + 1 == WRITE_ATTEMPTS:
+                        _dropped += len(rows)
+                        logger.error(f"Ошибка при сохранении сообщений чата, потеряно {len(rows)} шт.: {e}")
+                        break
+
+                    delay = RETRY_DELAY * 2 ** attempt
+                    logger.warning(f"Ошибка при сохранении сообщений чата ({len(rows)} шт.), повтор через {delay} с: {e}")
+                    await asyncio.sleep(delay)
+                    continue
+
+                history.invalidate({row[4] for row in rows})
+                _written += len(rows)
+                _batches += 1
+                break
+        finally:
+            for _ in rows:
+                _queue.task_done()
+
+
+# Запуск задачи записи в текущем цикле событий (при первом сообщении)
+def _ensure_flusher():
+    global _queue, _flusher, _batch_ready
+
+    if _queue is None:
+        _queue = asyncio.Queue(MAX_PENDING)
+        _batch_ready = asyncio.Event()
+
+    if _flusher is None:
+        _flusher = asyncio.create_task(_flush_loop())
+
+
+# Постановка сообщения в очередь на запись. Ждёт только если очередь переполнена
+async def append(user_id, username, message, timestamp, locale):
+    _ensure_flusher()
+
+    await _queue.put((user_id, username, message, timestamp, locale))
+
+    if _queue.qsize() >= BATCH_ROWS:
+        _batch_ready.set()
+
+
+# Сколько сообщений записано и сколькими транзакциями
+def stats():
+    pending = _queue.qsize() if _queue is not None else 0
+    return {"written": _written, "batches": _batches, "pending": pending}
+
+
+# Запись оставшихся сообщений при завершении бота
+async def shutdown():
+    global _queue, _flusher
+
+    if _queue is not None and _flusher is not None:
+        _batch_ready.set()
+        try:
+            await asyncio.wait_for(_queue.join(), SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Не сохранено сообщений чата при остановке: {_queue.qsize()}")
+
+    if _flusher is not None:
+        _flusher.cancel()
+        await asyncio.gather(_flusher, return_exceptions=True)
+
+    _flusher = None
+    _queue = None
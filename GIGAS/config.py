@@ -0,0 +1,57 @@
+import os
+
+# Токены ботов по языкам. Все боты работают в одном процессе; английский запускается, если задан его токен
+BOT_TOKENS = {'ru': os.environ.get('TELEGRAM_TOKEN', '')}
+if os.environ.get('TELEGRAM_TOKEN_EN'):
+    BOT_TOKENS['en'] = os.environ['TELEGRAM_TOKEN_EN']
+
+# Адрес Bot API. Пустой - настоящий Telegram; для нагрузочных тестов указывается fake_telegram.py
+# (например, http://127.0.0.1:8081)
+BOT_API_URL = os.environ.get('TELEGRAM_API_URL', '')
+
+# Режим получения обновлений: "polling" (по умолчанию) или "webhook"
+BOT_MODE = os.environ.get('BOT_MODE', 'polling')
+
+# Число процессов-обработчиков. 1 - всё в одном процессе; больше 1 - входной процесс получает обновления
+# и раздаёт их обработчикам по user_id, база у всех общая
+BOT_WORKERS = max(1, int(os.environ.get('BOT_WORKERS', '1')))
+
+# Публичный адрес, на который Telegram будет отправлять обновления (например, https://example.com)
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL', '')
+
+# Локальный адрес и порт HTTP-сервера вебхука
+WEBHOOK_LISTEN = os.environ.get('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.environ.get('WEBHOOK_PORT', '8443'))
+
+# Путь, по которому принимаются обновления (к нему добавляется язык бота: /telegram/ru)
+WEBHOOK_PATH = os.environ.get('WEBHOOK_PATH', 'telegram')
+
+# Секрет, который Telegram присылает в заголовке X-Telegram-Bot-Api-Secret-Token.
+# Если не задан, генерируется при каждом запуске
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', '')
+
+# Часовой пояс пользователей, которые не выбрали свой (имя из базы IANA или смещение, например +3).
+# Пустой - часовой пояс сервера
+DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE', '')
+
+# Окно сглаживания напоминаний, в минутах: напоминание каждого пользователя сдвигается на постоянную
+# для него величину внутри окна после выбранного времени, чтобы не отправлять всех в одну минуту.
+# 0 - напоминания приходят точно в выбранное время
+REMINDER_SPREAD_MINUTES = int(os.environ.get('REMINDER_SPREAD_MINUTES', '0'))
+
+# Сколько дней сообщения чата хранятся в основной базе, прежде чем уйти в архив
+CHAT_RETENTION_DAYS = int(os.environ.get('CHAT_RETENTION_DAYS', '30'))
+
+# Сколько месяцев хранить архив сообщений чата (0 - хранить всегда)
+CHAT_ARCHIVE_MONTHS = int(os.environ.get('CHAT_ARCHIVE_MONTHS', '12'))
+
+
+# Адрес и порт HTTP-сервера метрик в формате Prometheus (GET /metrics). 0 - сервер не запускается
+METRICS_LISTEN = os.environ.get('METRICS_LISTEN', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '0'))
+
+# Telegram ID администраторов через запятую: им доступна команда /profile
+ADMIN_IDS = {int(user_id) for user_id in os.environ.get('ADMIN_IDS', '').split(',') if user_id.strip()}
+
+# Папка для отчётов профилирования
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
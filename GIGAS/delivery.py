@@ -0,0 +1,264 @@
+import time
+import asyncio
+import logging
+import datetime
+
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter, TimedOut, NetworkError, BadRequest
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Количество задач, отправляющих сообщения
+WORKERS = 32
+
+# Общий лимит Telegram на исходящие сообщения бота
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+
+# Лимит на один чат
+PER_CHAT_RATE = 1
+PER_CHAT_BURST = 3
+
+# Сколько раз повторять отправку после RetryAfter или сетевой ошибки
+MAX_ATTEMPTS = 5
+
+# После скольких корзин чатов начинать чистить неактивные
+CHAT_BUCKETS_SOFT_LIMIT = 10000
+
+# Сколько ждать опустошения очереди при остановке бота
+SHUTDOWN_TIMEOUT = 30
+
+
+# Метрики отправки; label - вид рассылки ("чат (ru)", "напоминания (en)")
+MESSAGES = metrics.Counter('bot_messages_total', "Исходящие сообщения по результату", ('label', 'result'))
+RETRIES = metrics.Counter(
+    'bot_message_retries_total', "Повторы отправки после RetryAfter и сетевых ошибок", ('label', 'reason')
+)
+metrics.Gauge(
+    'bot_delivery_queue_depth', "Сообщений в очереди доставки",
+    func=lambda: _queue.qsize() if _queue is not None else 0
+)
+
+
+# Ведро токенов: rate токенов в секунду, не больше capacity в запасе.
+# Используется только из цикла событий, поэтому блокировки не нужны
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Попытка взять токен. Возвращает 0, если токен получен, иначе сколько секунд подождать
+    def reserve(self):
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+
+        return (1 - self.tokens) / self.rate
+
+    # Ожидание токена
+    async def acquire(self):
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    # Приостановка выдачи токенов (после RetryAfter от Telegram)
+    def pause(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    # Ведро полностью восстановилось и его можно выбросить
+    def is_idle(self):
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+# Учёт одной рассылки и отчёт о её скорости. Результат каждого сообщения передаётся в _record
+# с ключом сообщения (его задаёт send_bulk) и ошибкой (None - отправлено)
+class DeliveryBatch:
+    # Повторять ли отправку после сетевой ошибки. Рассылка, которая сама планирует повторы, отключает это:
+    # иначе повторы пула складываются с её собственными
+    retry_network = True
+
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.started = time.monotonic()
+        self.finished = asyncio.Event()
+
+        if total == 0:
+            self.finished.set()
+
+    def _record(self, key, error, retries):
+        ok = error is None
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.retried += retries
+        MESSAGES.inc(self.label, 'sent' if ok else 'failed')
+
+        if self.sent + self.failed == self.total:
+            self._report()
+            self.finished.set()
+
+    def _report(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.total / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Рассылка '{self.label}': отправлено {self.sent}, ошибок {self.failed}, "
+            f"повторов {self.retried} за {elapsed:.1f} с ({rate:.1f} сообщ./с)"
+        )
+
+    # Ожидание завершения рассылки
+    async def wait(self):
+        await self.finished.wait()
+
+
+_queue = None
+_workers = []
+_global_bucket = None
+_chat_buckets = {}
+
+
+# Корзина лимита для конкретного чата
+def _chat_bucket(chat_id):
+    bucket = _chat_buckets.get(chat_id)
+
+    if bucket is None:
+        if len(_chat_buckets) >= CHAT_BUCKETS_SOFT_LIMIT:
+            for idle_id in [cid for cid, b in _chat_buckets.items() if b.is_idle()]:
+                del _chat_buckets[idle_id]
+
+        bucket = TokenBucket(PER_CHAT_RATE, PER_CHAT_BURST)
+        _chat_buckets[chat_id] = bucket
+
+    return bucket
+
+
+# Значение RetryAfter в секундах (число или timedelta в зависимости от версии библиотеки)
+def _retry_seconds(error):
+    retry_after = error.retry_after
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return retry_after
+
+
+# Отправка одного сообщения с соблюдением лимитов и повторами
+async def _deliver(bot, chat_id, text, parse_mode, batch, key):
+    retries = 0
+    chat_bucket = _chat_bucket(chat_id)
+
+    while True:
+        await chat_bucket.acquire()
+        await _global_bucket.acquire()
+
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+            batch._record(key, None, retries)
+            return
+        except RetryAfter as e:
+            # Telegram просит подождать - останавливаем все отправки, а не только эту
+            _global_bucket.pause(_retry_seconds(e))
+            RETRIES.inc(batch.label, 'retry_after')
+            error = e
+        except BadRequest as e:
+            # Неверный запрос (чат не найден и т.п.) повторять бесполезно, хотя это подкласс NetworkError
+            logger.error(f"Ошибка при отправке сообщения пользователю {chat_id}: {e}")
+            batch._record(key, e, retries)
+            return
+        except (TimedOut, NetworkError) as e:
+            if not batch.retry_network:
+                logger.error(f"Ошибка при отправке сообщения пользователю {chat_id}: {e}")
+                batch._record(key, e, retries)
+                return
+            RETRIES.inc(batch.label, 'network')
+            error = e
+        except Exception as e:
+            logger.error(f"Ошибка при отправке сообщения пользователю {chat_id}: {e}")
+            batch._record(key, e, retries)
+            return
+
+        retries += 1
+        if retries >= MAX_ATTEMPTS:
+            logger.error(f"Ошибка при отправке сообщения пользователю {chat_id}: {error}")
+            batch._record(key, error, retries)
+            return
+
+
+# Рабочая задача: берёт сообщения из общей очереди
+async def _worker():
+    while True:
+        bot, chat_id, text, parse_mode, batch, key = await _queue.get()
+        try:
+            await _deliver(bot, chat_id, text, parse_mode, batch, key)
+        finally:
+            _queue.task_done()
+
+
+# Запуск рабочих задач в текущем цикле событий (при первой рассылке)
+def _ensure_workers():
+    global _queue, _global_bucket
+
+    if _global_bucket is None:
+        _global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+
+    if _queue is None:
+        _queue = asyncio.Queue()
+
+    if not _workers:
+        for _ in range(WORKERS):
+            _workers.append(asyncio.create_task(_worker()))
+
+
+# Рассылка сообщений через пул рабочих задач.
+# messages - пары (chat_id, текст) или тройки (chat_id, текст, ключ). batch - свой учёт рассылки
+# (по умолчанию DeliveryBatch). Возвращает учёт рассылки сразу, не дожидаясь отправки
+def send_bulk(bot, messages, label, parse_mode=ParseMode.MARKDOWN, batch=None):
+    _ensure_workers()
+
+    messages = list(messages)
+    if batch is None:
+        batch = DeliveryBatch(label, len(messages))
+
+    for chat_id, text, *key in messages:
+        _queue.put_nowait((bot, chat_id, text, parse_mode, batch, key[0] if key else None))
+
+    return batch
+
+
+# Остановка рабочих задач при завершении бота: даём очереди опустеть, затем отменяем задачи
+async def shutdown():
+    global _queue
+
+    if _queue is not None and _workers:
+        try:
+            await asyncio.wait_for(_queue.join(), SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Не отправлено сообщений при остановке: {_queue.qsize()}")
+
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+
+    _workers.clear()
+    _queue = None
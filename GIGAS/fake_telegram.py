@@ -0,0 +1,195 @@
+# fake_telegram.py - локальная замена Bot API для нагрузочных тестов без доступа к Telegram.
+#
+# Запуск отдельно:
+#     python fake_telegram.py [порт] [задержка_мс] [доля_429] [доля_ошибок]
+# и бот с TELEGRAM_API_URL=http://127.0.0.1:<порт>. Обновления для бота отправляются
+# POST-запросом на /control/<токен>/updates, счётчики - GET /control/stats.
+# Обычно сервер запускает load_test.py сам.
+#
+# Поддерживаются getMe, getUpdates (с долгим опросом), sendMessage, editMessageText, answerCallbackQuery;
+# остальные методы отвечают true. Задержка, ответы 429 и ошибки 500 применяются только к методам отправки
+import sys
+import json
+import time
+import random
+import itertools
+import threading
+from threading import Thread
+from collections import Counter, deque
+
+from flask import Flask, request, jsonify
+from werkzeug.serving import make_server
+
+# Методы, к которым применяются задержка, 429 и ошибки
+SEND_METHODS = {'sendMessage', 'editMessageText', 'answerCallbackQuery'}
+
+# Верхняя граница ожидания в getUpdates
+MAX_POLL_TIMEOUT = 50
+
+
+# Состояние поддельного Bot API: очереди обновлений по токенам и учёт вызовов
+class FakeTelegram:
+    def __init__(self, latency=0.0, rate_limit=0.0, failure_rate=0.0, retry_after=1):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+
+        self.calls = Counter()
+        self.rate_limited = 0
+        self.failed = 0
+
+        self._updates = {}
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._listeners = []
+
+    # Подписка на вызовы методов: listener(token, method, params) вызывается из потоков сервера
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    # Постановка обновления в очередь бота; update_id назначается здесь
+    def push_update(self, token, update):
+        with self._cond:
+            update = dict(update, update_id=next(self._update_ids))
+            self._updates.setdefault(token, deque()).append(update)
+            self._cond.notify_all()
+        return update['update_id']
+
+    # Сколько обновлений ещё не забрал бот
+    def pending(self, token):
+        with self._cond:
+            return len(self._updates.get(token, ()))
+
+    def _get_updates(self, token, params):
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = min(float(params.get('timeout') or 0), MAX_POLL_TIMEOUT)
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            queue = self._updates.setdefault(token, deque())
+
+            # Обновления с update_id меньше offset подтверждены ботом
+            while queue and queue[0]['update_id'] < offset:
+                queue.popleft()
+
+            while not queue:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            return list(itertools.islice(queue, limit))
+
+    def _message(self, params):
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'text': params.get('text', '')
+        }
+
+    # Счётчики вызовов и внесённых ошибок
+    def stats(self):
+        with self._cond:
+            return {'calls': dict(self.calls), 'rate_limited': self.rate_limited, 'failed': self.failed}
+
+    # Обработка вызова метода. Возвращает HTTP-статус и тело ответа
+    def call(self, token, method, params):
+        with self._cond:
+            self.calls[method] += 1
+
+        if method in SEND_METHODS:
+            if self.latency:
+                time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+            roll = random.random()
+            if roll < self.rate_limit:
+                with self._cond:
+                    self.rate_limited += 1
+                return 429, {
+                    'ok': False,
+                    'error_code': 429,
+                    'description': f"Too Many Requests: retry after {self.retry_after}",
+                    'parameters': {'retry_after': self.retry_after}
+                }
+            if roll < self.rate_limit + self.failure_rate:
+                with self._cond:
+                    self.failed += 1
+                return 500, {'ok': False, 'error_code': 500, 'description': "Internal Server Error"}
+
+        if method == 'getMe':
+            bot_id = int(token.split(':')[0]) if token.split(':')[0].isdigit() else 1
+            result = {'id': bot_id, 'is_bot': True, 'first_name': 'Fake', 'username': f"fake_{bot_id}_bot"}
+        elif method == 'getUpdates':
+            result = self._get_updates(token, params)
+        elif method in ('sendMessage', 'editMessageText'):
+            result = self._message(params)
+        else:
+            result = True
+
+        for listener in self._listeners:
+            listener(token, method, params)
+
+        return 200, {'ok': True, 'result': result}
+
+
+# Flask-приложение с маршрутами Bot API
+def create_app(fake):
+    app = Flask(__name__)
+
+    @app.route('/bot<token>/<method>', methods=['GET', 'POST'])
+    def bot_method(token, method):
+        # Библиотека передаёт параметры формой, значения-объекты закодированы в JSON
+        params = dict(request.values)
+        if request.is_json:
+            params.update(request.get_json(silent=True) or {})
+
+        status, body = fake.call(token, method, params)
+        return jsonify(body), status
+
+    # Управление для внешних генераторов нагрузки: постановка обновлений в очередь бота
+    @app.route('/control/<token>/updates', methods=['POST'])
+    def push_updates(token):
+        updates = request.get_json(silent=True) or []
+        if isinstance(updates, dict):
+            updates = [updates]
+        return jsonify([fake.push_update(token, update) for update in updates])
+
+    # Счётчики вызовов методов
+    @app.route('/control/stats', methods=['GET'])
+    def stats():
+        return jsonify(fake.stats())
+
+    return app
+
+
+# Запуск сервера в отдельном потоке. Возвращает werkzeug-сервер (server.shutdown() для остановки)
+def start_server(fake, host='127.0.0.1', port=8081):
+    server = make_server(host, port, create_app(fake), threaded=True)
+    Thread(target=server.serve_forever, name='fake-telegram', daemon=True).start()
+    return server
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8081
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    rate_limit = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    failure_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+
+    fake = FakeTelegram(latency, rate_limit, failure_rate)
+    print(f"Поддельный Bot API: http://127.0.0.1:{port}")
+
+    server = make_server('127.0.0.1', port, create_app(fake), threaded=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    print(json.dumps(fake.stats(), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
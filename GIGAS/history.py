@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+
+import i18n
+import storage
+
+# Сколько сообщений на странице истории
+PAGE_SIZE = 10
+
+# Длинные сообщения обрезаются, чтобы страница уместилась в лимит Telegram
+MAX_TEXT_LENGTH = 300
+
+# Сколько отрисованных страниц держать в памяти
+CACHE_SIZE = 1000
+
+# Страница задаётся границей before: PAGE_SIZE последних сообщений комнаты с message_id < before
+# (None - самые свежие). Выборка идёт по индексу (locale, message_id) без OFFSET, поэтому стоимость
+# страницы не зависит от её глубины. Страница с границей не меняется (новые сообщения получают большие
+# message_id), её можно кэшировать до архивации; последняя страница сбрасывается при записи в чат
+_pages = OrderedDict()
+_lock = threading.Lock()
+
+# Последняя страница кэшируется, только если в комнату пишет один процесс: записи других процессов
+# этот не видит
+CACHE_LATEST = True
+
+# Счётчик записей в комнату: последняя страница, прочитанная до записи, не попадает в кэш
+_writes = {}
+
+
+# Время сообщения в коротком виде "ДД.ММ ЧЧ:ММ"
+def _short_time(timestamp):
+    if not timestamp or len(timestamp) < 16:
+        return timestamp or ''
+    return f"{timestamp[8:10]}.{timestamp[5:7]} {timestamp[11:16]}"
+
+
+# Отрисовка страницы: текст и кнопки перехода
+def _render(catalog, rows, before):
+    has_older = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+
+    if not rows:
+        return catalog.text("history_empty"), None
+
+    text = catalog.text("history_title")
+    for message_id, username, message, timestamp in reversed(rows):
+        if len(message) > MAX_TEXT_LENGTH:
+            message = message[:MAX_TEXT_LENGTH] + "…"
+        text += catalog.text("history_line", time=_short_time(timestamp), username=username, text=message)
+
+    buttons = []
+    if has_older:
+        buttons.append(InlineKeyboardButton(catalog.buttons["history_older"], callback_data=f"history_{rows[-1][0]}"))
+    if before is not None:
+        buttons.append(InlineKeyboardButton(catalog.buttons["history_newer"], callback_data=f"history_newer_{rows[0][0]}"))
+
+    return text, InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+# Страница истории комнаты (выполняется в потоке БД)
+def page(locale, before=None):
+    key = (locale, before)
+
+    with _lock:
+        cached = _pages.get(key)
+        if cached is not None:
+            _pages.move_to_end(key)
+            return cached
+        writes = _writes.get(locale, 0)
+
+    if before is None:
+        rows = storage.fetchall(
+            "SELECT message_id, username, message, timestamp FROM chat_messages "
+            "WHERE locale = ? ORDER BY message_id DESC LIMIT ?",
+            (locale, PAGE_SIZE + 1)
+        )
+    else:
+        rows = storage.fetchall(
+            "SELECT message_id, username, message, timestamp FROM chat_messages "
+            "WHERE locale = ? AND message_id < ? ORDER BY message_id DESC LIMIT ?",
+            (locale, before, PAGE_SIZE + 1)
+        )
+
+    rendered = _render(i18n.get(locale), rows, before)
+
+    with _lock:
+        if before is not None or (CACHE_LATEST and _writes.get(locale, 0) == writes):
+            _pages[key] = rendered
+            while len(_pages) > CACHE_SIZE:
+                _pages.popitem(last=False)
+
+    return rendered
+
+
+# Граница страницы, которая идёт сразу после сообщения after (None, если это уже последняя страница)
+def newer(locale, after):
+    rows = storage.fetchall(
+        "SELECT message_id FROM chat_messages WHERE locale = ? AND message_id > ? ORDER BY message_id LIMIT ?",
+        (locale, after, PAGE_SIZE + 1)
+    )
+
+    if len(rows) <= PAGE_SIZE:
+        return None
+    return rows[PAGE_SIZE][0]
+
+
+# Сброс последних страниц комнат после записи новых сообщений
+def invalidate(locales):
+    with _lock:
+        for locale in locales:
+            _writes[locale] = _writes.get(locale, 0) + 1
+            _pages.pop((locale, None), None)
+
+
+# Полный сброс кэша (после переноса сообщений в архив)
+def clear():
+    with _lock:
+        _pages.clear()
@@ -0,0 +1,72 @@
+import string
+
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+
+from locales import ru, en
+
+# Язык по умолчанию
+DEFAULT_LOCALE = 'ru'
+
+# Доступные локали
+LOCALES = {
+    'ru': ru,
+    'en': en
+}
+
+_formatter = string.Formatter()
+
+
+# Каталог сообщений одной локали. Шаблоны и клавиатуры собираются один раз при запуске,
+# обработчики только подставляют значения
+class Catalog:
+    def __init__(self, locale, module):
+        self.locale = locale
+        self.quotes = tuple(module.QUOTES)
+        self.tasks = tuple(module.TASKS)
+        self.emergency_tips = tuple(module.EMERGENCY_TIPS)
+        self.emergency_tips_by_type = {k: tuple(v) for k, v in module.EMERGENCY_TIPS_BY_TYPE.items()}
+        self.buttons = dict(module.BUTTONS)
+
+        # Шаблон без полей хранится готовой строкой, с полями - связанным методом format
+        self._templates = {}
+        for key, template in module.MESSAGES.items():
+            has_fields = any(field is not None for _, field, _, _ in _formatter.parse(template))
+            self._templates[key] = template.format if has_fields else template
+
+        # Клавиатуры неизменяемы, поэтому их можно один раз собрать и переиспользовать
+        self.main_menu_keyboard = self._keyboard([
+            ["checkin", "stats"],
+            ["task", "motivation"],
+            ["emergency", "achievements"]
+        ])
+        self.back_to_menu_keyboard = self._keyboard([["back_to_menu"]])
+        self.emergency_keyboard = self._keyboard([
+            ["emergency_tip_physical"],
+            ["emergency_tip_mental"],
+            ["emergency_tip_shower"],
+            ["emergency_tip_distraction"],
+            ["back_to_menu"]
+        ])
+        self.emergency_tip_keyboard = self._keyboard([["back_to_emergency"], ["back_to_menu"]])
+
+    # Клавиатура из строк callback_data; подписи берутся из каталога
+    def _keyboard(self, rows):
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton(self.buttons[data], callback_data=data) for data in row]
+            for row in rows
+        ])
+
+    # Текст сообщения по ключу с подстановкой полей
+    def text(self, key, **fields):
+        template = self._templates[key]
+        if isinstance(template, str):
+            return template
+        return template(**fields)
+
+
+CATALOGS = {locale: Catalog(locale, module) for locale, module in LOCALES.items()}
+
+
+# Каталог для локали; для неизвестной локали используется язык по умолчанию
+def get(locale):
+    return CATALOGS.get(locale) or CATALOGS[DEFAULT_LOCALE]
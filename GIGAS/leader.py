@@ -0,0 +1,124 @@
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+
+import metrics
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Срок аренды, в секундах. Если держатель не продлил аренду за это время (процесс упал или завис),
+# её забирает другой экземпляр
+LEASE_SECONDS = 15
+
+# Как часто держатель продлевает аренду
+RENEW_INTERVAL = 5
+
+# Запас до конца аренды, после которого держатель сам перестаёт считать себя ведущим:
+# продление могло не дойти до базы, а другой экземпляр уже ждёт истечения срока
+SAFETY_MARGIN = 2
+
+# Идентификатор этого процесса в таблице аренд
+HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Аренды этого процесса: имя -> (жетон, срок по time.monotonic())
+_held = {}
+_lock = threading.Lock()
+
+metrics.Gauge(
+    'bot_lease_held', "Аренды процесса: 1 - ведущий, 0 - срок подходит к концу", ('lease',),
+    func=lambda: {(name,): int(token(name) is not None) for name in list(_held)}
+)
+
+
+# Таблица аренд. token растёт при каждой смене держателя: это жетон ограждения, по которому
+# запись бывшего ведущего, проснувшегося после паузы, отвергается
+def create_table(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS leases (
+        name TEXT PRIMARY KEY,
+        holder TEXT,
+        token INTEGER,
+        expires_at REAL
+    )
+    ''')
+
+
+# Захват или продление аренды (выполняется в потоке БД). Возвращает (жетон, получена ли аренда
+# только что) или (None, False), если аренду держит другой экземпляр.
+# Сроки в базе - по системным часам (time.time()), общим для всех процессов на машине с базой
+def acquire(name):
+    started = time.monotonic()
+    now = time.time()
+
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT holder, token, expires_at FROM leases WHERE name = ?", (name,))
+        row = cursor.fetchone()
+
+        if row is not None and row[0] != HOLDER and row[2] > now:
+            token = None
+        else:
+            # Свою аренду продлеваем с тем же жетоном, чужую истёкшую забираем со следующим
+            token = row[1] if row is not None and row[0] == HOLDER else (row[1] + 1 if row is not None else 1)
+            cursor.execute(
+                "INSERT INTO leases (name, holder, token, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, token = excluded.token, "
+                "expires_at = excluded.expires_at",
+                (name, HOLDER, token, now + LEASE_SECONDS)
+            )
+
+    with _lock:
+        previous = _held.get(name)
+        if token is None:
+            _held.pop(name, None)
+        else:
+            _held[name] = (token, started + LEASE_SECONDS - SAFETY_MARGIN)
+
+    if token is None:
+        if previous is not None:
+            logger.warning(f"Аренда {name} перешла к другому экземпляру")
+        return None, False
+
+    gained = previous is None or previous[0] != token
+    if gained:
+        logger.info(f"Аренда {name} получена, жетон {token}")
+    return token, gained
+
+
+# Жетон аренды, если этот процесс её держит и срок не подходит к концу, иначе None
+def token(name):
+    with _lock:
+        entry = _held.get(name)
+
+    if entry is None or time.monotonic() >= entry[1]:
+        return None
+    return entry[0]
+
+
+# Проверка ограждения перед действием ведущего (выполняется в потоке БД): аренда в базе всё ещё
+# принадлежит этому процессу с этим жетоном и не истекла. Иначе ведущий устарел и действовать не должен
+def fence(name, token):
+    if token is None:
+        return False
+
+    row = storage.fetchone(
+        "SELECT 1 FROM leases WHERE name = ? AND holder = ? AND token = ? AND expires_at > ?",
+        (name, HOLDER, token, time.time())
+    )
+    return row is not None
+
+
+# Освобождение аренд при остановке, чтобы другой экземпляр забрал их сразу, не дожидаясь срока
+def release_all():
+    with _lock:
+        names = list(_held)
+        _held.clear()
+
+    for name in names:
+        try:
+            storage.execute("UPDATE leases SET expires_at = 0 WHERE name = ? AND holder = ?", (name, HOLDER))
+        except Exception as e:
+            logger.error(f"Ошибка при освобождении аренды {name}: {e}")
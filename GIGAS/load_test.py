@@ -0,0 +1,271 @@
+# load_test.py - нагрузочный тест бота целиком, без доступа к Telegram.
+#
+# Запускает fake_telegram.py и бота (main.py) с отдельной базой во временной папке, затем N пользователей
+# параллельно нажимают /start и кнопки меню, часть из них входит в чат и пишет в него. Каждый пользователь ждёт ответа
+# бота на своё действие, делает паузу и выбирает следующее. В конце печатаются задержки ответа
+# (p50/p95/p99) и пропускная способность.
+#
+#     python load_test.py [--users 200] [--duration 60] [--think-ms 500] [--chat-share 0.1]
+#                         [--latency-ms 30] [--rate-limit 0.0] [--failures 0.0] [--workers 1]
+#
+# --workers N запускает бота с N процессами-обработчиками (BOT_WORKERS); сравнение прогонов с 1, 2, 4
+# обработчиками показывает, как растёт пропускная способность с числом процессов
+import os
+import re
+import sys
+import math
+import time
+import random
+import signal
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from collections import Counter, defaultdict
+
+import fake_telegram
+
+# Токен тестового бота (в поддельном Bot API подходит любой)
+TOKEN = '100000:load-test'
+
+# Сколько ждать ответа бота на одно действие
+RESPONSE_TIMEOUT = 10
+
+# Сколько ждать, пока бот запустится и начнёт опрос
+STARTUP_TIMEOUT = 30
+
+# Действия пользователей после входа и их относительная частота
+ACTIONS = {
+    'checkin': 15,
+    'stats': 15,
+    'task': 10,
+    'motivation': 10,
+    'emergency': 10,
+    'emergency_tip_mental': 5,
+    'achievements': 10,
+    'back_to_menu': 10,
+    'chat': 15,
+    '/start': 5,
+}
+
+# Префикс username тестовых пользователей. Рассылки чата содержат username отправителя,
+# прямые ответы бота обращаются по first_name и его не содержат
+USERNAME_PREFIX = 'load_'
+
+# Метка сообщения в чате, по которой находится его рассылка
+_MARKER = re.compile(r"#\d+-\d+")
+
+
+# Перцентиль по отсортированному списку (ближайший ранг)
+def percentile(values, p):
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+# Генератор нагрузки: отправляет обновления в поддельный Bot API и ждёт реакции бота
+class LoadGenerator:
+    def __init__(self, fake, loop):
+        self.fake = fake
+        self.loop = loop
+        self.latencies = defaultdict(list)
+        self.timeouts = Counter()
+        self._waiters = {}
+        self._ids = 0
+        fake.add_listener(self._on_call)
+
+    # Вызывается из потоков сервера на каждый вызов метода ботом
+    def _on_call(self, token, method, params):
+        if method in fake_telegram.SEND_METHODS:
+            self.loop.call_soon_threadsafe(self._resolve, method, params)
+
+    def _resolve(self, method, params):
+        text = params.get('text', '')
+
+        if USERNAME_PREFIX in text:
+            # Рассылка чата: ответ на сообщение с этой меткой
+            marker = _MARKER.search(text)
+            key = ('chat', marker.group(0)) if marker else None
+        elif method == 'answerCallbackQuery':
+            key = None
+        else:
+            key = (method, int(params.get('chat_id') or 0))
+
+        waiter = self._waiters.pop(key, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(time.monotonic())
+
+    def _next_id(self):
+        self._ids += 1
+        return self._ids
+
+    def _user(self, user_id):
+        return {'id': user_id, 'is_bot': False, 'first_name': f"User {user_id}", 'username': f"{USERNAME_PREFIX}{user_id}"}
+
+    def _message(self, user_id, text):
+        message = {
+            'message_id': self._next_id(),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return {'message': message}
+
+    def _callback(self, user_id, data):
+        return {'callback_query': {
+            'id': str(self._next_id()),
+            'from': self._user(user_id),
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': 1,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'text': 'menu'
+            }
+        }}
+
+    # Одно действие пользователя: отправка обновления и ожидание ответа
+    async def act(self, user_id, action):
+        if action == 'chat':
+            marker = f"#{user_id}-{self._next_id()}"
+            update = self._message(user_id, f"load message {marker}")
+            key = ('chat', marker)
+        elif action.startswith('/'):
+            update = self._message(user_id, action)
+            key = ('sendMessage', user_id)
+        else:
+            update = self._callback(user_id, action)
+            key = ('editMessageText', user_id)
+
+        waiter = self.loop.create_future()
+        self._waiters[key] = waiter
+        started = time.monotonic()
+        self.fake.push_update(TOKEN, update)
+
+        try:
+            answered = await asyncio.wait_for(waiter, RESPONSE_TIMEOUT)
+            self.latencies[action].append(answered - started)
+        except asyncio.TimeoutError:
+            self._waiters.pop(key, None)
+            self.timeouts[action] += 1
+
+    # Сценарий одного пользователя. Участники чата, кроме кнопок меню, пишут в чат
+    async def user(self, user_id, stop_at, think, in_chat):
+        await asyncio.sleep(random.uniform(0, think))
+
+        if in_chat:
+            await self.act(user_id, '/chat')
+        await self.act(user_id, '/start')
+
+        actions = [action for action in ACTIONS if in_chat or action != 'chat']
+        weights = [ACTIONS[action] for action in actions]
+        while time.monotonic() < stop_at:
+            await self.act(user_id, random.choices(actions, weights)[0])
+            await asyncio.sleep(random.expovariate(1 / think) if think else 0)
+
+
+# Запуск бота отдельным процессом против поддельного Bot API
+def start_bot(port, workdir, workers):
+    env = dict(os.environ)
+    env.pop('TELEGRAM_TOKEN_EN', None)
+    env.update(
+        TELEGRAM_TOKEN=TOKEN, TELEGRAM_API_URL=f"http://127.0.0.1:{port}", BOT_MODE='polling',
+        BOT_WORKERS=str(workers)
+    )
+
+    log = open(os.path.join(workdir, 'bot.log'), 'w')
+    main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+    return subprocess.Popen([sys.executable, main_py], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def report(generator, users, workers, elapsed, fake):
+    answered = sum(len(v) for v in generator.latencies.values())
+    timeouts = sum(generator.timeouts.values())
+    every = sorted(x for v in generator.latencies.values() for x in v)
+
+    print(f"\nПользователей: {users}, обработчиков: {workers}, длительность: {elapsed:.1f} с")
+    print(f"Действий с ответом: {answered}, без ответа: {timeouts}")
+    print(f"Пропускная способность: {answered / elapsed:.1f} действий/с")
+    print(
+        f"Задержка ответа, мс: p50 {percentile(every, 50) * 1000:.1f}, p95 {percentile(every, 95) * 1000:.1f}, "
+        f"p99 {percentile(every, 99) * 1000:.1f}, макс. {(every[-1] if every else 0) * 1000:.1f}"
+    )
+
+    print(f"\n{'действие':<22}{'ответов':>9}{'без ответа':>12}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for action in sorted(set(generator.latencies) | set(generator.timeouts)):
+        values = sorted(generator.latencies[action])
+        print(
+            f"{action:<22}{len(values):>9}{generator.timeouts[action]:>12}"
+            f"{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}{percentile(values, 99) * 1000:>9.1f}"
+        )
+
+    stats = fake.stats()
+    print(f"\nВызовы Bot API: {stats['calls']}")
+    print(f"Ответов 429: {stats['rate_limited']}, ошибок 500: {stats['failed']}")
+
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    fake = fake_telegram.FakeTelegram(args.latency_ms / 1000, args.rate_limit, args.failures)
+    server = fake_telegram.start_server(fake, port=args.port)
+    generator = LoadGenerator(fake, loop)
+
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    bot = start_bot(args.port, workdir, args.workers)
+    print(f"Бот запущен, рабочая папка: {workdir}")
+
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while fake.stats()['calls'].get('getUpdates', 0) == 0:
+            if bot.poll() is not None or time.monotonic() > deadline:
+                print(f"Бот не запустился, смотрите {os.path.join(workdir, 'bot.log')}")
+                return
+            await asyncio.sleep(0.1)
+
+        started = time.monotonic()
+        stop_at = started + args.duration
+        chat_users = round(args.users * args.chat_share)
+        await asyncio.gather(*(
+            generator.user(1000 + i, stop_at, args.think_ms / 1000, i < chat_users) for i in range(args.users)
+        ))
+        elapsed = time.monotonic() - started
+
+        report(generator, args.users, args.workers, elapsed, fake)
+    finally:
+        bot.send_signal(signal.SIGINT)
+        try:
+            bot.wait(30)
+        except subprocess.TimeoutExpired:
+            bot.kill()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бота против поддельного Bot API")
+    parser.add_argument('--users', type=int, default=200, help="количество пользователей")
+    parser.add_argument('--duration', type=float, default=60, help="длительность теста, с")
+    parser.add_argument('--think-ms', type=float, default=500, help="средняя пауза пользователя между действиями, мс")
+    parser.add_argument('--chat-share', type=float, default=0.1,
+                        help="доля пользователей в чате (каждое сообщение рассылается всем участникам)")
+    parser.add_argument('--latency-ms', type=float, default=30, help="задержка ответа Bot API, мс")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="доля ответов 429 на отправку")
+    parser.add_argument('--failures', type=float, default=0.0, help="доля ответов 500 на отправку")
+    parser.add_argument('--port', type=int, default=8081, help="порт поддельного Bot API")
+    parser.add_argument('--workers', type=int, default=1, help="число процессов-обработчиков бота")
+    args = parser.parse_args()
+
+    # Журнал каждого запроса к серверу только мешает отчёту
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# English locale
+
+# Motivational quotes
+QUOTES = [
+    "Self-control today is strength tomorrow.",
+    "Every day without addiction is a victory over yourself.",
+    "Difficult today - easier tomorrow.",
+    "Your strength is not in avoiding falling, but in getting back up.",
+    "Overcome yourself today and become stronger tomorrow.",
+    "True strength is being able to say 'no' to your weaknesses.",
+    "You are stronger than you think.",
+    "Each new day is a new opportunity to become better.",
+    "Your life changes when you change yourself.",
+    "Discipline is the bridge between goals and achievements."
+]
+
+# Tasks for users
+TASKS = [
+    "Do 20 push-ups when you feel tempted.",
+    "Drink a glass of water and take 10 deep breaths.",
+    "Take a 10-minute walk in fresh air.",
+    "Take a cold shower.",
+    "Read a book for 30 minutes.",
+    "Call a friend or family member.",
+    "Meditate for 10 minutes.",
+    "Write down your thoughts and feelings in a journal.",
+    "Do stretching or yoga for 15 minutes.",
+    "Draw or write about your goals for the future."
+]
+
+# Emergency help
+EMERGENCY_TIPS = [
+    "Do 20 push-ups right now!",
+    "Leave the room immediately and take a walk.",
+    "Turn on a cold shower and stand under it for 30 seconds.",
+    "Call a friend right now.",
+    "Do 50 jumps in place.",
+    "Focus on your breathing: inhale for 4 counts, hold for 4, exhale for 4.",
+    "Drink a glass of cold water.",
+    "Hold a plank position for 1 minute.",
+    "Close your eyes and count to 100.",
+    "Turn on your favorite energetic music and move to it."
+]
+
+# Emergency tips by type
+EMERGENCY_TIPS_BY_TYPE = {
+    "physical": [
+        "Do 20 push-ups right now!",
+        "Do 30 squats.",
+        "Hold a plank position for 1 minute."
+    ],
+    "mental": [
+        "Focus on your breathing: inhale for 4 counts, hold for 4, exhale for 4.",
+        "Close your eyes and count to 100.",
+        "Meditate for 5 minutes, focusing on breathing."
+    ],
+    "shower": [
+        "Take a cold shower for 30-60 seconds.",
+        "Wash your face with cold water several times.",
+        "Hold your hands under cold water for a minute."
+    ],
+    "distraction": [
+        "Call a friend or family member.",
+        "Go for a short walk.",
+        "Turn on your favorite energetic music and move to it."
+    ]
+}
+
+# Button labels
+BUTTONS = {
+    "checkin": "✅ Check In",
+    "stats": "📊 Statistics",
+    "task": "📝 Task of the Day",
+    "motivation": "🖼 Motivation",
+    "emergency": "🆘 Emergency Help",
+    "achievements": "🏆 Achievements",
+    "back_to_menu": "◀️ Back to Menu",
+    "emergency_tip_physical": "💪 Physical Exercise",
+    "emergency_tip_mental": "🧠 Mental Technique",
+    "emergency_tip_shower": "🚿 Cold Shower",
+    "emergency_tip_distraction": "🔄 Distraction",
+    "back_to_emergency": "🔄 Another Tip",
+    "history_older": "⬅️ Older",
+    "history_newer": "Newer ➡️",
+    "search_prev": "⬅️ Back",
+    "search_next": "Next ➡️"
+}
+
+# Message texts. Fields in curly braces are filled in when sending
+MESSAGES = {
+    "welcome_new": (
+        "👋 Hello, {first_name}! I'm a bot that will help you overcome addiction and "
+        "become the best version of yourself.\n\n"
+        "🔰 *What I can do:*\n"
+        "✅ Daily check-ins to track progress\n"
+        "📝 Daily tasks for personal growth\n"
+        "🖼 Motivational quotes and images\n"
+        "🆘 Emergency help in moments of weakness\n"
+        "🏆 Achievement system\n\n"
+        "Use /help to get a list of commands."
+    ),
+    "welcome_back": (
+        "Welcome back, {first_name}! Glad to see you again.\n\n"
+        "Use /help to get a list of commands or use the menu below."
+    ),
+    "help": (
+        "*Command List:*\n\n"
+        "/start - Start working with the bot\n"
+        "/checkin - Check in for today\n"
+        "/stats - Show your statistics\n"
+        "/task - Get task of the day\n"
+        "/motivation - Get a motivational quote\n"
+        "/emergency - Emergency help when tempted\n"
+        "/achievements - View your achievements\n"
+        "/reminder - Configure daily reminders\n"
+        "/timezone - Time zone for reminders and check-ins\n"
+        "/chat - Join the community chat\n"
+        "/history - Chat history\n"
+        "/search <words> - Search the chat\n"
+        "/help - Show this help"
+    ),
+    "main_menu": "Main Menu. Select an action:",
+    "already_checked_in": "You've already checked in today! Come back tomorrow.",
+    "checkin_streak": "✅ Great! Your streak without relapses: {streak} days in a row!",
+    "checkin_reset": "✅ Check-in accepted. Unfortunately, your streak was reset due to missed days. New streak: 1 day.",
+    "checkin_accepted": "✅ Check-in accepted.",
+    "new_achievements": "\n\n🏆 *New Achievements:*\n",
+    "gift_28_days": "\n\n🎁 *Congratulations on reaching 28 days!*\nYour gift: [Go to website](https://yourlink.com)",
+    "stats": (
+        "📊 *Your Statistics:*\n\n"
+        "📅 Start date: {start_date}\n"
+        "📈 Current streak: {streak} days\n"
+        "🏆 Record streak: {longest_streak} days\n"
+        "⏱ Total days since beginning: {total_days}"
+    ),
+    "task": "📝 *Task of the Day:*\n\n{task}\n\nComplete this task and get one step closer to your goal!",
+    "motivation": "🖼 *Motivation of the Day:*\n\n_{quote}_",
+    "emergency": (
+        "🆘 *Emergency Help*\n\n"
+        "Feeling tempted? We're here to help you!\n"
+        "Choose a type of help below:"
+    ),
+    "emergency_tip": "🆘 *Emergency Help:*\n\n{tip}\n\nYou can do this! Stay strong!",
+    "achievements_earned": "🏆 *Your Achievements:*\n\n",
+    "achievement_line": "{title} - received on {date}\n",
+    "achievements_upcoming": "\n*Upcoming Achievements:*\n",
+    "achievements_none": (
+        "🏆 *Achievements:*\n\n"
+        "You don't have any achievements yet. Keep trying!\n\n"
+        "*Available Achievements:*\n"
+    ),
+    "reminder_settings": (
+        "⏰ *Reminder Settings*\n\n"
+        "Status: {status}\n"
+        "Time: {time}\n"
+        "Time zone: {timezone}\n\n"
+        "To change settings, use the following commands:\n"
+        "/reminder_on - Enable reminders\n"
+        "/reminder_off - Disable reminders\n"
+        "/set_time HH:MM - Set reminder time (e.g., /set_time 20:00)\n"
+        "/timezone ZONE - Set your time zone (e.g., /timezone Europe/London or /timezone -5)"
+    ),
+    "reminder_status_on": "Enabled",
+    "reminder_status_off": "Disabled",
+    "reminder_on": "✅ Reminders enabled. You will receive notifications every day at {time}.",
+    "reminder_off": "❌ Reminders disabled.",
+    "set_time_usage": "⚠️ Please specify time in HH:MM format, for example: /set_time 20:00",
+    "set_time_invalid": "⚠️ Invalid time format. Please use HH:MM format, for example: 20:00",
+    "set_time_done": "⏰ Reminder time set to {time}.",
+    "timezone_current": (
+        "🌍 Your time zone: {timezone}, local time {time}.\n\n"
+        "To change it: /timezone ZONE, e.g. /timezone Europe/London or /timezone -5"
+    ),
+    "timezone_invalid": "⚠️ Unknown time zone. Use a name (Europe/London) or a UTC offset (+3, -05:30).",
+    "timezone_done": "🌍 Time zone set to {timezone}, local time {time}.",
+    "daily_reminder": "📝 *Daily Reminder*\n\n_{quote}_\n\nDon't forget to check in today! /checkin",
+    "chat_welcome": (
+        "💬 *Community Chat*\n\n"
+        "Here you can chat with other users, share experiences, and support each other.\n\n"
+        "Just send a message, and it will be visible to all chat participants.\n"
+        "Earlier messages - /history, to exit the chat - /exit_chat"
+    ),
+    "chat_exit": "You have left the community chat. Use /chat to return to the chat.",
+    "chat_joined": "👋 User {username} has joined the chat!",
+    "chat_left": "👋 User {username} has left the chat.",
+    "chat_message": "💬 {username}: {text}",
+    "history_title": "📜 Chat History\n\n",
+    "history_line": "[{time}] {username}: {text}\n",
+    "history_empty": "📜 There are no messages in the chat yet.",
+    "search_usage": "Usage: /search <words>\nFor example: /search cold shower",
+    "search_title": "🔎 Search: {query}\n\n",
+    "search_line": "[{date}] {username}: {text}\n",
+    "search_empty": "🔎 Nothing found for \"{query}\".",
+    "profile_usage": "Usage: /profile [N | Ns | stop]\nN - the next N updates, Ns - N seconds",
+    "profile_started": "⏱ Profiling enabled for {limit}.",
+    "profile_updates": "{count} updates",
+    "profile_seconds": "{count} s",
+    "profile_running": "⏱ Profiling is already running. Stop it with /profile stop",
+    "profile_not_running": "Profiling is not running.",
+    "profile_done": "⏱ Profiling finished. Reports:\n{files}"
+}
@@ -0,0 +1,201 @@
+# Русская локаль
+
+# Мотивационные цитаты
+QUOTES = [
+    "Самоконтроль сегодня - это сила завтра.",
+    "Каждый день без зависимости - это победа над собой.",
+    "Сложно сегодня - легче завтра.",
+    "Твоя сила не в том, чтобы не упасть, а в том, чтобы подняться.",
+    "Преодолей себя сегодня и стань сильнее завтра.",
+    "Настоящая сила - уметь сказать 'нет' своим слабостям.",
+    "Ты сильнее, чем думаешь.",
+    "Каждый новый день - это новая возможность стать лучше.",
+    "Твоя жизнь меняется, когда меняешься ты сам.",
+    "Дисциплина - это мост между целями и достижениями."
+]
+
+# Задания для пользователей
+TASKS = [
+    "Сделай 20 отжиманий, когда почувствуешь искушение.",
+    "Выпей стакан воды и сделай 10 глубоких вдохов.",
+    "Выйди на 10-минутную прогулку на свежем воздухе.",
+    "Примите холодный душ.",
+    "Почитай книгу в течение 30 минут.",
+    "Позвони другу или члену семьи.",
+    "Медитируй в течение 10 минут.",
+    "Запиши свои мысли и чувства в дневник.",
+    "Сделай растяжку или йогу в течение 15 минут.",
+    "Нарисуй или напиши о своих целях на будущее."
+]
+
+# Экстренная помощь
+EMERGENCY_TIPS = [
+    "Сделай 20 отжиманий прямо сейчас!",
+    "Немедленно выйди из комнаты и пройдись.",
+    "Включи холодный душ и постой под ним 30 секунд.",
+    "Позвони другу прямо сейчас.",
+    "Сделай 50 прыжков на месте.",
+    "Сконцентрируйся на дыхании: вдох на 4 счета, задержка на 4, выдох на 4.",
+    "Выпей стакан холодной воды.",
+    "Сделай планку на 1 минуту.",
+    "Закрой глаза и сосчитай до 100.",
+    "Включи любимую энергичную музыку и подвигайся под неё."
+]
+
+# Советы экстренной помощи по типам
+EMERGENCY_TIPS_BY_TYPE = {
+    "physical": [
+        "Сделайте 20 отжиманий прямо сейчас!",
+        "Выполните 30 приседаний.",
+        "Сделайте планку на 1 минуту."
+    ],
+    "mental": [
+        "Сконцентрируйтесь на дыхании: вдох на 4 счета, задержка на 4, выдох на 4.",
+        "Закройте глаза и сосчитайте до 100.",
+        "Медитируйте в течение 5 минут, фокусируясь на дыхании."
+    ],
+    "shower": [
+        "Примите холодный душ на 30-60 секунд.",
+        "Умойтесь холодной водой несколько раз.",
+        "Подержите руки под холодной водой в течение минуты."
+    ],
+    "distraction": [
+        "Позвоните другу или члену семьи.",
+        "Выйдите на короткую прогулку.",
+        "Включите любимую энергичную музыку и подвигайтесь под неё."
+    ]
+}
+
+# Подписи кнопок
+BUTTONS = {
+    "checkin": "✅ Отметиться",
+    "stats": "📊 Статистика",
+    "task": "📝 Задание дня",
+    "motivation": "🖼 Мотивация",
+    "emergency": "🆘 Экстренная помощь",
+    "achievements": "🏆 Достижения",
+    "back_to_menu": "◀️ Назад в меню",
+    "emergency_tip_physical": "💪 Физическое упражнение",
+    "emergency_tip_mental": "🧠 Ментальная техника",
+    "emergency_tip_shower": "🚿 Холодный душ",
+    "emergency_tip_distraction": "🔄 Отвлечение",
+    "back_to_emergency": "🔄 Другой совет",
+    "history_older": "⬅️ Раньше",
+    "history_newer": "Позже ➡️",
+    "search_prev": "⬅️ Назад",
+    "search_next": "Далее ➡️"
+}
+
+# Тексты сообщений. Поля в фигурных скобках подставляются при отправке
+MESSAGES = {
+    "welcome_new": (
+        "👋 Привет, {first_name}! Я бот, который поможет тебе преодолеть зависимость и "
+        "стать лучшей версией себя.\n\n"
+        "🔰 *Что я умею:*\n"
+        "✅ Ежедневные отметки для отслеживания прогресса\n"
+        "📝 Ежедневные задания для личностного роста\n"
+        "🖼 Мотивационные цитаты и изображения\n"
+        "🆘 Экстренная помощь в моменты слабости\n"
+        "🏆 Система достижений\n\n"
+        "Используй /help для получения списка команд."
+    ),
+    "welcome_back": (
+        "С возвращением, {first_name}! Рад видеть тебя снова.\n\n"
+        "Используй /help для получения списка команд или воспользуйся меню ниже."
+    ),
+    "help": (
+        "*Список команд:*\n\n"
+        "/start - Начать работу с ботом\n"
+        "/checkin - Отметиться на сегодня\n"
+        "/stats - Показать вашу статистику\n"
+        "/task - Получить задание дня\n"
+        "/motivation - Получить мотивационную цитату\n"
+        "/emergency - Экстренная помощь при искушении\n"
+        "/achievements - Посмотреть свои достижения\n"
+        "/reminder - Настроить ежедневные напоминания\n"
+        "/timezone - Часовой пояс для напоминаний и отметок\n"
+        "/chat - Присоединиться к чату сообщества\n"
+        "/history - История чата\n"
+        "/search <слова> - Поиск по чату\n"
+        "/help - Показать эту справку"
+    ),
+    "main_menu": "Главное меню. Выберите действие:",
+    "already_checked_in": "Вы уже отметились сегодня! Приходите завтра.",
+    "checkin_streak": "✅ Отлично! Ваша серия без срывов: {streak} дней подряд!",
+    "checkin_reset": "✅ Отметка принята. К сожалению, ваша серия была сброшена из-за пропущенных дней. Новая серия: 1 день.",
+    "checkin_accepted": "✅ Отметка принята.",
+    "new_achievements": "\n\n🏆 *Новые достижения:*\n",
+    "gift_28_days": "\n\n🎁 *Поздравляем с достижением 28 дней!*\nВаш подарок: [Перейти на сайт](https://вашссылка.ru)",
+    "stats": (
+        "📊 *Ваша статистика:*\n\n"
+        "📅 Дата начала: {start_date}\n"
+        "📈 Текущая серия: {streak} дней\n"
+        "🏆 Рекордная серия: {longest_streak} дней\n"
+        "⏱ Всего дней с начала пути: {total_days}"
+    ),
+    "task": "📝 *Задание дня:*\n\n{task}\n\nВыполните это задание и станьте на шаг ближе к вашей цели!",
+    "motivation": "🖼 *Мотивация дня:*\n\n_{quote}_",
+    "emergency": (
+        "🆘 *Экстренная помощь*\n\n"
+        "Чувствуете искушение? Мы здесь, чтобы помочь вам!\n"
+        "Выберите тип помощи ниже:"
+    ),
+    "emergency_tip": "🆘 *Экстренная помощь:*\n\n{tip}\n\nВы справитесь! Оставайтесь сильными!",
+    "achievements_earned": "🏆 *Ваши достижения:*\n\n",
+    "achievement_line": "{title} - получено {date}\n",
+    "achievements_upcoming": "\n*Предстоящие достижения:*\n",
+    "achievements_none": (
+        "🏆 *Достижения:*\n\n"
+        "У вас пока нет достижений. Продолжайте стараться!\n\n"
+        "*Доступные достижения:*\n"
+    ),
+    "reminder_settings": (
+        "⏰ *Настройки напоминаний*\n\n"
+        "Статус: {status}\n"
+        "Время: {time}\n"
+        "Часовой пояс: {timezone}\n\n"
+        "Чтобы изменить настройки, используйте следующие команды:\n"
+        "/reminder_on - Включить напоминания\n"
+        "/reminder_off - Выключить напоминания\n"
+        "/set_time ЧЧ:ММ - Установить время напоминания (например, /set_time 20:00)\n"
+        "/timezone ПОЯС - Установить часовой пояс (например, /timezone Europe/Moscow или /timezone +3)"
+    ),
+    "reminder_status_on": "Включены",
+    "reminder_status_off": "Выключены",
+    "reminder_on": "✅ Напоминания включены. Вы будете получать уведомления каждый день в {time}.",
+    "reminder_off": "❌ Напоминания выключены.",
+    "set_time_usage": "⚠️ Пожалуйста, укажите время в формате ЧЧ:ММ, например: /set_time 20:00",
+    "set_time_invalid": "⚠️ Неверный формат времени. Пожалуйста, используйте формат ЧЧ:ММ, например: 20:00",
+    "set_time_done": "⏰ Время напоминаний установлено на {time}.",
+    "timezone_current": (
+        "🌍 Ваш часовой пояс: {timezone}, местное время {time}.\n\n"
+        "Изменить: /timezone ПОЯС, например /timezone Europe/Moscow или /timezone +3"
+    ),
+    "timezone_invalid": "⚠️ Не удалось распознать часовой пояс. Укажите название (Europe/Moscow) или смещение от UTC (+3, -05:30).",
+    "timezone_done": "🌍 Часовой пояс установлен: {timezone}, местное время {time}.",
+    "daily_reminder": "📝 *Ежедневное напоминание*\n\n_{quote}_\n\nНе забудьте отметиться сегодня! /checkin",
+    "chat_welcome": (
+        "💬 *Чат сообщества*\n\n"
+        "Здесь вы можете общаться с другими пользователями, делиться опытом и поддерживать друг друга.\n\n"
+        "Просто отправьте сообщение, и оно будет видно всем участникам чата.\n"
+        "Предыдущие сообщения - /history, выход из чата - /exit_chat"
+    ),
+    "chat_exit": "Вы вышли из чата сообщества. Используйте /chat, чтобы вернуться в чат.",
+    "chat_joined": "👋 Пользователь {username} присоединился к чату!",
+    "chat_left": "👋 Пользователь {username} покинул чат.",
+    "chat_message": "💬 {username}: {text}",
+    "history_title": "📜 История чата\n\n",
+    "history_line": "[{time}] {username}: {text}\n",
+    "history_empty": "📜 В чате пока нет сообщений.",
+    "search_usage": "Использование: /search <слова>\nНапример: /search холодный душ",
+    "search_title": "🔎 Поиск: {query}\n\n",
+    "search_line": "[{date}] {username}: {text}\n",
+    "search_empty": "🔎 По запросу «{query}» ничего не найдено.",
+    "profile_usage": "Использование: /profile [N | Ns | stop]\nN - следующие N обновлений, Ns - N секунд",
+    "profile_started": "⏱ Профилирование включено на {limit}.",
+    "profile_updates": "{count} обновлений",
+    "profile_seconds": "{count} с",
+    "profile_running": "⏱ Профилирование уже идёт. Остановить: /profile stop",
+    "profile_not_running": "Профилирование не запущено.",
+    "profile_done": "⏱ Профилирование завершено. Отчёты:\n{files}"
+}
@@ -0,0 +1,152 @@
+import time
+import bisect
+import threading
+from threading import Thread
+from contextlib import contextmanager
+
+from flask import Flask, Response
+from werkzeug.serving import make_server
+
+# Границы корзин гистограмм по умолчанию, в секундах
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Метрики в формате Prometheus. Значения обновляются из цикла событий и из потоков БД,
+# поэтому все изменения идут под одной блокировкой
+_registry = []
+_lock = threading.Lock()
+
+
+# Экранирование значения метки
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Метки в виде {name="value",...}
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Общая часть метрик. func - необязательная функция, которая при выгрузке возвращает значение
+# (число) или значения по меткам (словарь кортеж_меток -> число) вместо накопленных
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=(), func=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.func = func
+        self._values = {}
+
+        with _lock:
+            _registry.append(self)
+
+    def _samples(self):
+        if self.func is None:
+            with _lock:
+                return list(self._values.items())
+
+        value = self.func()
+        if isinstance(value, dict):
+            return list(value.items())
+        return [((), value)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, value in self._samples():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+# Счётчик, который только растёт
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+# Текущее значение
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, *label_values):
+        with _lock:
+            self._values[label_values] = value
+
+
+# Гистограмма: число наблюдений по корзинам, сумма и количество
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+
+        with _lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    # Замер длительности блока кода
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+        with _lock:
+            snapshot = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+
+        for label_values, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, label_values, (('le', bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+
+        return lines
+
+
+# Все метрики в текстовом формате Prometheus
+def render():
+    with _lock:
+        metrics = list(_registry)
+
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Запуск HTTP-сервера с /metrics в отдельном потоке
+def start_server(listen, port):
+    app = Flask(__name__)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    server = make_server(listen, port, app, threaded=True)
+    Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+
+    return server
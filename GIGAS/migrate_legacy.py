@@ -0,0 +1,64 @@
+# migrate_legacy.py - перенос данных английской копии бота (GIGASENG) в общую базу
+#
+# Запуск (один раз, при остановленном боте):
+#     python migrate_legacy.py ../GIGASENG/nofap_bot.db [язык]
+#
+# Пользователи, уже зарегистрированные в общей базе, не перезаписываются
+import sys
+import logging
+
+import storage
+from bot import init_db
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+# Копирование пользователей, достижений и сообщений чата из старой базы с пометкой языка
+def migrate(legacy_path, locale):
+    conn = storage.get_connection()
+    conn.execute("ATTACH DATABASE ? AS legacy", (legacy_path,))
+
+    try:
+        with storage.transaction() as cursor:
+            cursor.execute('''
+            INSERT OR IGNORE INTO users
+                (user_id, username, start_date, last_check_in, streak, longest_streak,
+                 reminder_enabled, reminder_time, locale)
+            SELECT user_id, username, start_date, last_check_in, streak, longest_streak,
+                   reminder_enabled, reminder_time, ?
+            FROM legacy.users
+            ''', (locale,))
+            users = cursor.rowcount
+
+            cursor.execute('''
+            INSERT OR IGNORE INTO achievements (user_id, achievement, achieved_date)
+            SELECT user_id, achievement, achieved_date FROM legacy.achievements
+            ''')
+            achievements = cursor.rowcount
+
+            # Идентификаторы сообщений выдаются заново, чтобы не пересечься с сообщениями общей базы
+            cursor.execute('''
+            INSERT INTO chat_messages (user_id, username, message, timestamp, locale)
+            SELECT user_id, username, message, timestamp, ?
+            FROM legacy.chat_messages ORDER BY message_id
+            ''', (locale,))
+            messages = cursor.rowcount
+    finally:
+        conn.execute("DETACH DATABASE legacy")
+
+    logger.info(f"Перенесено: пользователей {users}, достижений {achievements}, сообщений {messages}")
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Использование: python migrate_legacy.py <старая_база.db> [язык]")
+        sys.exit(1)
+
+    init_db()
+    migrate(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else 'en')
+
+    # Индекс напоминаний заполнится при следующем запуске бота
+    storage.close_all()
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Сколько обновлений одного пользователя может ждать своей очереди; остальные отбрасываются,
+# чтобы пользователь, заваливающий бота нажатиями, не копил бесконечную очередь
+MAX_PENDING_PER_KEY = 20
+
+DROPPED = metrics.Counter('bot_updates_dropped_total', "Обновления, отброшенные из-за переполнения очереди пользователя")
+
+
+# Ключ очереди обновления: пользователь, иначе чат. Обновления без них не упорядочиваются
+def _key(update):
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+# Обработка обновлений с сохранением порядка для каждого пользователя: обновления разных пользователей
+# обрабатываются параллельно (не больше max_concurrent_updates), одного пользователя - строго по очереди.
+# Без этого два быстрых нажатия одного пользователя могут обогнать друг друга и сбить состояние диалога.
+# Обновления приходят в порядке получения, а asyncio.Lock пропускает ожидающих в порядке очереди.
+# Место в общем лимите берётся только когда подошла очередь пользователя: ожидающие своей очереди
+# не занимают места, и один пользователь не может остановить обработку остальных
+class UserOrderedProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        # Ключ -> [блокировка, сколько обновлений её ждут или держат]
+        self._queues = {}
+
+    # Заменяет process_update базового класса, который занимает место в лимите до вызова do_process_update
+    async def process_update(self, update, coroutine):
+        key = _key(update)
+        if key is None:
+            async with self._semaphore:
+                await self.do_process_update(update, coroutine)
+            return
+
+        entry = self._queues.get(key)
+        if entry is None:
+            entry = self._queues[key] = [asyncio.Lock(), 0]
+
+        if entry[1] >= MAX_PENDING_PER_KEY:
+            coroutine.close()
+            DROPPED.inc()
+            logger.warning(f"Очередь обновлений {key} переполнена, обновление отброшено")
+            return
+
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._semaphore:
+                    await self.do_process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._queues[key]
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,420 @@
+import time
+import asyncio
+import logging
+
+from telegram.error import Forbidden, BadRequest
+
+import delivery
+import metrics
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Исходящие сообщения рассылок (чат, напоминания) сначала пишутся в таблицу outbox одной транзакцией,
+# затем диспетчер каждого процесса выбирает их пачками, отправляет через пул доставки и отмечает результат.
+# Если процесс упал посреди рассылки, неотправленные сообщения остаются в таблице и уходят после перезапуска.
+# Выбранная строка скрыта от других диспетчеров на CLAIM_TIMEOUT секунд, и пока она в отправке, диспетчер
+# продлевает скрытие каждые EXTEND_INTERVAL секунд (например, пока пул ждёт после RetryAfter). Если процесс
+# упал, продление прекращается, и строку выбирают снова. Сообщения, отправленные, но не отмеченные
+# до падения, могут прийти повторно - окно не больше FLUSH_INTERVAL.
+# Пул доставки повторяет только RetryAfter; сетевые ошибки сразу возвращаются сюда и повторяются по расписанию,
+# поэтому attempts - число настоящих неудачных отправок.
+# Разовые сообщения (напоминания, у строки задан expires_at) доставляются не больше одного раза: их не повторяют
+# ни после ошибки (TimedOut мог дойти до пользователя), ни после падения процесса посреди отправки - для них
+# attempts растёт уже при выборке, и повторно выбранная строка уходит в недоставленные. Не отправленные
+# до expires_at тоже уходят в недоставленные
+
+# Сколько строк выбирается за раз и сколько может быть в отправке одновременно
+CLAIM_BATCH = 100
+MAX_IN_FLIGHT = 200
+
+# На сколько секунд выбранная строка скрыта от других диспетчеров и как часто скрытие продлевается,
+# пока сообщение в отправке
+CLAIM_TIMEOUT = 120
+EXTEND_INTERVAL = 30
+
+# Как часто записываются результаты отправки и проверяются сообщения, у которых подошёл срок повтора
+FLUSH_INTERVAL = 0.5
+
+# После скольких неудачных попыток сообщение уходит в недоставленные
+MAX_ATTEMPTS = 5
+
+# Пауза перед повтором: RETRY_DELAY * 2^(попытка - 1), не больше MAX_RETRY_DELAY секунд
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 3600
+
+# Сколько дней хранить недоставленные сообщения
+DEAD_RETENTION_DAYS = 30
+
+# Ошибки, после которых повтор бесполезен: пользователь заблокировал бота, чат не найден
+PERMANENT_ERRORS = (Forbidden, BadRequest)
+
+DEAD = metrics.Counter('bot_outbox_dead_total', "Сообщений перенесено в недоставленные")
+
+_bots = {}
+_task = None
+_wakeup = None
+_idle = None
+_stopping = False
+_in_flight = set()
+_results = []
+_extended_at = 0
+_fanouts = {}
+
+metrics.Gauge('bot_outbox_in_flight', "Сообщений из outbox в отправке", func=lambda: len(_in_flight))
+
+
+# Таблицы исходящих и недоставленных сообщений
+def create_tables(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY,
+        locale TEXT,
+        chat_id INTEGER,
+        text TEXT,
+        parse_mode TEXT,
+        label TEXT,
+        attempts INTEGER DEFAULT 0,
+        next_attempt_at REAL,
+        last_error TEXT
+    )
+    ''')
+    storage.add_column(cursor, "outbox", "expires_at", "REAL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_next_attempt ON outbox (next_attempt_at)")
+
+    # У недоставленных свой id: id строки outbox после её удаления выдаётся заново,
+    # и по нему записи разных сообщений совпали бы. Исходный id хранится в outbox_id
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS outbox_dead (
+        id INTEGER PRIMARY KEY,
+        locale TEXT,
+        chat_id INTEGER,
+        text TEXT,
+        parse_mode TEXT,
+        label TEXT,
+        attempts INTEGER,
+        last_error TEXT,
+        failed_at REAL
+    )
+    ''')
+    storage.add_column(cursor, "outbox_dead", "outbox_id", "INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_dead_failed ON outbox_dead (failed_at)")
+
+
+# Постановка рассылки в очередь внутри уже открытой транзакции.
+# messages - пары (chat_id, текст), locale - язык бота, через которого они уйдут.
+# expires_at - для разовых сообщений: время (секунды UTC), после которого отправлять уже поздно
+def add(cursor, locale, messages, label, parse_mode, expires_at=None):
+    now = time.time()
+    cursor.executemany(
+        "INSERT INTO outbox (locale, chat_id, text, parse_mode, label, next_attempt_at, expires_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((locale, chat_id, text, parse_mode, label, now, expires_at) for chat_id, text in messages)
+    )
+    return cursor.rowcount
+
+
+# Постановка рассылки в очередь одной транзакцией (выполняется в потоке БД). Возвращает число сообщений
+def enqueue(locale, messages, label, parse_mode, expires_at=None):
+    with storage.transaction() as cursor:
+        return add(cursor, locale, messages, label, parse_mode, expires_at)
+
+
+# Выборка пачки сообщений, срок отправки которых наступил, с временным скрытием (выполняется в потоке БД).
+# Возвращает строки для отправки и сколько разовых сообщений перенесено в недоставленные вместо отправки
+def _claim(limit):
+    now = time.time()
+
+    with storage.transaction() as cursor:
+        cursor.execute(
+            "SELECT id, locale, chat_id, text, parse_mode, label, attempts, expires_at FROM outbox "
+            "WHERE next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT ?",
+            (now, limit)
+        )
+
+        rows, dead = [], []
+        for row in cursor.fetchall():
+            if row[7] is not None and row[7] <= now:
+                dead.append((row[6], "срок отправки истёк", now, row[0]))
+            elif row[7] is not None and row[6] > 0:
+                dead.append((row[6], "отправка прервана, повтор мог бы прийти дважды", now, row[0]))
+            else:
+                rows.append(row)
+
+        # Разовое сообщение считается начатым уже при выборке
+        cursor.executemany(
+            "UPDATE outbox SET next_attempt_at = ?, attempts = attempts + ? WHERE id = ?",
+            [(now + CLAIM_TIMEOUT, int(row[7] is not None), row[0]) for row in rows]
+        )
+        _bury(cursor, dead)
+
+    return rows, len(dead)
+
+
+# Продление скрытия строк, которые ещё в отправке (выполняется в потоке БД)
+def _extend(ids):
+    deadline = time.time() + CLAIM_TIMEOUT
+    with storage.transaction() as cursor:
+        cursor.executemany("UPDATE outbox SET next_attempt_at = ? WHERE id = ?", ((deadline, row_id) for row_id in ids))
+
+
+# Запись результатов отправки одной транзакцией (выполняется в потоке БД).
+# results - четвёрки (id, число попыток до этой, ошибка или None, разовое ли сообщение)
+def _complete(results):
+    now = time.time()
+    sent, retry, dead = [], [], []
+
+    for row_id, attempts, error, once in results:
+        if error is None:
+            sent.append((row_id,))
+        elif once or isinstance(error, PERMANENT_ERRORS) or attempts + 1 >= MAX_ATTEMPTS:
+            dead.append((attempts + 1, str(error), now, row_id))
+        else:
+            delay = min(RETRY_DELAY * 2 ** attempts, MAX_RETRY_DELAY)
+            retry.append((now + delay, str(error), row_id))
+
+    with storage.transaction() as cursor:
+        cursor.executemany("DELETE FROM outbox WHERE id = ?", sent)
+        cursor.executemany(
+            "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            retry
+        )
+        _bury(cursor, dead)
+
+    return len(dead)
+
+
+# Перенос строк в недоставленные внутри открытой транзакции. dead - четвёрки
+# (число попыток, ошибка, время, id строки outbox)
+def _bury(cursor, dead):
+    cursor.executemany(
+        "INSERT INTO outbox_dead "
+        "(outbox_id, locale, chat_id, text, parse_mode, label, attempts, last_error, failed_at) "
+        "SELECT id, locale, chat_id, text, parse_mode, label, ?, ?, ? FROM outbox WHERE id = ?",
+        dead
+    )
+    cursor.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for *_, row_id in dead])
+
+
+# Удаление старых недоставленных сообщений (выполняется в потоке БД)
+def prune_dead():
+    return storage.execute(
+        "DELETE FROM outbox_dead WHERE failed_at < ?",
+        (time.time() - DEAD_RETENTION_DAYS * 86400,)
+    )
+
+
+# Учёт пачки из outbox: результат каждого сообщения запоминается для записи в БД
+# Рассылка одного вида целиком. Выбранные пачки с одной меткой складываются, и итог пишется в журнал один раз:
+# когда выборка уже не вернула полную пачку (drained) и отправлено последнее выбранное
+class _Fanout:
+    def __init__(self, label):
+        self.label = label
+        self.started = time.monotonic()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.pending = 0
+        self.drained = False
+
+    def add(self, count):
+        self.pending += count
+        self.drained = False
+
+    def record(self, error, retries):
+        if error is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.retried += retries
+        self.pending -= 1
+        self.finish()
+
+    def finish(self):
+        if self.pending == 0 and self.drained:
+            del _fanouts[self.label]
+            elapsed = time.monotonic() - self.started
+            total = self.sent + self.failed
+            rate = total / elapsed if elapsed > 0 else 0.0
+            logger.info(
+                f"Рассылка '{self.label}': отправлено {self.sent}, ошибок {self.failed}, "
+                f"повторов {self.retried} за {elapsed:.1f} с ({rate:.1f} сообщ./с)"
+            )
+
+
+# Пачка из outbox в пуле доставки; итог по пачке в журнал не пишется, его пишет _Fanout
+class _Batch(delivery.DeliveryBatch):
+    retry_network = False
+
+    def __init__(self, label, rows):
+        super().__init__(label, len(rows))
+        self.rows = {row[0]: row for row in rows}
+        self.fanout = _fanouts.get(label)
+        if self.fanout is None:
+            self.fanout = _fanouts[label] = _Fanout(label)
+        self.fanout.add(len(rows))
+
+    def _record(self, key, error, retries):
+        super()._record(key, error, retries)
+        self.fanout.record(error, retries)
+
+        _in_flight.discard(key)
+        row = self.rows[key]
+        _results.append((key, row[6], error, row[7] is not None))
+
+        # Освободилось место для следующей пачки или отправлено всё выбранное; остальные результаты
+        # записываются раз в FLUSH_INTERVAL
+        if len(_in_flight) in (0, MAX_IN_FLIGHT - CLAIM_BATCH):
+            _wakeup.set()
+
+    def _report(self):
+        pass
+
+
+# Передача выбранных строк в пул доставки: по одной рассылке на бота, вид и режим разметки
+def _dispatch(rows):
+    groups = {}
+    for row in rows:
+        # Строка уже в отправке (продление скрытия не успело дойти до базы) - вторую копию не отправляем
+        if row[0] in _in_flight:
+            continue
+        groups.setdefault((row[1], row[5], row[4]), []).append(row)
+
+    for (locale, label, parse_mode), group in groups.items():
+        bot = _bots.get(locale)
+        if bot is None:
+            logger.error(f"Нет бота для языка {locale}, сообщений отложено: {len(group)}")
+            for row in group:
+                _results.append((row[0], row[6], LookupError(f"нет бота для языка {locale}"), row[7] is not None))
+            continue
+
+        _in_flight.update(row[0] for row in group)
+        delivery.send_bulk(
+            bot, ((row[2], row[3], row[0]) for row in group), label, parse_mode, batch=_Batch(label, group)
+        )
+
+
+# Диспетчер: записывает результаты, выбирает новые сообщения, пока есть место, и ждёт новых рассылок,
+# освобождения места или срока повтора
+async def _run():
+    while True:
+        _wakeup.clear()
+        await _flush()
+        await _extend_in_flight()
+
+        if _stopping:
+            return
+
+        rows, dead, claimed = [], 0, False
+        if MAX_IN_FLIGHT - len(_in_flight) >= CLAIM_BATCH:
+            try:
+                rows, dead = await storage.run(_claim, CLAIM_BATCH)
+                claimed = True
+            except Exception as e:
+                logger.error(f"Ошибка при выборке рассылки: {e}")
+            _dispatch(rows)
+
+        if dead:
+            DEAD.inc(amount=dead)
+            logger.warning(f"Разовых сообщений не отправлено (истёк срок или отправка прервана): {dead}")
+
+        # Пачка выбрана целиком - скорее всего, есть ещё
+        if len(rows) + dead == CLAIM_BATCH:
+            continue
+
+        # Готовое к отправке выбрано - рассылки завершаются, как только уйдёт выбранное
+        if claimed:
+            for fanout in list(_fanouts.values()):
+                fanout.drained = True
+                fanout.finish()
+
+        # Пока шла выборка, могли поставить новую рассылку - тогда диспетчер ещё не свободен
+        if not rows and not _in_flight and not _results and not _wakeup.is_set():
+            _idle.set()
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+# Продление скрытия сообщений в отправке раз в EXTEND_INTERVAL секунд
+async def _extend_in_flight():
+    global _extended_at
+
+    if not _in_flight or time.monotonic() - _extended_at < EXTEND_INTERVAL:
+        return
+
+    _extended_at = time.monotonic()
+    try:
+        await storage.run(_extend, list(_in_flight))
+    except Exception as e:
+        logger.error(f"Ошибка при продлении выборки рассылки: {e}")
+
+
+# Запись накопленных результатов отправки
+async def _flush():
+    if not _results:
+        return
+
+    results = _results[:]
+    del _results[:]
+    try:
+        dead = await storage.run(_complete, results)
+    except Exception as e:
+        logger.error(f"Ошибка при записи результатов рассылки: {e}")
+        _results.extend(results)
+        return
+
+    if dead:
+        DEAD.inc(amount=dead)
+        logger.warning(f"Недоставленных сообщений: {dead}")
+
+
+# Новые сообщения в очереди: диспетчер выбирает их, не дожидаясь следующей проверки
+def notify():
+    if _wakeup is not None:
+        _idle.clear()
+        _wakeup.set()
+
+
+# Ожидание, пока диспетчеру нечего отправлять (для бенчмарков и остановки)
+async def wait_idle():
+    await _idle.wait()
+
+
+# Запуск диспетчера в текущем цикле событий. bots - боты процесса по языкам
+def start(bots):
+    global _task, _wakeup, _idle, _stopping, _extended_at
+
+    _stopping = False
+    _extended_at = time.monotonic()
+    _fanouts.clear()
+    _bots.clear()
+    _bots.update(bots)
+    _wakeup = asyncio.Event()
+    _idle = asyncio.Event()
+    _task = asyncio.create_task(_run())
+
+
+# Остановка диспетчера: новые сообщения не выбираются, выбранные дожидаются отправки, результаты записываются.
+# Не выбранные сообщения остаются в таблице до следующего запуска
+async def shutdown():
+    global _task, _stopping
+
+    if _task is None:
+        return
+
+    _stopping = True
+    _wakeup.set()
+    await _task
+    _task = None
+
+    deadline = time.monotonic() + delivery.SHUTDOWN_TIMEOUT
+    while _in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(FLUSH_INTERVAL)
+
+    if _in_flight:
+        logger.error(f"Не дождались отправки сообщений из outbox: {len(_in_flight)}, они уйдут после перезапуска")
+
+    await _flush()
@@ -0,0 +1,189 @@
+import json
+import asyncio
+import logging
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+import shards
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Как часто библиотека передаёт изменённые user_data и состояния диалогов на запись, в секундах
+UPDATE_INTERVAL = 5
+
+
+# Таблицы для user_data и состояний ConversationHandler. Строки хранятся отдельно для каждого
+# пользователя и диалога, поэтому запись затрагивает только изменившиеся строки
+def create_tables(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_data (
+        locale TEXT,
+        user_id INTEGER,
+        data TEXT,
+        PRIMARY KEY (locale, user_id)
+    ) WITHOUT ROWID
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS conversations (
+        locale TEXT,
+        name TEXT,
+        key TEXT,
+        state INTEGER,
+        PRIMARY KEY (locale, name, key)
+    ) WITHOUT ROWID
+    ''')
+
+
+# Хранение user_data и состояний диалогов бота одного языка в основной базе.
+# Библиотека раз в UPDATE_INTERVAL передаёт изменения по одному пользователю или диалогу; они копятся
+# в памяти и пишутся одной транзакцией. Пустые user_data не хранятся, неизменившиеся строки не перезаписываются
+class SqlitePersistence(BasePersistence):
+    def __init__(self, locale, update_interval=UPDATE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.locale = locale
+
+        # Что сейчас лежит в базе: user_id -> JSON, (name, key) -> состояние
+        self._stored_users = {}
+        self._stored_conversations = {}
+
+        # Изменения, ожидающие записи; None - удалить строку
+        self._pending_users = {}
+        self._pending_conversations = {}
+
+        self._write_scheduled = False
+        self._write_task = None
+        self._write_lock = asyncio.Lock()
+
+    # Загрузка при запуске приложения. В многопроцессном режиме загружаются только пользователи этого процесса
+    async def get_user_data(self):
+        rows = await storage.afetchall("SELECT user_id, data FROM user_data WHERE locale = ?", (self.locale,))
+        rows = [row for row in rows if shards.owns(row[0])]
+        self._stored_users = {user_id: data for user_id, data in rows}
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    async def get_conversations(self, name):
+        rows = await storage.afetchall(
+            "SELECT key, state FROM conversations WHERE locale = ? AND name = ?", (self.locale, name)
+        )
+        conversations = {}
+        for key, state in rows:
+            # Ключ диалога - (chat_id, user_id)
+            if not shards.owns(json.loads(key)[-1]):
+                continue
+            self._stored_conversations[(name, key)] = state
+            conversations[tuple(json.loads(key))] = state
+        return conversations
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    # Изменения от библиотеки
+    async def update_user_data(self, user_id, data):
+        try:
+            value = json.dumps(data, ensure_ascii=False, sort_keys=True) if data else None
+        except (TypeError, ValueError) as e:
+            logger.error(f"Ошибка при сохранении user_data пользователя {user_id}: {e}")
+            return
+
+        self._set_pending(self._pending_users, self._stored_users, user_id, value)
+
+    async def drop_user_data(self, user_id):
+        self._set_pending(self._pending_users, self._stored_users, user_id, None)
+
+    async def update_conversation(self, name, key, new_state):
+        key = (name, json.dumps(key))
+        self._set_pending(self._pending_conversations, self._stored_conversations, key, new_state)
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    # Изменение ставится в очередь, только если отличается от сохранённого значения.
+    # Запись запускается отдельной задачей: все изменения одного прохода библиотеки попадают в неё
+    def _set_pending(self, pending, stored, key, value):
+        if key not in pending and stored.get(key) == value:
+            return
+
+        pending[key] = value
+
+        if not self._write_scheduled:
+            self._write_scheduled = True
+            self._write_task = asyncio.get_running_loop().create_task(self.flush())
+
+    # Запись накопленных изменений; вызывается и библиотекой при остановке приложения
+    async def flush(self):
+        async with self._write_lock:
+            self._write_scheduled = False
+            users, self._pending_users = self._pending_users, {}
+            conversations, self._pending_conversations = self._pending_conversations, {}
+
+            if not users and not conversations:
+                return
+
+            try:
+                await storage.run(self._write, users, conversations)
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении состояния пользователей ({self.locale}): {e}")
+                # Несохранённое возвращается в очередь, более новые изменения не затираются
+                for key, value in users.items():
+                    self._pending_users.setdefault(key, value)
+                for key, value in conversations.items():
+                    self._pending_conversations.setdefault(key, value)
+                return
+
+            for stored, changes in ((self._stored_users, users), (self._stored_conversations, conversations)):
+                for key, value in changes.items():
+                    if value is None:
+                        stored.pop(key, None)
+                    else:
+                        stored[key] = value
+
+    # Запись одной транзакцией (выполняется в потоке БД)
+    def _write(self, users, conversations):
+        with storage.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO user_data (locale, user_id, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (locale, user_id) DO UPDATE SET data = excluded.data",
+                [(self.locale, user_id, data) for user_id, data in users.items() if data is not None]
+            )
+            cursor.executemany(
+                "DELETE FROM user_data WHERE locale = ? AND user_id = ?",
+                [(self.locale, user_id) for user_id, data in users.items() if data is None]
+            )
+            cursor.executemany(
+                "INSERT INTO conversations (locale, name, key, state) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (locale, name, key) DO UPDATE SET state = excluded.state",
+                [(self.locale, name, key, state) for (name, key), state in conversations.items() if state is not None]
+            )
+            cursor.executemany(
+                "DELETE FROM conversations WHERE locale = ? AND name = ? AND key = ?",
+                [(self.locale, name, key) for (name, key), state in conversations.items() if state is None]
+            )
@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import logging
+import datetime
+import threading
+from collections import Counter
+
+import config
+import shards
+
+logger = logging.getLogger(__name__)
+
+# Как часто снимаются стеки всех потоков для flame graph
+SAMPLE_INTERVAL = 0.005
+
+# Профилирование по числу обновлений тоже ограничено по времени, чтобы не остаться включённым надолго
+MAX_SECONDS = 600
+MAX_UPDATES = 100000
+
+# Сколько секунд профилировать по сигналу SIGUSR1
+SIGNAL_SECONDS = 30
+
+# Сколько строк в каждой таблице отчёта
+REPORT_LINES = 60
+
+_session = None
+
+# Задачи записи отчётов: ссылки держатся, пока задача не завершится
+_writing = set()
+
+
+# Один сеанс профилирования. cProfile работает в потоке цикла событий, где выполняются все обработчики
+# и задания; отдельный поток раз в SAMPLE_INTERVAL снимает стеки всех потоков (включая потоки БД)
+class _Session:
+    def __init__(self, updates, on_done):
+        self.updates_left = updates
+        self.on_done = on_done
+        self.updates = 0
+        self.started = time.perf_counter()
+        self.profile = cProfile.Profile()
+        self.samples = Counter()
+        self.timer = None
+        self._stop_sampling = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+
+        while not self._stop_sampling.wait(SAMPLE_INTERVAL):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self.profile.enable()
+        self._sampler.start()
+
+    def stop(self):
+        self.profile.disable()
+        self._stop_sampling.set()
+        if self.timer is not None:
+            self.timer.cancel()
+
+    # Запись отчётов (выполняется в отдельном потоке). Возвращает пути к файлам
+    def write(self, elapsed):
+        self._sampler.join()
+
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        name = "profile_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Обработчики профилируются одновременно по одному сигналу - у каждого свой файл
+        if shards.COUNT > 1:
+            name += f"_worker{shards.INDEX}"
+        base = os.path.join(config.PROFILE_DIR, name)
+
+        # Сырые данные cProfile: для snakeviz или pstats
+        self.profile.dump_stats(base + ".prof")
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(
+                f"Длительность: {elapsed:.1f} с, обновлений: {self.updates}, "
+                f"снимков стеков: {sum(self.samples.values())}\n\n"
+            )
+            stats = pstats.Stats(self.profile, stream=f)
+            stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+            stats.sort_stats('tottime').print_stats(REPORT_LINES)
+
+        # Свёрнутые стеки в формате flamegraph.pl / speedscope: "поток;функция;...;функция число"
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        return [base + ".txt", base + ".folded", base + ".prof"]
+
+
+# Включение профилирования на updates обновлений или seconds секунд (вызывается из цикла событий).
+# on_done(paths) - необязательная корутина, которая получит пути к отчётам.
+# Возвращает False, если профилирование уже идёт
+def start(updates=None, seconds=None, on_done=None):
+    global _session
+
+    if _session is not None:
+        return False
+
+    if updates is not None:
+        updates = max(1, min(updates, MAX_UPDATES))
+    seconds = min(seconds or MAX_SECONDS, MAX_SECONDS)
+
+    session = _Session(updates, on_done)
+    try:
+        session.start()
+    except ValueError as e:
+        # В процессе уже работает другой профилировщик
+        logger.error(f"Ошибка при включении профилирования: {e}")
+        return False
+
+    session.timer = asyncio.get_running_loop().call_later(seconds, stop)
+    _session = session
+
+    limit = f"{updates} обновлений" if updates is not None else f"{seconds} с"
+    logger.info(f"Профилирование включено на {limit}")
+    return True
+
+
+# Учёт обработанного обновления; started - время начала его обработки (time.perf_counter()).
+# Обновления, начатые до включения профилирования, не считаются
+def update_done(started):
+    if _session is None or started < _session.started:
+        return
+
+    _session.updates += 1
+    if _session.updates_left is not None:
+        _session.updates_left -= 1
+        if _session.updates_left <= 0:
+            stop()
+
+
+# Остановка профилирования и запись отчётов в фоне. Возвращает задачу записи или None, если профилирование не шло
+def stop():
+    global _session
+
+    session = _session
+    if session is None:
+        return None
+
+    _session = None
+    session.stop()
+    elapsed = time.perf_counter() - session.started
+
+    task = asyncio.get_running_loop().create_task(_finish(session, elapsed))
+    _writing.add(task)
+    task.add_done_callback(_writing.discard)
+    return task
+
+
+async def _finish(session, elapsed):
+    try:
+        paths = await asyncio.to_thread(session.write, elapsed)
+    except Exception as e:
+        logger.error(f"Ошибка при записи отчёта профилирования: {e}")
+        return
+
+    logger.info(f"Отчёт профилирования: {', '.join(paths)}")
+
+    if session.on_done is not None:
+        try:
+            await session.on_done(paths)
+        except Exception as e:
+            logger.error(f"Ошибка при отправке отчёта профилирования: {e}")
+
+
+# Обработчик сигнала SIGUSR1: включает профилирование на SIGNAL_SECONDS или останавливает идущее
+def toggle():
+    if stop() is None:
+        start(seconds=SIGNAL_SECONDS)
@@ -0,0 +1,128 @@
+import time
+import threading
+from collections import OrderedDict
+
+import metrics
+import storage
+
+# Сколько профилей держать в памяти и сколько секунд считать их свежими
+MAX_SIZE = 50000
+TTL = 600
+
+# Поля профиля, которые читают обработчики
+FIELDS = (
+    "start_date", "last_check_in", "streak", "longest_streak", "reminder_enabled", "reminder_time", "locale", "timezone"
+)
+
+# Кэш профилей пользователей: user_id -> (время загрузки, профиль). Порядок - от давно к недавно использованным
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+# Загрузки из БД, идущие прямо сейчас. Запись профиля отменяет загрузку,
+# чтобы устаревшая строка, прочитанная до записи, не попала в кэш
+_pending = {}
+
+_hits = 0
+_misses = 0
+_evictions = 0
+
+metrics.Counter('bot_profile_cache_hits_total', "Профили, найденные в кэше", func=lambda: stats()['hits'])
+metrics.Counter('bot_profile_cache_misses_total', "Профили, загруженные из БД", func=lambda: stats()['misses'])
+metrics.Counter(
+    'bot_profile_cache_evictions_total', "Профили, вытесненные из переполненного кэша", func=lambda: stats()['evictions']
+)
+metrics.Gauge('bot_profile_cache_size', "Профилей в кэше", func=lambda: stats()['size'])
+
+
+# Профиль из кэша или None, если его нет или он устарел
+def _lookup(user_id):
+    global _hits
+
+    with _lock:
+        entry = _cache.get(user_id)
+
+        if entry is not None:
+            loaded_at, profile = entry
+            if time.monotonic() - loaded_at < TTL:
+                _cache.move_to_end(user_id)
+                _hits += 1
+                return profile
+            del _cache[user_id]
+
+    return None
+
+
+# Сохранение профиля с вытеснением давно не использованных
+def _store(user_id, profile):
+    global _evictions
+
+    _cache[user_id] = (time.monotonic(), profile)
+    _cache.move_to_end(user_id)
+
+    while len(_cache) > MAX_SIZE:
+        _cache.popitem(last=False)
+        _evictions += 1
+
+
+# Загрузка профиля из БД (выполняется в потоке БД)
+def _load(user_id):
+    global _misses
+
+    token = object()
+    with _lock:
+        _misses += 1
+        _pending[user_id] = token
+
+    row = storage.fetchone(
+        f"SELECT {', '.join(FIELDS)} FROM users WHERE user_id = ?",
+        (user_id,)
+    )
+    profile = dict(zip(FIELDS, row)) if row else None
+
+    with _lock:
+        if _pending.get(user_id) is token:
+            del _pending[user_id]
+            if profile is not None:
+                _store(user_id, profile)
+
+    return profile
+
+
+# Получение профиля в синхронном коде (в потоке БД)
+def get(user_id):
+    profile = _lookup(user_id)
+    if profile is None:
+        profile = _load(user_id)
+    return profile
+
+
+# Получение профиля из обработчика: попадание в кэш обходится без обращения к пулу БД
+async def aget(user_id):
+    profile = _lookup(user_id)
+    if profile is None:
+        profile = await storage.run(_load, user_id)
+    return profile
+
+
+# Сквозная запись: вызывается после того, как изменение зафиксировано в БД
+def update(user_id, **fields):
+    with _lock:
+        _pending.pop(user_id, None)
+
+        entry = _cache.get(user_id)
+        if entry is not None:
+            loaded_at, profile = entry
+            _cache[user_id] = (loaded_at, {**profile, **fields})
+
+
+# Запись полного профиля (например, сразу после регистрации)
+def put(user_id, profile):
+    with _lock:
+        _pending.pop(user_id, None)
+        _store(user_id, dict(profile))
+
+
+# Счётчики попаданий, промахов и вытеснений (экспортируются в метрики)
+def stats():
+    with _lock:
+        return {"hits": _hits, "misses": _misses, "evictions": _evictions, "size": len(_cache)}
@@ -0,0 +1,200 @@
+import logging
+import datetime
+
+import config
+import leader
+import metrics
+import shards
+import storage
+import timezones
+
+logger = logging.getLogger(__name__)
+
+# Очередь напоминаний в БД: у каждого пользователя с включёнными напоминаниями в users.next_fire_at лежит
+# момент следующего напоминания (секунды UTC), по нему построен частичный индекс. Тик планировщика выбирает
+# наступившие напоминания пачками и в той же транзакции переносит их на следующий день, поэтому стоимость тика -
+# O(напоминаний к отправке), а пропущенные минуты (задание опоздало, бот перезапускался) не теряются.
+# users.reminded_on - день пользователя, за который напоминание уже выбрано к отправке: больше одного
+# напоминания в день пользователь не получает, даже если перенёс время на более позднее
+
+# Насколько напоминание может опоздать: наступившие раньше досылаются, если опоздание не больше
+# GRACE_SECONDS, более старые пропускаются до следующего дня
+GRACE_SECONDS = 2 * 3600
+
+# Сколько напоминаний выбирается одной транзакцией
+BATCH_SIZE = 500
+
+# Как часто планировщик выбирает наступившие напоминания, в секундах. Со сглаживанием напоминания
+# наступают в течение всей минуты, и частый тик отдаёт их в рассылку равномерно
+TICK_INTERVAL = 10
+
+# Какая доля общего лимита отправки отводится напоминаниям: остальное остаётся ответам и чату
+RATE_SHARE = 0.8
+
+MISSED = metrics.Counter('bot_reminders_missed_total', "Напоминаний пропущено: опоздание больше допустимого")
+
+
+# Перевод строки "ЧЧ:ММ" в минуту суток
+def minute_of_day(time_str):
+    hours, minutes = map(int, time_str.split(':'))
+    return hours * 60 + minutes
+
+
+# Перевод минуты суток обратно в строку "ЧЧ:ММ"
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+# Сдвиг напоминания пользователя внутри окна сглаживания, в секундах. Постоянный для пользователя
+# (мультипликативный хеш user_id), поэтому напоминание приходит каждый день в одно и то же время
+def jitter(user_id):
+    window = config.REMINDER_SPREAD_MINUTES * 60
+    if window <= 0:
+        return 0
+    return (user_id * 2654435761 % 2 ** 32) * window // 2 ** 32
+
+
+# Сколько напоминаний выбирать за один тик: столько, сколько доля напоминаний в лимите отправки rate
+# (сообщений в секунду) пропустит до следующего тика. Остальные ждут в очереди, а не в пуле доставки,
+# поэтому даже при всплеске отправка идёт с постоянной скоростью
+def tick_budget(rate):
+    return max(1, int(rate * RATE_SHARE * TICK_INTERVAL))
+
+
+# Момент local_minute дня day в поясе tz (None - пояс сервера с его правилами летнего времени)
+def _local_moment(day, local_minute, tz):
+    moment = datetime.datetime.combine(day, datetime.time(local_minute // 60, local_minute % 60))
+    return moment.replace(tzinfo=tz) if tz is not None else moment.astimezone()
+
+
+# Ближайшее после after (aware datetime) срабатывание напоминания на время time_str в поясе zone,
+# со сдвигом shift секунд, в секундах UTC. Пропускается день reminded_on, за который напоминание уже было.
+# Смещение пояса берётся на каждый день отдельно, поэтому переход на летнее время учитывается сам
+def next_fire_at(time_str, zone, after, reminded_on=None, shift=0):
+    local_minute = minute_of_day(time_str)
+    tz = timezones.get(zone)
+    day = (after.astimezone(tz) if tz is not None else after.astimezone()).date()
+
+    while True:
+        moment = _local_moment(day, local_minute, tz) + datetime.timedelta(seconds=shift)
+        if moment > after and day.isoformat() != reminded_on:
+            return int(moment.timestamp())
+        day += datetime.timedelta(days=1)
+
+
+# День пользователя в поясе zone, на который приходится момент timestamp
+def _local_day(timestamp, zone):
+    tz = timezones.get(zone)
+    moment = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    return (moment.astimezone(tz) if tz is not None else moment.astimezone()).date().isoformat()
+
+
+# Столбцы очереди в таблице users (миграция схемы при запуске)
+def create_columns(cursor):
+    storage.add_column(cursor, "users", "next_fire_at", "INTEGER")
+    storage.add_column(cursor, "users", "reminded_on", "TEXT")
+
+    # Выборка по времени напоминания больше не нужна: очередь идёт по next_fire_at
+    cursor.execute("DROP INDEX IF EXISTS idx_users_reminder_time")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_next_fire ON users (next_fire_at) WHERE next_fire_at IS NOT NULL"
+    )
+
+    arm_unscheduled(cursor)
+
+
+# Постановка в очередь пользователей с включёнными напоминаниями, у которых срабатывание ещё не задано
+# (база до появления очереди, пользователи, добавленные в обход бота)
+def arm_unscheduled(cursor):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cursor.execute(
+        "SELECT user_id, reminder_time, timezone, reminded_on FROM users "
+        "WHERE reminder_enabled = 1 AND next_fire_at IS NULL"
+    )
+
+    updates = []
+    for user_id, time_str, zone, reminded_on in cursor.fetchall():
+        try:
+            updates.append((next_fire_at(time_str, zone, now, reminded_on, jitter(user_id)), user_id))
+        except Exception as e:
+            logger.error(f"Некорректные настройки напоминания у пользователя {user_id}: {time_str}, {zone} ({e})")
+
+    cursor.executemany("UPDATE users SET next_fire_at = ? WHERE user_id = ?", updates)
+    if updates:
+        logger.info(f"Поставлено в очередь напоминаний: {len(updates)}")
+
+
+# Изменение настроек напоминания и перепланирование одной транзакцией (выполняется в потоке БД).
+# fields - новые значения столбцов reminder_enabled, reminder_time, timezone
+def update(user_id, **fields):
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    with storage.transaction() as cursor:
+        cursor.execute(
+            "SELECT reminder_enabled, reminder_time, timezone, reminded_on FROM users WHERE user_id = ?",
+            (user_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return
+
+        settings = {"reminder_enabled": row[0], "reminder_time": row[1], "timezone": row[2], **fields}
+        fire_at = None
+        if settings["reminder_enabled"]:
+            fire_at = next_fire_at(settings["reminder_time"], settings["timezone"], now, row[3], jitter(user_id))
+
+        assignments = "".join(f"{name} = ?, " for name in fields)
+        cursor.execute(
+            f"UPDATE users SET {assignments}next_fire_at = ? WHERE user_id = ?",
+            (*fields.values(), fire_at, user_id)
+        )
+
+
+# Выборка пачки наступивших к моменту now (секунды UTC) напоминаний и их перенос на следующий день
+# одной транзакцией (выполняется в потоке БД). Возвращает число выбранных строк и пары (user_id, язык)
+# для отправки; вместо пар None, если аренда lease с жетоном token уже не у этого процесса.
+# enqueue(cursor, пары) ставит напоминания в очередь отправки в той же транзакции: напоминание либо
+# остаётся в очереди напоминаний, либо уже лежит в исходящих, и за день выбирается не больше одного раза
+def claim(now, lease, token, limit=BATCH_SIZE, enqueue=None):
+    moment = datetime.datetime.fromtimestamp(now, datetime.timezone.utc)
+
+    # Напоминания своих пользователей в многопроцессном режиме
+    shard = "" if shards.COUNT == 1 else f"AND user_id % {shards.COUNT} = {shards.INDEX} "
+
+    with storage.transaction() as cursor:
+        # Проверка ограждения в той же транзакции: устаревший ведущий не заберёт напоминания
+        if not leader.fence(lease, token):
+            return 0, None
+
+        cursor.execute(
+            "SELECT user_id, reminder_time, timezone, reminded_on, locale, next_fire_at FROM users "
+            f"WHERE next_fire_at <= ? {shard}ORDER BY next_fire_at LIMIT ?",
+            (now, limit)
+        )
+
+        due = []
+        updates = []
+        for user_id, time_str, zone, reminded_on, locale, fire_at in cursor.fetchall():
+            try:
+                # День считается по выбранному времени без сдвига: сдвиг может перенести напоминание за полночь
+                shift = jitter(user_id)
+                day = _local_day(fire_at - shift, zone)
+                if now - fire_at <= GRACE_SECONDS and day != reminded_on:
+                    due.append((user_id, locale))
+                    reminded_on = day
+                elif day != reminded_on:
+                    MISSED.inc()
+
+                updates.append((next_fire_at(time_str, zone, moment, reminded_on, shift), reminded_on, user_id))
+            except Exception as e:
+                # Пользователь с неразборчивыми настройками выпадает из очереди, чтобы не выбираться каждый тик
+                logger.error(f"Некорректные настройки напоминания у пользователя {user_id}: {time_str}, {zone} ({e})")
+                updates.append((None, reminded_on, user_id))
+
+        cursor.executemany("UPDATE users SET next_fire_at = ?, reminded_on = ? WHERE user_id = ?", updates)
+
+        if enqueue is not None and due:
+            enqueue(cursor, due)
+
+    return len(updates), due
+
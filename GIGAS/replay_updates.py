@@ -0,0 +1,61 @@
+# replay_updates.py - локальная замена Telegram для режима вебхука:
+# отправляет записанные обновления (по одному JSON на строку) на локальный вебхук бота
+import os
+import sys
+import json
+import time
+import urllib.request
+import urllib.error
+
+import config
+from webhook import SECRET_HEADER
+
+
+def post_update(url, secret, update):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(update).encode('utf-8'),
+        headers={'Content-Type': 'application/json', SECRET_HEADER: secret},
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Использование: python replay_updates.py updates.jsonl [задержка_в_секундах] [язык_бота]")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    locale = sys.argv[3] if len(sys.argv) > 3 else 'ru'
+
+    url = f"http://{config.WEBHOOK_LISTEN}:{config.WEBHOOK_PORT}/{config.WEBHOOK_PATH}/{locale}"
+    secret = os.environ.get('WEBHOOK_SECRET', '')
+
+    sent = failed = 0
+    started = time.monotonic()
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                post_update(url, secret, json.loads(line))
+                sent += 1
+            except (urllib.error.URLError, ValueError) as e:
+                print(f"Ошибка при отправке обновления: {e}")
+                failed += 1
+
+            if delay:
+                time.sleep(delay)
+
+    elapsed = time.monotonic() - started
+    print(f"Отправлено {sent}, ошибок {failed} за {elapsed:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import signal
+import asyncio
+import logging
+import secrets
+from threading import Thread
+from contextlib import AsyncExitStack
+
+import config
+import chat_log
+import delivery
+import metrics
+import outbox
+import profiler
+import shards
+import webhook
+
+logger = logging.getLogger(__name__)
+
+
+# Работа всех ботов процесса в одном цикле событий до получения сигнала остановки.
+# applications - приложения ботов по языкам; обновления принимаются опросом или через вебхук.
+# updates - очередь процесса-обработчика в многопроцессном режиме: обновления приходят из входного процесса,
+# а остановка - по команде из той же очереди, после уже полученных обновлений
+async def run(applications, updates=None):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+
+    for sig in (signal.SIGINT, signal.SIGTERM) if updates is None else (signal.SIGTERM,):
+        loop.add_signal_handler(sig, stop.set)
+
+    # kill -USR1 <pid> включает профилирование на profiler.SIGNAL_SECONDS секунд или останавливает его
+    if hasattr(signal, 'SIGUSR1'):
+        loop.add_signal_handler(signal.SIGUSR1, profiler.toggle)
+
+    server = None
+    metrics_server = None
+
+    # Входной процесс занимает METRICS_PORT, обработчики - следующие порты по номеру
+    if config.METRICS_PORT:
+        port = config.METRICS_PORT if updates is None else config.METRICS_PORT + 1 + shards.INDEX
+        metrics_server = metrics.start_server(config.METRICS_LISTEN, port)
+        logger.info(f"Метрики: http://{config.METRICS_LISTEN}:{port}/metrics")
+
+    async with AsyncExitStack() as stack:
+        for application in applications.values():
+            await stack.enter_async_context(application)
+
+        for application in applications.values():
+            await application.start()
+
+        # Диспетчер исходящих: досылает и то, что не успело уйти до прошлой остановки
+        outbox.start({locale: app.bot for locale, app in applications.items()})
+
+        if updates is not None:
+            Thread(target=shards.receive, args=(updates, applications, loop, stop), name='shard', daemon=True).start()
+        elif config.BOT_MODE == 'webhook':
+            secret = config.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+            server = webhook.start_server(list(applications), webhook.deliver_to(applications, loop), secret)
+
+            # Без WEBHOOK_URL сервер принимает только локальные запросы (например, от replay_updates.py)
+            if config.WEBHOOK_URL:
+                await webhook.register({locale: app.bot for locale, app in applications.items()}, secret)
+            else:
+                logger.warning("WEBHOOK_URL не задан, вебхук в Telegram не зарегистрирован")
+        else:
+            for application in applications.values():
+                await application.updater.start_polling()
+
+        await stop.wait()
+
+        if server is not None:
+            await asyncio.to_thread(server.shutdown)
+
+        for application in applications.values():
+            if application.updater.running:
+                await application.updater.stop()
+            await application.stop()
+
+        # Незаконченное профилирование сохраняется, пока работают боты для отправки отчёта
+        report = profiler.stop()
+        if report is not None:
+            await report
+
+        # Обработчики остановлены - записываем накопленные сообщения чата
+        await chat_log.shutdown()
+
+        # Рассылки дожидаются до закрытия HTTP-клиентов ботов: сначала выбранные из исходящих, затем остальные
+        await outbox.shutdown()
+        await delivery.shutdown()
+
+    if metrics_server is not None:
+        await asyncio.to_thread(metrics_server.shutdown)
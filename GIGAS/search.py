@@ -0,0 +1,155 @@
+import logging
+
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+
+import i18n
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Сколько результатов на странице поиска и сколько страниц можно пролистать
+PAGE_SIZE = 10
+MAX_PAGES = 20
+
+# Сколько сообщений индексируется одной транзакцией при первичном заполнении индекса
+BACKFILL_BATCH = 5000
+
+# Сколько слов вокруг найденного показывать в результатах
+SNIPPET_TOKENS = 12
+
+
+# Полнотекстовый индекс по сообщениям чата. Таблица FTS5 с внешним содержимым хранит только индекс,
+# тексты читаются из chat_messages. Триггеры обновляют индекс при вставке и удалении сообщений
+# (в том числе при переносе в архив), поэтому отдельной синхронизации не нужно.
+# Сообщения, записанные до появления индекса, индексируются заданием backfill: таблица search_backfill
+# хранит ещё не проиндексированный диапазон (done, upto]
+def create_table(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'chat_search'")
+    if cursor.fetchone() is not None:
+        return
+
+    cursor.execute('''
+    CREATE VIRTUAL TABLE chat_search USING fts5(
+        message,
+        content = 'chat_messages',
+        content_rowid = 'message_id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS search_backfill (
+        done INTEGER,
+        upto INTEGER
+    )
+    ''')
+    # Агрегатный запрос возвращает строку и на пустой таблице, поэтому пустой диапазон отсекается в HAVING
+    cursor.execute(
+        "INSERT INTO search_backfill (done, upto) SELECT 0, MAX(message_id) FROM chat_messages "
+        "HAVING MAX(message_id) IS NOT NULL"
+    )
+
+    cursor.execute('''
+    CREATE TRIGGER chat_search_insert AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO chat_search (rowid, message) VALUES (new.message_id, new.message);
+    END
+    ''')
+
+    # Удалять из индекса можно только проиндексированные строки, иначе FTS5 с внешним содержимым повредится
+    cursor.execute('''
+    CREATE TRIGGER chat_search_delete AFTER DELETE ON chat_messages
+    WHEN NOT EXISTS (SELECT 1 FROM search_backfill WHERE old.message_id > done AND old.message_id <= upto)
+    BEGIN
+        INSERT INTO chat_search (chat_search, rowid, message) VALUES ('delete', old.message_id, old.message);
+    END
+    ''')
+
+
+# Индексация одной пачки старых сообщений. Возвращает False, когда индекс заполнен
+def _backfill_batch():
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT done, upto FROM search_backfill")
+        row = cursor.fetchone()
+        if row is None:
+            return False
+
+        done, upto = row
+
+        # Пустой диапазон мог остаться от первой версии create_table - индексировать нечего
+        if upto is None:
+            cursor.execute("DELETE FROM search_backfill")
+            return False
+        cursor.execute(
+            "SELECT message_id FROM chat_messages WHERE message_id > ? AND message_id <= ? "
+            "ORDER BY message_id LIMIT 1 OFFSET ?",
+            (done, upto, BACKFILL_BATCH - 1)
+        )
+        last = cursor.fetchone()
+        batch_end = last[0] if last is not None else upto
+
+        cursor.execute(
+            "INSERT INTO chat_search (rowid, message) "
+            "SELECT message_id, message FROM chat_messages WHERE message_id > ? AND message_id <= ?",
+            (done, batch_end)
+        )
+
+        if batch_end >= upto:
+            cursor.execute("DELETE FROM search_backfill")
+            return False
+
+        cursor.execute("UPDATE search_backfill SET done = ?", (batch_end,))
+        return True
+
+
+# Первичное заполнение индекса пачками (выполняется в потоке БД)
+def backfill():
+    batches = 0
+    while _backfill_batch():
+        batches += 1
+
+    if batches:
+        logger.info(f"Поисковый индекс чата заполнен, пачек: {batches + 1}")
+
+
+# Перевод запроса пользователя в синтаксис FTS5: каждое слово ищется как префикс, все слова обязательны.
+# Кавычки экранируются, поэтому операторы FTS5 в запросе не работают и не вызывают ошибок
+def _match_expression(query):
+    terms = query.split()
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+# Страница результатов поиска в комнате (выполняется в потоке БД). page - номер страницы с нуля
+def page(locale, query, page=0):
+    catalog = i18n.get(locale)
+    expression = _match_expression(query)
+
+    if not expression:
+        return catalog.text("search_usage"), None
+
+    page = max(0, min(page, MAX_PAGES - 1))
+
+    # Выборка упорядочена по релевантности (bm25), поэтому постраничный проход идёт по номеру страницы
+    rows = storage.fetchall(
+        f"SELECT m.username, m.timestamp, snippet(chat_search, 0, '«', '»', '…', {SNIPPET_TOKENS}) "
+        "FROM chat_search JOIN chat_messages AS m ON m.message_id = chat_search.rowid "
+        "WHERE chat_search MATCH ? AND m.locale = ? "
+        "ORDER BY chat_search.rank LIMIT ? OFFSET ?",
+        (expression, locale, PAGE_SIZE + 1, page * PAGE_SIZE)
+    )
+
+    if not rows:
+        return catalog.text("search_empty", query=query), None
+
+    has_next = len(rows) > PAGE_SIZE and page < MAX_PAGES - 1
+
+    text = catalog.text("search_title", query=query)
+    for username, timestamp, snippet in rows[:PAGE_SIZE]:
+        text += catalog.text("search_line", date=(timestamp or '')[:10], username=username, text=snippet)
+
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton(catalog.buttons["search_prev"], callback_data=f"search_{page - 1}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton(catalog.buttons["search_next"], callback_data=f"search_{page + 1}"))
+
+    return text, InlineKeyboardMarkup([buttons]) if buttons else None
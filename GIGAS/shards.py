@@ -0,0 +1,230 @@
+import os
+import signal
+import asyncio
+import logging
+import multiprocessing
+from contextlib import AsyncExitStack
+
+from telegram import Bot, Update
+from telegram.ext import Updater
+from telegram.request import HTTPXRequest
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Номер этого процесса-обработчика и число обработчиков. В обычном режиме один процесс обслуживает всех
+COUNT = 1
+INDEX = 0
+
+# Сколько ждать, пока обработчик допишет очередь и остановится
+WORKER_STOP_TIMEOUT = 60
+
+# Как часто проверять, живы ли обработчики
+WORKER_CHECK_INTERVAL = 5
+
+DISPATCHED = metrics.Counter('bot_ingress_updates_total', "Обновления, переданные обработчикам", ('worker',))
+
+
+# Номер обработчика, который обслуживает пользователя (или чат, если пользователя в обновлении нет)
+def shard_of(user_id, count):
+    return user_id % count
+
+
+# Пользователь обслуживается этим процессом. Состояние в памяти (индекс напоминаний, кэш профилей,
+# user_data) у каждого обработчика своё и загружается только для его пользователей
+def owns(user_id):
+    return COUNT == 1 or shard_of(user_id, COUNT) == INDEX
+
+
+# user_id из обновления в виде JSON: отправитель (from/user) объекта обновления, иначе его чат
+def user_of(data):
+    for key, value in data.items():
+        if key == 'update_id' or not isinstance(value, dict):
+            continue
+
+        for field in ('from', 'user'):
+            if isinstance(value.get(field), dict):
+                return value[field].get('id')
+
+        chat = value.get('chat') or (value.get('message') or {}).get('chat')
+        if isinstance(chat, dict):
+            return chat.get('id')
+
+    return None
+
+
+# Поток процесса-обработчика: принимает обновления от входного процесса и ставит их в очереди приложений.
+# None в очереди - сигнал остановки
+def receive(updates, applications, loop, stop):
+    while True:
+        item = updates.get()
+        if item is None:
+            loop.call_soon_threadsafe(stop.set)
+            return
+
+        locale, data = item
+        application = applications.get(locale)
+        if application is None:
+            logger.error(f"Нет бота для языка {locale}, обновление пропущено")
+            continue
+
+        update = Update.de_json(data, application.bot)
+        loop.call_soon_threadsafe(application.update_queue.put_nowait, update)
+
+
+# Точка входа процесса-обработчика (запускается через multiprocessing в отдельном интерпретаторе).
+# serve(updates) - запуск ботов процесса; передаётся функцией, а не импортируется, потому что модуль бота
+# уже загружен в обработчике как главный
+def worker_main(index, count, updates, serve):
+    global COUNT, INDEX
+    COUNT, INDEX = count, index
+
+    # Ctrl+C получает вся группа процессов; обработчик останавливается по команде входного процесса,
+    # дописав уже полученные обновления
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    import chat
+    import history
+    import delivery
+
+    # Общий лимит Telegram на бота делится между процессами
+    delivery.GLOBAL_RATE = delivery.GLOBAL_RATE / count
+    delivery.GLOBAL_BURST = max(1, delivery.GLOBAL_BURST // count)
+
+    # Участников чата и последние страницы истории меняют и другие процессы
+    chat.SHARED = True
+    history.CACHE_LATEST = False
+
+    serve(updates)
+
+
+def _bot(token):
+    if config.BOT_API_URL:
+        return Bot(
+            token, base_url=f"{config.BOT_API_URL}/bot", base_file_url=f"{config.BOT_API_URL}/file/bot",
+            request=HTTPXRequest()
+        )
+    return Bot(token, request=HTTPXRequest())
+
+
+# Передача обновлений, полученных опросом, обработчикам
+async def _forward(locale, queue, dispatch):
+    while True:
+        update = await queue.get()
+        dispatch(locale, update.to_dict())
+
+
+# Входной процесс: получает обновления опросом или через вебхук и раздаёт их обработчикам по user_id.
+# Все обновления одного пользователя попадают в один процесс и идут в нём по порядку
+async def _ingress(workers, start_worker):
+    import webhook
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # kill -USR1 <pid входного процесса> переключает профилирование во всех обработчиках
+    # (без обработчика сигнал по умолчанию завершил бы входной процесс)
+    def forward_profiler_signal():
+        for process, _ in workers:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGUSR1)
+
+    if hasattr(signal, 'SIGUSR1'):
+        loop.add_signal_handler(signal.SIGUSR1, forward_profiler_signal)
+
+    def dispatch(locale, data):
+        user_id = user_of(data)
+        index = shard_of(user_id, len(workers)) if user_id is not None else 0
+        workers[index][1].put((locale, data))
+        DISPATCHED.inc(str(index))
+
+    # Упавший обработчик перезапускается; его пользователи ждут в очереди
+    async def watch():
+        while True:
+            await asyncio.sleep(WORKER_CHECK_INTERVAL)
+            for index, (process, updates) in enumerate(workers):
+                if not process.is_alive():
+                    logger.error(f"Обработчик {index} завершился с кодом {process.exitcode}, перезапуск")
+                    workers[index] = (start_worker(index, updates), updates)
+
+    metrics_server = None
+    if config.METRICS_PORT:
+        metrics_server = metrics.start_server(config.METRICS_LISTEN, config.METRICS_PORT)
+
+    async with AsyncExitStack() as stack:
+        tasks = [asyncio.create_task(watch())]
+        server = None
+
+        if config.BOT_MODE == 'webhook':
+            import secrets
+
+            bots = {}
+            for locale, token in config.BOT_TOKENS.items():
+                bots[locale] = await stack.enter_async_context(_bot(token))
+
+            secret = config.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+            server = webhook.start_server(list(bots), dispatch, secret)
+
+            if config.WEBHOOK_URL:
+                await webhook.register(bots, secret)
+            else:
+                logger.warning("WEBHOOK_URL не задан, вебхук в Telegram не зарегистрирован")
+        else:
+            updaters = []
+            for locale, token in config.BOT_TOKENS.items():
+                queue = asyncio.Queue()
+                updater = await stack.enter_async_context(Updater(_bot(token), queue))
+                await updater.start_polling()
+                updaters.append((locale, updater, queue))
+                tasks.append(asyncio.create_task(_forward(locale, queue, dispatch)))
+
+        logger.info(f"Входной процесс запущен, обработчиков: {len(workers)}")
+        await stop.wait()
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if server is not None:
+            await asyncio.to_thread(server.shutdown)
+        else:
+            # Полученные, но ещё не переданные обновления отдаются обработчикам до их остановки
+            for locale, updater, queue in updaters:
+                await updater.stop()
+                while not queue.empty():
+                    dispatch(locale, queue.get_nowait().to_dict())
+
+    if metrics_server is not None:
+        await asyncio.to_thread(metrics_server.shutdown)
+
+
+# Многопроцессный режим: входной процесс и count процессов-обработчиков с общей базой
+def run(count, serve):
+    context = multiprocessing.get_context('spawn')
+
+    def start_worker(index, updates):
+        process = context.Process(target=worker_main, args=(index, count, updates, serve), name=f"bot-worker-{index}")
+        process.start()
+        return process
+
+    workers = []
+    for index in range(count):
+        updates = context.Queue()
+        workers.append((start_worker(index, updates), updates))
+
+    try:
+        asyncio.run(_ingress(workers, start_worker))
+    finally:
+        for process, updates in workers:
+            updates.put(None)
+
+        for index, (process, updates) in enumerate(workers):
+            process.join(WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                logger.error(f"Обработчик {index} не остановился за {WORKER_STOP_TIMEOUT} с, завершение")
+                process.terminate()
@@ -0,0 +1,190 @@
+import re
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from functools import partial, lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Путь к файлу базы данных
+DB_PATH = 'nofap_bot.db'
+
+# Сколько ждать снятия блокировки другим потоком, прежде чем вернуть "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+# Количество потоков, в которых выполняются запросы к БД из асинхронных обработчиков
+DB_WORKERS = 4
+
+# Прагмы, применяемые к каждому новому соединению
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 67108864",
+)
+
+# Соединения живут по одному на рабочий поток и открываются один раз
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+
+# Пул потоков БД: у каждого потока своё соединение, цикл событий не блокируется на SQLite
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='db')
+
+# Сколько вызовов run() ждут свободного потока БД или выполняются в нём
+_inflight = 0
+
+# Таблица запроса для метрик: первая после FROM, INTO или UPDATE
+_STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+([\w.]+)", re.IGNORECASE)
+
+SQL_DURATION = metrics.Histogram(
+    'bot_sql_duration_seconds', "Время выполнения запросов к БД", ('op', 'statement')
+)
+metrics.Gauge('bot_db_inflight', "Вызовы БД из обработчиков в очереди и в работе", func=lambda: _inflight)
+
+
+# Открытие нового соединения с настроенными прагмами
+def _open_connection():
+    # isolation_level=None: чтения идут без транзакции, записи явно оборачиваются в transaction()
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        check_same_thread=False
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# Получение соединения текущего потока
+def get_connection():
+    conn = getattr(_local, 'conn', None)
+
+    if conn is None:
+        conn = _open_connection()
+        _local.conn = conn
+        with _connections_lock:
+            _connections.append(conn)
+
+    return conn
+
+
+# Транзакция на запись. BEGIN IMMEDIATE сразу берёт блокировку записи,
+# поэтому конкурирующие потоки ждут в busy_timeout, а не падают на повышении блокировки
+@contextmanager
+def transaction():
+    conn = get_connection()
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    cursor.execute("BEGIN IMMEDIATE")
+
+    try:
+        yield cursor
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        cursor.close()
+        # Время транзакции включает ожидание блокировки записи
+        SQL_DURATION.observe(time.perf_counter() - started, 'transaction', '')
+
+
+# Короткое имя запроса для метрик, например "SELECT users"
+@lru_cache(maxsize=1024)
+def _statement(sql):
+    words = sql.split(None, 1)
+    verb = words[0].upper() if words else ''
+    match = _STATEMENT_TABLE.search(sql)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+# Выполнение запроса на чтение с возвратом одной строки
+def fetchone(sql, params=()):
+    with SQL_DURATION.time('fetchone', _statement(sql)):
+        return get_connection().execute(sql, params).fetchone()
+
+
+# Выполнение запроса на чтение с возвратом всех строк
+def fetchall(sql, params=()):
+    with SQL_DURATION.time('fetchall', _statement(sql)):
+        return get_connection().execute(sql, params).fetchall()
+
+
+# Выполнение одиночного запроса на запись (в режиме автокоммита это отдельная транзакция)
+def execute(sql, params=()):
+    with SQL_DURATION.time('execute', _statement(sql)):
+        return get_connection().execute(sql, params).rowcount
+
+
+# Добавление столбца в существующую таблицу, если его ещё нет (миграция схемы при запуске)
+def add_column(cursor, table, column, definition):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+# Перевод базы в режим auto_vacuum = INCREMENTAL, чтобы место после удаления строк можно было
+# возвращать частями через PRAGMA incremental_vacuum. Режим включается только полным VACUUM,
+# поэтому на существующей базе он выполняется один раз при первом запуске
+def enable_incremental_vacuum(schema='main'):
+    conn = get_connection()
+    if conn.execute(f"PRAGMA {schema}.auto_vacuum").fetchone()[0] == 2:
+        return
+
+    logger.info(f"Включение инкрементальной очистки для {schema}, выполняется VACUUM")
+    conn.execute(f"PRAGMA {schema}.auto_vacuum = INCREMENTAL")
+    conn.execute(f"VACUUM {schema}")
+
+
+# Возврат свободных страниц файлу (не больше pages за вызов, 0 - все)
+def incremental_vacuum(schema='main', pages=0):
+    conn = get_connection()
+    freed = conn.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]
+    # execute() делает один шаг запроса и освобождает одну страницу, executescript() выполняет его до конца
+    conn.executescript(f"PRAGMA {schema}.incremental_vacuum({pages})")
+    return freed if pages == 0 else min(freed, pages)
+
+
+# Выполнение синхронной функции работы с БД в пуле потоков БД
+async def run(func, *args, **kwargs):
+    global _inflight
+
+    loop = asyncio.get_running_loop()
+    _inflight += 1
+    try:
+        return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+    finally:
+        _inflight -= 1
+
+
+# Асинхронный вариант выборки для обработчиков
+async def afetchall(sql, params=()):
+    return await run(fetchall, sql, params)
+
+
+# Закрытие всех открытых соединений при остановке бота
+def close_all():
+    _executor.shutdown(wait=True)
+
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при закрытии соединения с БД: {e}")
+
+    _local.__dict__.pop('conn', None)
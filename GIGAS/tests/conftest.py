@@ -0,0 +1,28 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Модули бота лежат плоско в GIGAS/ и импортируют друг друга по имени
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+
+
+# Пустая база со схемой бота во временной папке. Пул потоков БД свой на каждый тест: соединения
+# потоков открываются к базе этого теста и закрываются после него
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    import bot
+
+    monkeypatch.setattr(storage, 'DB_PATH', str(tmp_path / 'bot.db'))
+    monkeypatch.setattr(
+        storage, '_executor', ThreadPoolExecutor(max_workers=storage.DB_WORKERS, thread_name_prefix='db')
+    )
+    storage._local.__dict__.pop('conn', None)
+
+    bot.init_db()
+    yield
+
+    storage.close_all()
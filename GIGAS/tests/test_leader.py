@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+import leader
+import storage
+
+
+# Аренды процесса хранятся в модуле - каждый тест начинает без них
+@pytest.fixture(autouse=True)
+def no_leases(db):
+    leader._held.clear()
+    yield
+    leader._held.clear()
+
+
+def expire(name):
+    storage.execute("UPDATE leases SET expires_at = 0 WHERE name = ?", (name,))
+
+
+def test_acquire_and_renew_keep_token(db):
+    token, gained = leader.acquire('jobs')
+    assert (token, gained) == (1, True)
+
+    assert leader.acquire('jobs') == (1, False)
+    assert leader.token('jobs') == 1
+    assert leader.fence('jobs', 1)
+
+
+def test_other_holder_blocks_until_expiry(db):
+    leader.acquire('jobs')
+    storage.execute("UPDATE leases SET holder = 'other' WHERE name = 'jobs'")
+
+    assert leader.acquire('jobs') == (None, False)
+    assert leader.token('jobs') is None
+
+    # Держатель пропал: после истечения срока аренду забирает этот процесс со следующим жетоном
+    expire('jobs')
+    assert leader.acquire('jobs') == (2, True)
+
+
+# Бывший ведущий после перехода аренды не проходит ограждение со старым жетоном
+def test_fence_rejects_stale_token(db):
+    token, _ = leader.acquire('jobs')
+    storage.execute("UPDATE leases SET holder = 'other', token = token + 1 WHERE name = 'jobs'")
+
+    assert not leader.fence('jobs', token)
+    assert not leader.fence('jobs', None)
+
+
+# Ведущий перестаёт считать себя ведущим за SAFETY_MARGIN до конца срока, даже если продление не дошло
+def test_token_expires_locally_before_lease(db, monkeypatch):
+    leader.acquire('jobs')
+    monkeypatch.setattr(time, 'monotonic', lambda: float('inf'))
+
+    assert leader.token('jobs') is None
+
+
+def test_release_all_lets_others_take_over(db):
+    leader.acquire('jobs')
+    leader.release_all()
+
+    assert storage.fetchone("SELECT expires_at FROM leases WHERE name = 'jobs'") == (0,)
+    assert leader.token('jobs') is None
@@ -0,0 +1,219 @@
+import time
+import asyncio
+
+import pytest
+from telegram.error import Forbidden, BadRequest, TimedOut
+
+import delivery
+import outbox
+import storage
+
+
+def add(*chat_ids):
+    return outbox.enqueue('ru', [(chat_id, f"msg {chat_id}") for chat_id in chat_ids], "чат (ru)", "Markdown")
+
+
+def row(chat_id):
+    return storage.fetchone("SELECT id, attempts, next_attempt_at, last_error FROM outbox WHERE chat_id = ?", (chat_id,))
+
+
+def dead(chat_id):
+    return storage.fetchone("SELECT attempts, last_error FROM outbox_dead WHERE chat_id = ?", (chat_id,))
+
+
+def test_claim_hides_rows_until_timeout(db):
+    add(1, 2, 3)
+
+    first, _ = outbox._claim(2)
+    second, _ = outbox._claim(10)
+
+    assert [r[2] for r in first] == [1, 2]
+    assert [r[2] for r in second] == [3]
+    assert outbox._claim(10) == ([], 0)
+    assert row(1)[2] > time.time() + outbox.CLAIM_TIMEOUT - 5
+
+
+def test_extend_keeps_rows_hidden(db):
+    add(1)
+    row_id = outbox._claim(1)[0][0][0]
+    storage.execute("UPDATE outbox SET next_attempt_at = ? WHERE id = ?", (time.time() + 1, row_id))
+
+    outbox._extend([row_id])
+
+    assert row(1)[2] > time.time() + outbox.CLAIM_TIMEOUT - 5
+
+
+def test_complete_deletes_sent(db):
+    add(1)
+    row_id = row(1)[0]
+
+    assert outbox._complete([(row_id, 0, None, False)]) == 0
+    assert row(1) is None
+    assert dead(1) is None
+
+
+def test_complete_schedules_retry_with_backoff(db):
+    add(1, 2)
+    first, second = row(1)[0], row(2)[0]
+    storage.execute("UPDATE outbox SET attempts = 2 WHERE id = ?", (second,))
+    started = time.time()
+
+    outbox._complete([(first, 0, TimedOut(), False), (second, 2, TimedOut(), False)])
+
+    assert row(1)[1] == 1
+    assert row(1)[2] == pytest.approx(started + outbox.RETRY_DELAY, abs=5)
+    assert row(2)[1] == 3
+    assert row(2)[2] == pytest.approx(started + outbox.RETRY_DELAY * 4, abs=5)
+    assert row(1)[3] == str(TimedOut())
+
+
+def test_complete_caps_retry_delay(db, monkeypatch):
+    monkeypatch.setattr(outbox, 'MAX_ATTEMPTS', 100)
+    add(1)
+    started = time.time()
+
+    outbox._complete([(row(1)[0], 20, TimedOut(), False)])
+
+    assert row(1)[2] == pytest.approx(started + outbox.MAX_RETRY_DELAY, abs=5)
+
+
+@pytest.mark.parametrize("error", [Forbidden("blocked"), BadRequest("chat not found")])
+def test_complete_dead_letters_permanent_errors(db, error):
+    add(1)
+
+    assert outbox._complete([(row(1)[0], 0, error, False)]) == 1
+    assert row(1) is None
+    assert dead(1) == (1, str(error))
+
+
+def test_complete_dead_letters_after_max_attempts(db):
+    add(1)
+
+    assert outbox._complete([(row(1)[0], outbox.MAX_ATTEMPTS - 1, TimedOut(), False)]) == 1
+    assert row(1) is None
+    assert dead(1) == (outbox.MAX_ATTEMPTS, str(TimedOut()))
+
+
+# id строки outbox после опустошения таблицы выдаётся заново - запись о первом сообщении не должна пропасть
+def test_dead_letters_survive_reused_outbox_ids(db):
+    add(1)
+    first = row(1)[0]
+    outbox._complete([(first, 0, Forbidden("blocked"), False)])
+
+    add(2)
+    assert row(2)[0] == first
+    outbox._complete([(row(2)[0], 0, Forbidden("blocked"), False)])
+
+    assert storage.fetchall("SELECT chat_id, outbox_id FROM outbox_dead ORDER BY id") == [(1, first), (2, first)]
+
+
+def add_reminder(chat_id, expires_in=3600):
+    return outbox.enqueue(
+        'ru', [(chat_id, "reminder")], "напоминания (ru)", "Markdown", expires_at=time.time() + expires_in
+    )
+
+
+# Просроченное напоминание не отправляется, а уходит в недоставленные
+def test_claim_dead_letters_expired_reminders(db):
+    add(1)
+    add_reminder(2, expires_in=-1)
+
+    rows, dropped = outbox._claim(10)
+
+    assert [r[2] for r in rows] == [1]
+    assert dropped == 1
+    assert row(2) is None
+    assert dead(2) == (0, "срок отправки истёк")
+
+
+# Напоминание, выборка которого не завершилась (процесс упал посреди отправки), повторно не отправляется
+def test_claim_does_not_resend_interrupted_reminder(db):
+    add_reminder(1)
+    rows, _ = outbox._claim(10)
+    assert row(1)[1] == 1
+    storage.execute("UPDATE outbox SET next_attempt_at = 0 WHERE id = ?", (rows[0][0],))
+
+    assert outbox._claim(10) == ([], 1)
+    assert row(1) is None
+    assert dead(1) == (1, "отправка прервана, повтор мог бы прийти дважды")
+
+
+# TimedOut мог дойти до пользователя: напоминание после него не повторяется
+def test_complete_does_not_retry_reminders(db):
+    add_reminder(1)
+
+    assert outbox._complete([(row(1)[0], 0, TimedOut(), True)]) == 1
+    assert row(1) is None
+    assert dead(1) == (1, str(TimedOut()))
+
+
+def test_prune_dead_removes_old_entries(db):
+    add(1, 2)
+    outbox._complete([(row(1)[0], 0, Forbidden("blocked"), False), (row(2)[0], 0, Forbidden("blocked"), False)])
+    storage.execute(
+        "UPDATE outbox_dead SET failed_at = ? WHERE chat_id = 1",
+        (time.time() - (outbox.DEAD_RETENTION_DAYS + 1) * 86400,)
+    )
+
+    assert outbox.prune_dead() == 1
+    assert dead(1) is None
+    assert dead(2) is not None
+
+
+# Бот-заглушка: записывает отправленные сообщения, заданным чатам отвечает ошибкой
+class StubBot:
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = errors or {}
+
+    async def send_message(self, chat_id, text, parse_mode):
+        if chat_id in self.errors:
+            raise self.errors[chat_id]
+        self.sent.append(chat_id)
+
+
+# Полный проход диспетчера: отправленное удаляется, заблокированные чаты уходят в недоставленные,
+# а сетевая ошибка даёт одну попытку без повторов внутри пула доставки
+def test_dispatcher_sends_and_records_results(db, monkeypatch):
+    monkeypatch.setattr(delivery, 'GLOBAL_RATE', 10 ** 6)
+    monkeypatch.setattr(delivery, 'GLOBAL_BURST', 10 ** 6)
+    monkeypatch.setattr(delivery, '_global_bucket', None)
+    bot = StubBot({7: Forbidden("blocked"), 8: TimedOut()})
+
+    async def run():
+        outbox.start({'ru': bot})
+        await storage.run(add, *range(1, 11))
+        outbox.notify()
+        await asyncio.wait_for(outbox.wait_idle(), 10)
+        await outbox.shutdown()
+        await delivery.shutdown()
+
+    asyncio.run(run())
+
+    assert sorted(bot.sent) == [1, 2, 3, 4, 5, 6, 9, 10]
+    assert storage.fetchall("SELECT chat_id, attempts FROM outbox") == [(8, 1)]
+    assert dead(7) == (1, "blocked")
+
+
+# Рассылка из нескольких выбранных пачек даёт в журнале одну строку итога, а не строку на пачку
+def test_dispatcher_reports_once_per_fanout(db, monkeypatch, caplog):
+    monkeypatch.setattr(delivery, 'GLOBAL_RATE', 10 ** 6)
+    monkeypatch.setattr(delivery, 'GLOBAL_BURST', 10 ** 6)
+    monkeypatch.setattr(delivery, '_global_bucket', None)
+    bot = StubBot()
+
+    async def run():
+        outbox.start({'ru': bot})
+        await storage.run(add, *range(1, 2 * outbox.CLAIM_BATCH + 51))
+        outbox.notify()
+        await asyncio.wait_for(outbox.wait_idle(), 10)
+        await outbox.shutdown()
+        await delivery.shutdown()
+
+    with caplog.at_level('INFO'):
+        asyncio.run(run())
+
+    reports = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Рассылка 'чат (ru)'")]
+    assert len(bot.sent) == 2 * outbox.CLAIM_BATCH + 50
+    assert len(reports) == 1
+    assert f"отправлено {2 * outbox.CLAIM_BATCH + 50}, ошибок 0" in reports[0]
@@ -0,0 +1,186 @@
+import datetime
+
+import pytest
+
+import config
+import leader
+import reminders
+import storage
+
+
+def utc(*args):
+    return datetime.datetime(*args, tzinfo=datetime.timezone.utc)
+
+
+def ts(*args):
+    return int(utc(*args).timestamp())
+
+
+# Пользователь с напоминанием в очереди на момент fire_at
+def add_user(user_id, fire_at, time_str="20:00", zone="UTC", reminded_on=None, locale='ru'):
+    storage.execute(
+        "INSERT INTO users (user_id, username, reminder_enabled, reminder_time, timezone, locale, "
+        "next_fire_at, reminded_on) VALUES (?, 'u', 1, ?, ?, ?, ?, ?)",
+        (user_id, time_str, zone, locale, fire_at, reminded_on)
+    )
+
+
+def queue_row(user_id):
+    return storage.fetchone("SELECT next_fire_at, reminded_on FROM users WHERE user_id = ?", (user_id,))
+
+
+@pytest.fixture
+def lease(db, monkeypatch):
+    monkeypatch.setattr(config, 'REMINDER_SPREAD_MINUTES', 0)
+    name = 'reminders:0'
+    token, _ = leader.acquire(name)
+    return name, token
+
+
+def test_next_fire_at_same_day_or_next():
+    assert reminders.next_fire_at("20:00", "UTC", utc(2026, 3, 1, 10)) == ts(2026, 3, 1, 20)
+    assert reminders.next_fire_at("20:00", "UTC", utc(2026, 3, 1, 21)) == ts(2026, 3, 2, 20)
+    assert reminders.next_fire_at("20:00", "UTC", utc(2026, 3, 1, 20)) == ts(2026, 3, 2, 20)
+
+
+def test_next_fire_at_skips_reminded_day():
+    fire_at = reminders.next_fire_at("23:00", "UTC", utc(2026, 3, 1, 10), reminded_on="2026-03-01")
+    assert fire_at == ts(2026, 3, 2, 23)
+
+
+def test_next_fire_at_uses_zone_offset():
+    assert reminders.next_fire_at("09:00", "UTC+03:00", utc(2026, 3, 1, 0)) == ts(2026, 3, 1, 6)
+
+
+# 8 марта 2026 в Нью-Йорке переход на летнее время: 08:00 местного - уже 12:00 UTC, а не 13:00
+def test_next_fire_at_follows_dst():
+    zone = "America/New_York"
+    assert reminders.next_fire_at("08:00", zone, utc(2026, 3, 7, 14)) == ts(2026, 3, 8, 12)
+    assert reminders.next_fire_at("08:00", zone, utc(2026, 3, 6, 14)) == ts(2026, 3, 7, 13)
+
+
+# Сдвиг переносит напоминание 23:50 за полночь, но день напоминания остаётся прежним
+def test_next_fire_at_shift_across_midnight():
+    fire_at = reminders.next_fire_at("23:50", "UTC", utc(2026, 3, 1, 12), shift=1200)
+    assert fire_at == ts(2026, 3, 2, 0, 10)
+
+    after_send = reminders.next_fire_at("23:50", "UTC", utc(2026, 3, 2, 0, 10), "2026-03-01", shift=1200)
+    assert after_send == ts(2026, 3, 3, 0, 10)
+
+
+def test_jitter_is_stable_and_within_window(monkeypatch):
+    monkeypatch.setattr(config, 'REMINDER_SPREAD_MINUTES', 15)
+
+    shifts = [reminders.jitter(user_id) for user_id in range(1000, 3000)]
+    assert all(0 <= shift < 15 * 60 for shift in shifts)
+    assert shifts == [reminders.jitter(user_id) for user_id in range(1000, 3000)]
+    assert len(set(shifts)) > 500
+
+
+def test_jitter_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(config, 'REMINDER_SPREAD_MINUTES', 0)
+    assert reminders.jitter(12345) == 0
+
+
+def test_claim_returns_due_and_rearms_for_next_day(lease):
+    now = ts(2026, 3, 1, 20, 0, 30)
+    add_user(1, ts(2026, 3, 1, 20))
+    add_user(2, ts(2026, 3, 1, 21))
+
+    claimed, due = reminders.claim(now, *lease)
+
+    assert (claimed, due) == (1, [(1, 'ru')])
+    assert queue_row(1) == (ts(2026, 3, 2, 20), "2026-03-01")
+    assert queue_row(2) == (ts(2026, 3, 1, 21), None)
+
+    # Повторный тик в ту же минуту ничего не выбирает
+    assert reminders.claim(now, *lease) == (0, [])
+
+
+def test_claim_limit_leaves_rest_queued(lease):
+    for user_id in range(1, 6):
+        add_user(user_id, ts(2026, 3, 1, 20))
+
+    claimed, due = reminders.claim(ts(2026, 3, 1, 20, 1), *lease, limit=2)
+
+    assert claimed == 2 and len(due) == 2
+    assert storage.fetchone("SELECT COUNT(*) FROM users WHERE next_fire_at <= ?", (ts(2026, 3, 1, 20, 1),)) == (3,)
+
+
+# Опоздавшее в пределах GRACE_SECONDS напоминание досылается, более старое пропускается до следующего дня
+def test_claim_grace_window(lease):
+    add_user(1, ts(2026, 3, 1, 20))
+    add_user(2, ts(2026, 3, 1, 17), time_str="17:00")
+
+    claimed, due = reminders.claim(ts(2026, 3, 1, 21, 30), *lease)
+
+    assert claimed == 2
+    assert due == [(1, 'ru')]
+    assert queue_row(2) == (ts(2026, 3, 2, 17), None)
+
+
+# Сдвиг за полночь: день напоминания считается по времени без сдвига, и за этот день второго не будет
+def test_claim_shift_across_midnight(lease, monkeypatch):
+    monkeypatch.setattr(reminders, 'jitter', lambda user_id: 1200)
+    add_user(1, ts(2026, 3, 2, 0, 10), time_str="23:50")
+
+    claimed, due = reminders.claim(ts(2026, 3, 2, 0, 10), *lease)
+
+    assert due == [(1, 'ru')]
+    assert queue_row(1) == (ts(2026, 3, 3, 0, 10), "2026-03-01")
+
+
+# Напоминание за уже отмеченный день (пользователь перенёс время на более позднее) не отправляется
+def test_claim_at_most_once_per_day(lease):
+    add_user(1, ts(2026, 3, 1, 22), time_str="22:00", reminded_on="2026-03-01")
+
+    claimed, due = reminders.claim(ts(2026, 3, 1, 22, 0, 5), *lease)
+
+    assert (claimed, due) == (1, [])
+    assert queue_row(1) == (ts(2026, 3, 2, 22), "2026-03-01")
+
+
+def test_claim_enqueue_runs_in_same_transaction(lease):
+    add_user(1, ts(2026, 3, 1, 20))
+    add_user(2, ts(2026, 3, 1, 20))
+    calls = []
+
+    def enqueue(cursor, users):
+        cursor.execute("SELECT reminded_on FROM users WHERE user_id = 1")
+        calls.append((sorted(users), cursor.fetchone()))
+
+    reminders.claim(ts(2026, 3, 1, 20, 0, 5), *lease, enqueue=enqueue)
+
+    assert calls == [([(1, 'ru'), (2, 'ru')], ("2026-03-01",))]
+
+
+# Ошибка при постановке в исходящие откатывает выборку: напоминания остаются в очереди
+def test_claim_rolls_back_when_enqueue_fails(lease):
+    add_user(1, ts(2026, 3, 1, 20))
+
+    def enqueue(cursor, users):
+        raise RuntimeError("outbox unavailable")
+
+    with pytest.raises(RuntimeError):
+        reminders.claim(ts(2026, 3, 1, 20, 0, 5), *lease, enqueue=enqueue)
+
+    assert queue_row(1) == (ts(2026, 3, 1, 20), None)
+
+
+# Аренда перешла к другому экземпляру: устаревший ведущий ничего не выбирает
+def test_claim_fenced_with_stale_token(lease):
+    name, token = lease
+    add_user(1, ts(2026, 3, 1, 20))
+    storage.execute("UPDATE leases SET holder = 'other', token = token + 1 WHERE name = ?", (name,))
+
+    assert reminders.claim(ts(2026, 3, 1, 20, 0, 5), name, token) == (0, None)
+    assert queue_row(1) == (ts(2026, 3, 1, 20), None)
+
+
+def test_claim_bad_settings_leave_queue(lease):
+    add_user(1, ts(2026, 3, 1, 20), time_str="bad")
+
+    claimed, _ = reminders.claim(ts(2026, 3, 1, 20, 0, 5), *lease)
+
+    assert claimed == 1
+    assert queue_row(1)[0] is None
@@ -0,0 +1,78 @@
+import re
+import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import config
+
+# Смещение от UTC: "+3", "-05:30", "UTC+5", "GMT-2"
+_OFFSET = re.compile(r"^(?:UTC|GMT)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$", re.IGNORECASE)
+
+
+# Разбор часового пояса, введённого пользователем: имя из базы IANA (Europe/Moscow) или смещение от UTC.
+# Возвращает нормализованное имя для хранения или None, если пояс не распознан
+def parse(text):
+    text = text.strip()
+
+    match = _OFFSET.match(text)
+    if match:
+        sign, hours, minutes = match.group(1), int(match.group(2)), int(match.group(3) or 0)
+        if hours > 14 or minutes >= 60:
+            return None
+        return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+    if text.upper() in ("UTC", "GMT", "Z"):
+        return "UTC"
+
+    try:
+        return ZoneInfo(text).key
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+# tzinfo по сохранённому имени. Пустое имя - пояс по умолчанию из настроек;
+# None - часовой пояс сервера (с его правилами перехода на летнее время)
+@lru_cache(maxsize=None)
+def get(name):
+    name = name or config.DEFAULT_TIMEZONE
+    if not name:
+        return None
+
+    match = _OFFSET.match(name)
+    if match:
+        sign = -1 if match.group(1) == '-' else 1
+        offset = datetime.timedelta(hours=int(match.group(2)), minutes=int(match.group(3) or 0))
+        return datetime.timezone(sign * offset, name)
+
+    if name == "UTC":
+        return datetime.timezone.utc
+
+    return ZoneInfo(name)
+
+
+# Текущее время в часовом поясе пользователя
+def now(name):
+    tz = get(name)
+    return datetime.datetime.now(tz) if tz is not None else datetime.datetime.now().astimezone()
+
+
+# Текущая дата пользователя в виде "ГГГГ-ММ-ДД": граница дня для отметок и статистики
+def today(name):
+    return now(name).strftime("%Y-%m-%d")
+
+
+# Смещение пояса от UTC в минутах в момент moment (aware datetime)
+def offset_minutes(name, moment):
+    tz = get(name)
+    local = moment.astimezone(tz) if tz is not None else moment.astimezone()
+    return int(local.utcoffset().total_seconds() // 60)
+
+
+# Название пояса для показа пользователю: сохранённое имя или текущее смещение пояса по умолчанию
+def describe(name):
+    if name:
+        return name
+
+    offset = offset_minutes(name, datetime.datetime.now(datetime.timezone.utc))
+    sign = '-' if offset < 0 else '+'
+    return f"UTC{sign}{abs(offset) // 60:02d}:{abs(offset) % 60:02d}"
@@ -0,0 +1,78 @@
+import hmac
+import logging
+from threading import Thread
+
+from flask import Flask, request, abort
+from werkzeug.serving import make_server
+from telegram import Update
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Заголовок, в котором Telegram передаёт секрет вебхука
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+# Создание Flask-приложения, которое принимает обновления и передаёт их дальше.
+# locales - языки ботов (язык берётся из пути запроса), deliver(locale, data) - передача обновления в виде JSON
+# в очередь приложения бота или процессу-обработчику; вызывается в потоках Flask
+def create_app(locales, deliver, secret):
+    app = Flask(__name__)
+
+    @app.route(f"/{config.WEBHOOK_PATH}/<locale>", methods=['POST'])
+    def receive_update(locale):
+        # Проверка секрета, чтобы обновления не мог прислать кто угодно
+        token = request.headers.get(SECRET_HEADER, '')
+        if not hmac.compare_digest(token, secret):
+            abort(403)
+
+        if locale not in locales:
+            abort(404)
+
+        data = request.get_json(silent=True)
+        if data is None:
+            abort(400)
+
+        deliver(locale, data)
+
+        return ''
+
+    @app.route('/healthz', methods=['GET'])
+    def healthz():
+        return 'ok'
+
+    return app
+
+
+# Запуск HTTP-сервера вебхука в отдельном потоке
+def start_server(locales, deliver, secret):
+    app = create_app(locales, deliver, secret)
+    server = make_server(config.WEBHOOK_LISTEN, config.WEBHOOK_PORT, app, threaded=True)
+
+    Thread(target=server.serve_forever, name='webhook', daemon=True).start()
+    logger.info(f"Вебхук слушает http://{config.WEBHOOK_LISTEN}:{config.WEBHOOK_PORT}/{config.WEBHOOK_PATH}/<язык>")
+
+    return server
+
+
+# Передача обновлений в очереди приложений ботов этого процесса
+def deliver_to(applications, loop):
+    def deliver(locale, data):
+        application = applications[locale]
+        update = Update.de_json(data, application.bot)
+
+        # Очередь обновлений живёт в цикле событий бота, а Flask работает в своих потоках
+        loop.call_soon_threadsafe(application.update_queue.put_nowait, update)
+
+    return deliver
+
+
+# Регистрация вебхуков всех ботов в Telegram; bots - боты по языкам
+async def register(bots, secret):
+    for locale, bot in bots.items():
+        await bot.set_webhook(
+            url=f"{config.WEBHOOK_URL.rstrip('/')}/{config.WEBHOOK_PATH}/{locale}",
+            secret_token=secret,
+            allowed_updates=Update.ALL_TYPES
+        )